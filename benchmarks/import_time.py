@@ -0,0 +1,106 @@
+"""
+Measures how long each page's imports take on a cold and a warm start.
+
+Cold: a fresh interpreter executing the page's top-level import statements,
+which is what the first request to a page pays after the server starts.
+Warm: executing the same statements again in that interpreter, which is what
+every Streamlit rerun pays once the modules are cached in sys.modules.
+
+Run from the repository root:
+
+    poetry run python benchmarks/import_time.py [--repeat 5] [--top 5]
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CHILD = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+source = {source!r}
+start = time.perf_counter()
+exec(source, {{}})
+cold = time.perf_counter() - start
+start = time.perf_counter()
+exec(source, {{}})
+warm = time.perf_counter() - start
+print(json.dumps({{"cold": cold, "warm": warm}}))
+"""
+
+def page_files():
+    pages = [os.path.join(ROOT, "Home.py")]
+    pages_dir = os.path.join(ROOT, "pages")
+    pages += sorted(
+        os.path.join(pages_dir, name) for name in os.listdir(pages_dir) if name.endswith(".py")
+    )
+    return pages
+
+def page_imports(path):
+    """
+    Returns the source of a page's top-level import statements.
+    """
+    with open(path) as f:
+        source = f.read()
+    tree = ast.parse(source)
+    statements = [
+        ast.get_source_segment(source, node)
+        for node in tree.body
+        if isinstance(node, (ast.Import, ast.ImportFrom))
+    ]
+    return "\n".join(statements)
+
+def slowest_modules(stderr, top):
+    """
+    Parses `python -X importtime` output into the `top` modules by self time.
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        modules.append((int(self_us), name.strip()))
+    return [f"{name} ({self_us / 1000:.0f} ms)" for self_us, name in sorted(modules, reverse=True)[:top]]
+
+def measure(path, repeat, top):
+    child = _CHILD.format(root=ROOT, source=page_imports(path))
+    runs = []
+    slowest = []
+    for i in range(repeat):
+        args = [sys.executable] + (["-X", "importtime"] if i == 0 else []) + ["-c", child]
+        result = subprocess.run(args, capture_output=True, text=True, cwd=ROOT)
+        if result.returncode != 0:
+            error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"
+            return {"page": os.path.relpath(path, ROOT), "error": error}
+        if i == 0:
+            slowest = slowest_modules(result.stderr, top)
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    return {
+        "page": os.path.relpath(path, ROOT),
+        "cold_ms": statistics.median(run["cold"] for run in runs) * 1000,
+        "warm_ms": statistics.median(run["warm"] for run in runs) * 1000,
+        "slowest": slowest,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per page (median is reported)")
+    parser.add_argument("--top", type=int, default=5, help="Slowest modules to list per page")
+    args = parser.parse_args()
+
+    print(f"{'page':<28} {'cold (ms)':>10} {'warm (ms)':>10}  slowest imports")
+    for path in page_files():
+        result = measure(path, args.repeat, args.top)
+        if "error" in result:
+            print(f"{result['page']:<28} {'error: ' + result['error']}")
+            continue
+        print(f"{result['page']:<28} {result['cold_ms']:>10.0f} {result['warm_ms']:>10.2f}  {', '.join(result['slowest'])}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Fills the embedded SQLite backend with synthetic properties for load testing.
+
+Rows are spread over the communities in resources/jamaican_communities_geocoded.csv
+with plausible prices, sizes and coordinates. Point the app at the result with
+STORAGE_BACKEND=sqlite (and SQLITE_PATH if you pass --path).
+
+    poetry run python benchmarks/seed_sqlite.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.bigquery_utils import CACHE_DIR
+from utils.storage_backends import SQLiteBackend
+
+PROPERTY_TYPES = np.array(["apartment", "house", "townhouse"])
+
+def synthetic_rows(communities, count, start, rng, validated_share):
+    picks = rng.integers(0, len(communities), count)
+    rooms = rng.integers(1, 7, count).astype(float)
+    sqft = np.round(rooms * rng.normal(450, 120, count).clip(150), 0)
+    rows = pd.DataFrame({
+        "property_id": [f"SYN_{i:010d}" for i in range(start, start + count)],
+        "listing_urls": [f"https://example.com/listing/{i}" for i in range(start, start + count)],
+        "price": np.round(sqft * rng.lognormal(9.5, 0.4, count), -3),
+        "sqft": sqft,
+        "rooms": rooms,
+        "bathroom": np.maximum(1, rooms - rng.integers(0, 3, count)).astype(float),
+        "property_type": PROPERTY_TYPES[rng.integers(0, len(PROPERTY_TYPES), count)],
+        "latitude": communities["latitude"].to_numpy()[picks] + rng.normal(0, 0.004, count),
+        "longitude": communities["longitude"].to_numpy()[picks] + rng.normal(0, 0.004, count),
+        "aes_score": np.round(rng.uniform(1, 10, count), 1),
+        "is_validated": rng.random(count) < validated_share,
+    })
+    return rows, communities["community"].to_numpy()[picks]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--path", default=os.path.join(CACHE_DIR, "properties.sqlite"))
+    parser.add_argument("--batch", type=int, default=100_000)
+    parser.add_argument("--validated-share", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    communities = pd.read_csv(os.path.join(ROOT, "resources", "jamaican_communities_geocoded.csv"))
+    communities.columns = communities.columns.str.lower()
+    communities = communities.dropna(subset=["latitude", "longitude"])
+
+    backend = SQLiteBackend(args.path)
+    if "parish" not in backend.fetch_communities().columns:
+        for row in communities.itertuples():
+            backend.add_community(row.community, row.parish, row.city, row.latitude, row.longitude)
+
+    rng = np.random.default_rng(args.seed)
+    start = backend.row_count()
+    started = time.perf_counter()
+    for offset in range(0, args.rows, args.batch):
+        count = min(args.batch, args.rows - offset)
+        rows, row_communities = synthetic_rows(communities, count, start + offset, rng, args.validated_share)
+        backend.insert_rows(rows.to_dict("records"), communities=row_communities.tolist())
+        print(f"{offset + count:,}/{args.rows:,} rows", end="\r", flush=True)
+
+    elapsed = time.perf_counter() - started
+    print(f"\nInserted {args.rows:,} rows into {args.path} in {elapsed:.1f}s ({args.rows / elapsed:,.0f} rows/s)")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,15 @@
 import streamlit as st
 import os
+import uuid
 import streamlit.components.v1 as components
-from utils.bigquery_utils import fetch_data, update_validation, create_bigquery_client, delete_property
+from utils.storage_backends import get_storage_backend
+from utils.lease_manager import get_lease_manager
+from utils.validation_queue import get_validation_queue, diff_fields
+from utils.prefetch import get_prefetcher
+from utils.listing_snapshots import get_listing_snapshotter
+from utils.community_index import get_community_index
+from utils.validation_session import ValidationSession
 import pandas as pd
-import pydeck as pdk
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -43,22 +49,212 @@ st.title("Human-in-the-Loop Data Validation")
 st.markdown("</div>", unsafe_allow_html=True)
 user = st.text_input("Validator Name:", value=st.session_state["name"], placeholder="Enter your name")
 
-# Create BigQuery client
-client = create_bigquery_client()
+# BigQuery, or the embedded SQLite backend when STORAGE_BACKEND=sqlite
+storage = get_storage_backend()
 
-# Cache the full property data
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def get_cached_data():
-    return fetch_data(client)
+# Validations are queued locally and written to storage in batches
+validation_queue = get_validation_queue(storage)
+pending_validations = validation_queue.pending_count()
+if pending_validations:
+    st.sidebar.info(f"⏳ {pending_validations} validation(s) waiting to sync")
+if validation_queue.last_error:
+    st.sidebar.warning(f"Last sync failed, will retry: {validation_queue.last_error}")
+if validation_queue.dead_lettered:
+    st.sidebar.error(
+        f"{validation_queue.dead_lettered} validation(s) kept failing and were set aside in "
+        f"{validation_queue.dead_letter_path}"
+    )
 
-# Initialize session state for tracking available properties
-if 'available_property_ids' not in st.session_state:
-    df = get_cached_data()
-    st.session_state.available_property_ids = df['property_id'].tolist()
-    st.session_state.properties_data = df
+# Each session leases its own batch of properties so validators never overlap
+if 'validator_session_id' not in st.session_state:
+    st.session_state.validator_session_id = uuid.uuid4().hex
+session_id = st.session_state.validator_session_id
+lease_manager = get_lease_manager(storage, skip_ids=validation_queue.pending_property_ids)
+
+# Bulk mode reviews a whole page of properties at once, so it leases more
+BULK_PAGE_SIZE = 50
+bulk_mode = st.sidebar.toggle(
+    "Bulk mode",
+    key="bulk_mode",
+    help="Review a page of properties in a grid and commit them together",
+)
+
+# The session's queue: indexed by property_id, so every action below is O(1).
+# Rows are shared with other sessions; only this session's edits are its own.
+if 'validation_session' not in st.session_state:
+    st.session_state.validation_session = ValidationSession()
+session = st.session_state.validation_session
+
+# Leaving bulk mode hands the page of leases back and starts a normal batch
+if st.session_state.get("was_bulk_mode") and not bulk_mode:
+    lease_manager.release(session_id)
+    session.close()
+    st.session_state.pop("bulk_choices", None)
+st.session_state.was_bulk_mode = bulk_mode
+
+# Drop anything validated or deleted elsewhere since our last rerun
+session.sync()
+
+def claim_properties(size=None):
+    """
+    Leases properties up to `size` and adds any new ones to the session's queue.
+    """
+    session.add(lease_manager.claim(session_id, size))
+
+def drop_lost_leases():
+    """
+    Renews the session's leases and drops properties it no longer holds
+    (expired, or invalidated by another session's write).
+
+    Returns:
+        list: The property_ids dropped.
+    """
+    session.sync()
+    held = lease_manager.renew(session_id)
+    lost = [pid for pid in session if pid not in held]
+    for pid in lost:
+        session.drop(pid)
+    return lost
+
+# Keep our leases alive; drop any that expired while this session was idle
+lost = drop_lost_leases() if session else []
+if lost:
+    st.toast(f"{len(lost)} idle propert{'y' if len(lost) == 1 else 'ies'} returned to the shared queue")
+
+if not session:
+    claim_properties(BULK_PAGE_SIZE if bulk_mode else None)
+elif bulk_mode and len(session) < BULK_PAGE_SIZE:
+    claim_properties(BULK_PAGE_SIZE)
+
+EDITABLE_COLUMNS = ["price", "sqft", "rooms", "bathroom", "property_type", "latitude", "longitude", "aes_score"]
+
+def render_bulk_mode():
+    """
+    Shows the session's properties in an editable grid and commits the
+    accepted and rejected rows together.
+    """
+    st.markdown("### Bulk Review")
+    ids = session.ids()
+    if not ids:
+        st.info("🎉 No properties left to validate!")
+        return
+
+    rows = pd.DataFrame([session.get(pid).to_dict() for pid in ids])
+    grid = rows[["property_id", "listing_urls", "anomaly_reasons"] + [c for c in EDITABLE_COLUMNS if c in rows.columns]].copy()
+    grid.insert(0, "action", "Accept")
+
+    # One editor per bulk page; the key only changes after a commit
+    grid_key = f"bulk_grid_{st.session_state.setdefault('bulk_page', 0)}"
+    # Pending choices are kept by property_id, so rows leaving or joining the
+    # page (lost leases, top-ups) don't lose or shuffle the reviewer's edits
+    choices = st.session_state.get("bulk_choices", {})
+    if st.session_state.get("bulk_grid_ids") != ids:
+        # The editor tracks edits by row position; rebuild it from `choices` instead
+        st.session_state.pop(grid_key, None)
+        st.session_state.bulk_grid_ids = ids
+    for position, property_id in enumerate(grid["property_id"]):
+        for field, value in choices.get(property_id, {}).items():
+            grid.at[position, field] = value
+
+    edited = st.data_editor(
+        grid,
+        key=grid_key,
+        hide_index=True,
+        use_container_width=True,
+        disabled=["property_id", "listing_urls", "anomaly_reasons"],
+        column_config={
+            "action": st.column_config.SelectboxColumn(
+                "Action", options=["Accept", "Reject", "Skip"], required=True,
+                help="Accept validates the row with any edits, Reject deletes it, Skip leaves it queued",
+            ),
+            "listing_urls": st.column_config.LinkColumn("Listing"),
+            "anomaly_reasons": st.column_config.TextColumn("Flags"),
+        },
+    )
+
+    st.session_state.bulk_choices = {row["property_id"]: row for row in edited.to_dict("records")}
+
+    accepted = edited[edited["action"] == "Accept"]
+    rejected = edited[edited["action"] == "Reject"]
+    st.caption(f"{len(accepted)} to accept, {len(rejected)} to reject, "
+               f"{len(edited) - len(accepted) - len(rejected)} to skip")
+
+    if not user:
+        st.warning("Enter your name to commit validations")
+        return
+
+    if st.button(f"Commit {len(accepted) + len(rejected)} properties", type="primary",
+                 disabled=accepted.empty and rejected.empty):
+        # Leases can be lost while the grid is open; never commit rows someone else now holds
+        lost = set(drop_lost_leases())
+        if lost:
+            st.toast(f"{len(lost)} propert{'y' if len(lost) == 1 else 'ies'} left this page before "
+                       f"committing and {'was' if len(lost) == 1 else 'were'} not saved")
+            accepted = accepted[~accepted["property_id"].isin(lost)]
+            rejected = rejected[~rejected["property_id"].isin(lost)]
+            edited = edited[~edited["property_id"].isin(lost)]
+        rejected_ids = rejected["property_id"].tolist()
+        if rejected_ids:
+            try:
+                storage.delete_properties(rejected_ids)
+            except Exception as e:
+                st.error(f"Error deleting properties: {str(e)}")
+                return
+
+        # Accepted rows (with their edits) go out together in one MERGE
+        validation_queue.enqueue_many(user, [
+            (row["property_id"], session.original(row["property_id"]),
+             {field: row[field] for field in EDITABLE_COLUMNS if field in row})
+            for row in accepted.to_dict("records")
+        ], flush_now=True)
+
+        # Edits to skipped rows stay with this session for the next page
+        for row in edited[edited["action"] == "Skip"].to_dict("records"):
+            session.edit(row["property_id"], diff_fields(
+                session.original(row["property_id"]),
+                {field: row[field] for field in EDITABLE_COLUMNS if field in row},
+            ))
+
+        done = set(accepted["property_id"]) | set(rejected_ids)
+        # The lease manager and prefetcher drop these via the invalidation bus
+        for property_id in done:
+            session.complete(property_id)
+        st.session_state.bulk_page += 1
+        st.session_state.pop("bulk_choices", None)
+        st.rerun()
+
+# Upcoming properties are prepared in the background so moving on is a cache hit
+PREFETCH_DEPTH = 3
+mapbox_token = st.secrets["MAPBOX_TOKEN"] or os.getenv("MAPBOX_TOKEN")
+prefetcher = get_prefetcher()
+
+# Listings are captured ahead of time and shown as images; the live page is opt-in
+snapshot_mode = st.sidebar.toggle(
+    "Listing snapshots",
+    value=True,
+    key="snapshot_mode",
+    help="Show pre-captured images of listings instead of loading each site live",
+)
+snapshotter = get_listing_snapshotter() if snapshot_mode else None
+
+# Advance to the property queued up by the last validate/skip
+if 'next_property' in st.session_state:
+    st.session_state.selected_property = st.session_state.pop('next_property')
+
+def queue_next_property(current):
+    """
+    Selects the property after `current` on the next rerun.
+    """
+    following = session.next_after(current)
+    if following is not None:
+        st.session_state.next_property = following
+
+if bulk_mode:
+    render_bulk_mode()
+    st.stop()
 
 # Display rows
-if st.session_state.available_property_ids:
+if session:
     # Create three columns with custom ratios
     col1, col2 = st.columns([2, 3])
     
@@ -66,106 +262,96 @@ if st.session_state.available_property_ids:
         st.markdown("### Properties to Validate")
         selected_property = st.selectbox(
             "Select property to validate:",
-            st.session_state.available_property_ids,
+            session.ids(),
             help="Choose a property to validate",
             index=None,
-            placeholder="Choose a property..."
+            placeholder="Choose a property...",
+            key="selected_property"
         )
+
+        upcoming = session.following(selected_property, PREFETCH_DEPTH)
+        prefetcher.prefetch(upcoming, mapbox_token)
+        if snapshotter:
+            # Current listing first, then the rest of the queue in order
+            queued = ([session.original(selected_property)] if selected_property else []) \
+                + session.following(selected_property, len(session))
+            snapshotter.capture_ahead(row.get('listing_urls') for row in queued)
         
         # Display individual inputs for the selected property
         if selected_property:
             st.markdown("### Property Details")
-            selected_row = st.session_state.properties_data[
-                st.session_state.properties_data['property_id'] == selected_property
-            ].iloc[0]
+            prepared = prefetcher.get(session.original(selected_property), mapbox_token)
+            # Show any edits made before this property was skipped
+            selected_row = session.get(selected_property)
+            if selected_row.get('anomaly_reasons'):
+                st.warning(f"Flagged for review: {selected_row['anomaly_reasons'].replace('_', ' ')}")
+
+            # Community inferred from the coordinates, without a geo table lookup
+            community_index = get_community_index()
+            nearest = community_index.assign([selected_row.get('latitude')], [selected_row.get('longitude')]).iloc[0]
+            if nearest['community'] is not None:
+                st.caption(f"📍 {nearest['community']}, {nearest['parish']} ({nearest['distance_km']:.1f} km from its centre)")
+            else:
+                st.caption(f"📍 No known community within {community_index.max_distance_km:g} km")
             
             # Create inputs for each column (except property_id)            
             price = st.number_input(
                 "Price",
-                value=float(selected_row['price']) if 'price' in selected_row else 0.0,
+                value=float(selected_row['price']) if pd.notna(selected_row.get('price')) else 0.0,
                 key="price"
             )
             
             sqft = st.number_input(
                 "Square Feet",
-                value=float(selected_row['sqft']) if 'sqft' in selected_row else 0.0,
+                value=float(selected_row['sqft']) if pd.notna(selected_row.get('sqft')) else 0.0,
                 key="sqft"
             )
             
             rooms = st.number_input(
                 "Rooms",
-                value=int(selected_row['rooms']) if 'rooms' in selected_row and not pd.isna(selected_row['rooms']) else 0,
+                value=int(selected_row['rooms']) if pd.notna(selected_row.get('rooms')) else 0,
                 key="rooms"
             )
             
             bathroom = st.number_input(
                 "Bathrooms",
-                value=float(selected_row['bathroom']) if 'bathroom' in selected_row and not pd.isna(selected_row['bathroom']) else 0.0,
+                value=float(selected_row['bathroom']) if pd.notna(selected_row.get('bathroom')) else 0.0,
                 key="bathroom"
             )
             
             property_type = st.text_input(
                 "Property Type",
-                value=selected_row['property_type'] if 'property_type' in selected_row else "",
+                value=selected_row['property_type'] if pd.notna(selected_row.get('property_type')) else "",
                 key="property_type"
             )
             
             latitude = st.number_input(
                 "Latitude",
-                value=float(selected_row['latitude']) if 'latitude' in selected_row else 0.0,
+                value=float(selected_row['latitude']) if pd.notna(selected_row.get('latitude')) else 0.0,
                 format="%.6f",
                 key="latitude"
             )
             
             longitude = st.number_input(
                 "Longitude",
-                value=float(selected_row['longitude']) if 'longitude' in selected_row else 0.0,
+                value=float(selected_row['longitude']) if pd.notna(selected_row.get('longitude')) else 0.0,
                 format="%.6f",
                 key="longitude"
             )
             
             aes_score = st.number_input(
                 "Aes Score",
-                value=float(selected_row['aes_score']) if 'aes_score' in selected_row else 0.0,
+                value=float(selected_row['aes_score']) if pd.notna(selected_row.get('aes_score')) else 0.0,
                 key="aes_score"
             )
             
-            if not pd.isna(selected_row['latitude']) and not pd.isna(selected_row['longitude']):
+            if prepared["deck"] is not None:
                 st.markdown("### Property Location")
-                map_data = pd.DataFrame({
-                    'lat': [selected_row['latitude']],
-                    'lon': [selected_row['longitude']],
-                    'property': [f"{selected_row['property_id']} {selected_row['property_type']} {selected_row['rooms']} {selected_row['bathroom']} {selected_row['sqft']} {selected_row['aes_score']} - ${selected_row['price']:,.2f}"]
-                })
-                
-                view_state = pdk.ViewState(
-                    latitude=selected_row['latitude'],
-                    longitude=selected_row['longitude'],
-                    zoom=15,
-                    pitch=0
-                )
-
-                # Create the deck
-                deck = pdk.Deck(
-                    map_style='mapbox://styles/mapbox/satellite-streets-v12',
-                    initial_view_state=view_state,
-                    api_keys={'mapbox': st.secrets["MAPBOX_TOKEN"] or os.getenv("MAPBOX_TOKEN")},
-                    layers=[
-                        pdk.Layer(
-                            'ScatterplotLayer',
-                            data=map_data,
-                            get_position='[lon, lat]',
-                            get_color='[255, 0, 0, 160]',
-                            get_radius=50,
-                            pickable=True,
-                            auto_highlight=True,
-                            get_tooltip='property'
-                        )
-                    ],
-                    tooltip={"text": "{property}"}
-                )
-
-                st.pydeck_chart(deck)
+                # The static thumbnail is rendered ahead of time from locally cached tiles
+                if prepared["thumbnail"] and not st.toggle("Interactive map", key="interactive_map"):
+                    st.image(prepared["thumbnail"], use_container_width=True)
+                else:
+                    st.pydeck_chart(prepared["deck"])
         
         # Add some spacing
         st.markdown("<br>", unsafe_allow_html=True)
@@ -174,11 +360,27 @@ if st.session_state.available_property_ids:
         # Property Viewer Section
         st.markdown("### Property Viewer")
         if selected_property:
-            selected_url = st.session_state.properties_data[
-                st.session_state.properties_data['property_id'] == selected_property
-            ]['listing_urls'].iloc[0]
-            if selected_url:
-                iframe_html = f'<iframe src="{selected_url}" width="100%" height="800" frameborder="0"></iframe>'
+            selected_url = selected_row.get('listing_urls')
+            listing = prepared["listing"]
+            snapshot = snapshotter.get(selected_url) if snapshotter and selected_url else None
+            show_live = not snapshotter or st.toggle("Load live page", key=f"live_{selected_property}")
+            if not show_live:
+                if snapshot:
+                    st.image(snapshot, use_container_width=True)
+                elif selected_url in snapshotter.failures:
+                    st.warning("Couldn't capture this listing. Load the live page to view it.")
+                else:
+                    st.info("Capturing this listing in the background. Load the live page to view it now.")
+                if selected_url:
+                    st.link_button("Open listing in a new tab", selected_url)
+            elif listing is not None and not listing["embeddable"]:
+                st.warning("This site doesn't allow embedding.")
+                st.link_button("Open listing in a new tab", selected_url)
+            elif selected_url:
+                # Let the browser warm its cache with the next listing while this one is reviewed
+                next_url = upcoming[0].get('listing_urls') if upcoming else None
+                prefetch_html = f'<link rel="prefetch" href="{next_url}">' if next_url else ""
+                iframe_html = f'{prefetch_html}<iframe src="{selected_url}" width="100%" height="800" frameborder="0"></iframe>'
                 st.components.v1.html(iframe_html, height=800)
         else:
             # Placeholder when no property is selected
@@ -193,27 +395,53 @@ if st.session_state.available_property_ids:
                 col1, col2, col3 = st.columns(3)
                 with col1:
                     if st.button("✓ Validate Property", type="primary"):
-                        update_validation(client, [selected_property], user)
+                        validation_queue.enqueue(
+                            selected_property,
+                            user,
+                            original=session.original(selected_property),
+                            edited={
+                                "price": price,
+                                "sqft": sqft,
+                                "rooms": rooms,
+                                "bathroom": bathroom,
+                                "property_type": property_type,
+                                "latitude": latitude,
+                                "longitude": longitude,
+                                "aes_score": aes_score,
+                            },
+                        )
                         # Remove the validated property from the list
-                        st.session_state.available_property_ids.remove(selected_property)
+                        queue_next_property(selected_property)
+                        session.complete(selected_property)
                         st.rerun()
                 with col2:
                     if st.button("Skip Property", type="secondary"):
-                        # Move the skipped property to the end of the list
-                        st.session_state.available_property_ids.remove(selected_property)
-                        st.session_state.available_property_ids.append(selected_property)
+                        # Keep the edits so far, then move the property to the end of the list
+                        session.edit(selected_property, diff_fields(session.original(selected_property), {
+                            "price": price,
+                            "sqft": sqft,
+                            "rooms": rooms,
+                            "bathroom": bathroom,
+                            "property_type": property_type,
+                            "latitude": latitude,
+                            "longitude": longitude,
+                            "aes_score": aes_score,
+                        }))
+                        queue_next_property(selected_property)
+                        session.skip(selected_property)
                         st.rerun()
                 with col3:
                     if st.button("Delete Property", type="secondary"):
-                        if delete_property(client, selected_property):
-                            st.session_state.available_property_ids.remove(selected_property)
+                        if storage.delete_property(selected_property):
+                            queue_next_property(selected_property)
+                            session.complete(selected_property)
                             st.rerun()
         
         # Show validation stats
     st.markdown("<br>", unsafe_allow_html=True)
     st.markdown("### Validation Progress")
-    total = len(st.session_state.properties_data)
-    remaining = len(st.session_state.available_property_ids)
+    total = session.claimed
+    remaining = len(session)
     validated = total - remaining
     st.progress(validated/total if total > 0 else 0)
     st.text(f"{validated}/{total} properties validated")
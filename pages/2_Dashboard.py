@@ -2,11 +2,21 @@ import streamlit as st
 import os
 from google.cloud import bigquery
 from google.oauth2 import service_account
-from utils.bigquery_utils import summary_query, fetch_data_all, create_bigquery_client
+from utils.bigquery_utils import (
+    client_pool_stats, fetch_filter_options, DASHBOARD_COLUMNS,
+)
+from utils.storage_backends import get_storage_backend
+from utils.query_executor import submit_all
+from utils.incremental_loader import fetch_data_all_incremental
+from utils.community_index import get_community_index
+from utils.freshness_cache import get_dashboard_cache
+from utils.filter_index import get_filter_index
+from utils import dashboard_aggregates as agg
 from dotenv import load_dotenv
 import pandas as pd
 import pydeck as pdk
 import plotly.express as px
+import plotly.graph_objects as go
 
 # Page configuration
 st.set_page_config(
@@ -61,50 +71,112 @@ st.markdown("""
 
 load_dotenv()
 
-# Initialize BigQuery client with project ID
-client = create_bigquery_client()
+# BigQuery, or the embedded SQLite backend when STORAGE_BACKEND=sqlite
+storage = get_storage_backend()
+# Pushdown filtering and in-warehouse aggregates are BigQuery-only
+client = storage.client if storage.name == "bigquery" else None
+
+# Query results are shared across reruns and sessions until the tables change
+dashboard_cache = get_dashboard_cache(storage)
+
+def cached(fn, *args):
+    """
+    Runs `fn(*args)` through the Dashboard cache. The result is shared, so don't modify it.
+    """
+    return dashboard_cache.get((fn.__qualname__, repr(args)), lambda: fn(*args))
 
 # Header
 st.title("📍 Training Data Dashboard")
 st.markdown("---")
 
-# Summary Dashboard in columns
-col1, col2, col3 = st.columns(3)
-summary = summary_query(client)
-
-with col1:
-    st.metric(
-        "📊 Total Rows",
-        f"{summary['total_rows'].iloc[0]:,}",
-        delta=None,
-        help="Total number of records in the database"
-    )
-
-with col2:
-    validated_pct = (summary['validated_rows'].iloc[0] / summary['total_rows'].iloc[0]) * 100
-    st.metric(
-        "✅ Validated Rows",
-        f"{summary['validated_rows'].iloc[0]:,}",
-        f"{validated_pct:.1f}%",
-        help="Number of validated records"
-    )
-
-with col3:
-    unvalidated_pct = (summary['unvalidated_rows'].iloc[0] / summary['total_rows'].iloc[0]) * 100
-    st.metric(
-        "⏳ Unvalidated Rows",
-        f"{summary['unvalidated_rows'].iloc[0]:,}",
-        f"{unvalidated_pct:.1f}%",
-        help="Number of records pending validation"
-    )
+# Small tables are kept locally and filtered in memory; larger ones push the
+# filters and column list down to BigQuery so only the displayed rows are read
+DASHBOARD_LOCAL_MAX_ROWS = int(st.secrets.get("DASHBOARD_LOCAL_MAX_ROWS") or os.getenv("DASHBOARD_LOCAL_MAX_ROWS") or 250000)
+use_local_dataset = client is None or storage.row_count() <= DASHBOARD_LOCAL_MAX_ROWS
+
+if client is None:
+    dataset_call = (cached, storage.fetch_data_all, DASHBOARD_COLUMNS)
+elif use_local_dataset:
+    # The incremental loader keeps its own copy up to date
+    dataset_call = (fetch_data_all_incremental, client)
+else:
+    dataset_call = (cached, fetch_filter_options, client)
+
+# Independent queries start together; each section only waits for its own result
+startup = submit_all({
+    "summary": (cached, storage.summary_query),
+    "communities": (storage.fetch_communities,),
+    "dataset": dataset_call,
+})
+
+def render_summary(slot, summary):
+    with slot.container():
+        col1, col2, col3 = st.columns(3)
+
+        with col1:
+            st.metric(
+                "📊 Total Rows",
+                f"{summary['total_rows'].iloc[0]:,}",
+                delta=None,
+                help="Total number of records in the database"
+            )
+
+        with col2:
+            validated_pct = (summary['validated_rows'].iloc[0] / summary['total_rows'].iloc[0]) * 100
+            st.metric(
+                "✅ Validated Rows",
+                f"{summary['validated_rows'].iloc[0]:,}",
+                f"{validated_pct:.1f}%",
+                help="Number of validated records"
+            )
+
+        with col3:
+            unvalidated_pct = (summary['unvalidated_rows'].iloc[0] / summary['total_rows'].iloc[0]) * 100
+            st.metric(
+                "⏳ Unvalidated Rows",
+                f"{summary['unvalidated_rows'].iloc[0]:,}",
+                f"{unvalidated_pct:.1f}%",
+                help="Number of records pending validation"
+            )
+
+# Summary Dashboard in columns, filled in as soon as its query returns
+summary_slot = st.empty()
+summary_rendered = startup["summary"].done()
+if summary_rendered:
+    render_summary(summary_slot, startup["summary"].result())
+else:
+    summary_slot.info("⏳ Loading summary...")
 
 # Map section
 st.markdown("---")
 st.subheader("📍 Location Distribution")
 st.markdown("Interactive map showing the geographical distribution of all points")
 
-# Create map with expanded height
-df = fetch_data_all(client)
+# Properties without a geo row get the nearest community from the bundled CSV
+infer_communities = st.toggle(
+    "Infer missing communities from coordinates",
+    value=True,
+    help="Assign the nearest known community (within a few km) to properties that have none",
+)
+
+if use_local_dataset:
+    # Only rows changed since the last load are fetched; the result is shared, so filter on copies
+    df = startup["dataset"].result()
+    if infer_communities:
+        df = get_community_index().fill_missing_shared(df)
+    filter_options = {
+        "property_types": sorted(df['property_type'].unique().tolist()),
+        # Filter out None values and then sort
+        "communities": sorted([x for x in df['community'].unique() if x is not None]),
+        "price": (df['price'].min(), df['price'].max()),
+        "rooms": (df['rooms'].min(), df['rooms'].max()),
+        "sqft": (df['sqft'].min(), df['sqft'].max()),
+    }
+else:
+    filter_options = startup["dataset"].result()
+
+if not summary_rendered:
+    render_summary(summary_slot, startup["summary"].result())
 
 # Add filters in columns
 st.markdown("### 🔍 Filters")
@@ -112,13 +184,13 @@ filter_col1, filter_col2, filter_col3, filter_col4 = st.columns(4)
 
 with filter_col1:
     # Property type filter
-    property_types = ['All'] + sorted(df['property_type'].unique().tolist())
+    property_types = ['All'] + filter_options["property_types"]
     selected_type = st.selectbox('Property Type', property_types)
 
 with filter_col2:
     # Price range filter
-    min_price = int(df['price'].min())
-    max_price = int(df['price'].max())
+    min_price = int(filter_options["price"][0])
+    max_price = int(filter_options["price"][1])
     price_range = st.slider(
         'Price Range',
         min_value=min_price,
@@ -129,8 +201,8 @@ with filter_col2:
 
 with filter_col3:
     # Rooms filter
-    min_rooms = int(df['rooms'].min())
-    max_rooms = int(df['rooms'].max())
+    min_rooms = int(filter_options["rooms"][0])
+    max_rooms = int(filter_options["rooms"][1])
     rooms_range = st.slider(
         'Number of Rooms',
         min_value=min_rooms,
@@ -140,8 +212,8 @@ with filter_col3:
 
 with filter_col4:
     # Square footage filter
-    min_sqft = int(df['sqft'].min())
-    max_sqft = int(df['sqft'].max())
+    min_sqft = int(filter_options["sqft"][0])
+    max_sqft = int(filter_options["sqft"][1])
     sqft_range = st.slider(
         'Square Footage',
         min_value=min_sqft,
@@ -149,36 +221,87 @@ with filter_col4:
         value=(min_sqft, max_sqft)
     )
     
-# Filter out None values and then sort
-communities = ['All'] + sorted([x for x in df['community'].unique() if x is not None])
+communities = ['All'] + filter_options["communities"]
 selected_community = st.selectbox('Community', communities)
 
+# A slider left at its full bounds doesn't filter, so rows missing that value stay in
+range_filters = {
+    "price": None if price_range == (min_price, max_price) else price_range,
+    "rooms": None if rooms_range == (min_rooms, max_rooms) else rooms_range,
+    "sqft": None if sqft_range == (min_sqft, max_sqft) else sqft_range,
+}
+
 # Apply filters
-filtered_df = df.copy()
-if selected_type != 'All':
-    filtered_df = filtered_df[filtered_df['property_type'] == selected_type]
-if selected_community != 'All':
-    filtered_df = filtered_df[filtered_df['community'] == selected_community]
-filtered_df = filtered_df[
-    (filtered_df['price'] >= price_range[0]) &
-    (filtered_df['price'] <= price_range[1]) &
-    (filtered_df['rooms'] >= rooms_range[0]) &
-    (filtered_df['rooms'] <= rooms_range[1])
-]
+if use_local_dataset:
+    # Indexed once per dataset version and community variant; only the matching rows are copied
+    positions = get_filter_index(
+        df, dashboard_cache.fingerprint(), variant="inferred" if infer_communities else "raw"
+    ).positions(
+        ranges=range_filters,
+        categories={
+            "property_type": None if selected_type == 'All' else selected_type,
+            "community": None if selected_community == 'All' else selected_community,
+        },
+    )
+    filtered_df = df.iloc[positions]
+    filtered_count = len(filtered_df)
+    use_aggregates = False
+else:
+    filters = {
+        "property_type": None if selected_type == 'All' else selected_type,
+        "community": None if selected_community == 'All' else selected_community,
+        **range_filters,
+    }
+    # Above this many matching rows, charts are computed in BigQuery and only
+    # the aggregate frames (plus a small sample for scatter plots) are downloaded
+    DASHBOARD_AGGREGATE_MIN_ROWS = int(st.secrets.get("DASHBOARD_AGGREGATE_MIN_ROWS") or os.getenv("DASHBOARD_AGGREGATE_MIN_ROWS") or 100000)
+    filtered_count = cached(agg.count_rows, client, filters)
+    use_aggregates = filtered_count > DASHBOARD_AGGREGATE_MIN_ROWS
+    if use_aggregates:
+        # Every chart's aggregate runs concurrently; tabs block only on their own results
+        aggregates = submit_all({name: (cached, *call) for name, call in {
+            "sample": (agg.sample_rows, client, filters, DASHBOARD_COLUMNS),
+            "map_grid": (agg.map_grid, client, filters),
+            "community_counts": (agg.value_counts, client, filters, ['community']),
+            "community_type_counts": (agg.value_counts, client, filters, ['community', 'property_type']),
+            "type_counts": (agg.value_counts, client, filters, ['property_type']),
+            "means_by_type": (agg.group_means, client, filters, 'property_type', ['price', 'sqft', 'rooms']),
+            "price_by_type": (agg.quantiles, client, filters, 'price', 'property_type'),
+            "correlations": (agg.correlations, client, filters, ['price', 'rooms', 'bathroom', 'sqft']),
+            **{f"{column}_hist": (agg.histogram, client, filters, column) for column in ('rooms', 'bathroom', 'sqft')},
+            **{f"{column}_quantiles": (agg.quantiles, client, filters, column) for column in ('rooms', 'bathroom', 'sqft')},
+            **{f"price_by_{column}": (agg.quantiles, client, filters, 'price', column) for column in ('rooms', 'bathroom')},
+        }.items()})
+        filtered_df = aggregates["sample"].result()
+    else:
+        filtered_df = cached(storage.fetch_data_all, DASHBOARD_COLUMNS, filters)
+        if infer_communities:
+            filtered_df = get_community_index().fill_missing(filtered_df)
 
 # Show number of filtered results
-st.markdown(f"### Showing {len(filtered_df):,} properties")
+st.markdown(f"### Showing {filtered_count:,} properties")
+if "community_inferred" in filtered_df.columns and filtered_df["community_inferred"].any():
+    st.caption(f"{int(filtered_df['community_inferred'].sum()):,} communities inferred from coordinates.")
+if use_aggregates:
+    st.caption(f"Charts are aggregated in BigQuery; scatter plots show a sample of {len(filtered_df):,} rows.")
+
+if use_aggregates:
+    # One point per ~100m grid cell instead of one per property
+    map_df = aggregates["map_grid"].result()
+    map_df = map_df.assign(tooltip=map_df.apply(lambda row: f"Properties: {row['count']:,}<br>"
+                                                            f"Avg Price: ${row['avg_price']:,.2f}", axis=1))
+else:
+    # Create tooltip text
+    filtered_df = filtered_df.assign(tooltip=filtered_df.apply(lambda row: f"Type: {row['property_type']}<br>"
+                                                                           f"Price: ${row['price']:,.2f}<br>"
+                                                                           f"Rooms: {row['rooms']}<br>"
+                                                                           f"Bathrooms: {row['bathroom']}<br>"
+                                                                           f"Sqft: {row['sqft']:,.0f}", axis=1))
+    map_df = filtered_df
 
 # Calculate the center point for the map view
-center_lat = filtered_df['latitude'].mean()
-center_lon = filtered_df['longitude'].mean()
-
-# Create tooltip text
-filtered_df['tooltip'] = filtered_df.apply(lambda row: f"Type: {row['property_type']}<br>"
-                                                     f"Price: ${row['price']:,.2f}<br>"
-                                                     f"Rooms: {row['rooms']}<br>"
-                                                     f"Bathrooms: {row['bathroom']}<br>"
-                                                     f"Sqft: {row['sqft']:,.0f}", axis=1)
+center_lat = map_df['latitude'].mean()
+center_lon = map_df['longitude'].mean()
 
 # Configure the map view
 view_state = pdk.ViewState(
@@ -191,7 +314,7 @@ view_state = pdk.ViewState(
 # Create the scatter plot layer
 layer = pdk.Layer(
     'ScatterplotLayer',
-    data=filtered_df,
+    data=map_df,
     get_position='[longitude, latitude]',
     get_color='[200, 30, 0, 160]',
     get_radius=100,
@@ -222,332 +345,482 @@ st.subheader("📊 Data Distribution Analysis")
 # Create tabs for each predictor
 tabs = st.tabs(["Communities", "Rooms", "Bathrooms", "Square Footage", "Property Type", "Correlations"])
 
-# Communities Tab
-with tabs[0]:
-    st.markdown("### Community Analysis")
-    # Replace CSV reading with a BigQuery query
-    query = """
-        SELECT * FROM `price-aggregator-f9e4b.aggregated_prices.communities`
+communities_df = startup["communities"].result()
+
+def precomputed_box(summary, title, x=None, y_label=None):
+    """
+    Builds a box plot from a five-number summary computed in BigQuery.
+    """
+    fig = go.Figure(go.Box(
+        x=summary[x] if x else None,
+        q1=summary['q1'],
+        median=summary['median'],
+        q3=summary['q3'],
+        lowerfence=summary['min'],
+        upperfence=summary['max'],
+        name=y_label or "",
+    ))
+    fig.update_layout(title=title, template='plotly_white', xaxis_title=x, yaxis_title=y_label)
+    return fig
+
+def binned_histogram(bins, column, title):
+    """
+    Builds a histogram from bins computed in BigQuery.
     """
-    communities_df = client.query(query).to_dataframe()
-    communities_df.columns = communities_df.columns.str.lower()
-    col1, col2 = st.columns(2)
-    with col1:
-        # table of communities in training data
-        communities = filtered_df['community'].value_counts().reset_index()
-        communities.columns = communities.columns.str.lower()
-        st.dataframe(communities, use_container_width=True, hide_index=True)
+    bins = bins.assign(**{column: (bins['bin_start'] + bins['bin_end']) / 2})
+    fig = px.bar(bins, x=column, y='count', title=title, template='plotly_white')
+    fig.update_traces(width=(bins['bin_end'] - bins['bin_start']).tolist())
+    fig.update_layout(showlegend=False, bargap=0)
+    return fig
+
+if use_aggregates:
+    # Communities Tab
+    with tabs[0]:
+        st.markdown("### Community Analysis")
+        col1, col2 = st.columns(2)
+        communities = aggregates["community_counts"].result()
+        property_types_by_community = aggregates["community_type_counts"].result()
+        with col1:
+            # table of communities in training data
+            st.dataframe(communities, use_container_width=True, hide_index=True)
+            st.dataframe(property_types_by_community.pivot(index='community', columns='property_type', values='count').fillna(0).reset_index(), use_container_width=True)
+
+            # Find communities that are in the authoritative list but missing from training data
+            auth_communities = {str(x).lower().strip() for x in communities_df['community'].unique() if pd.notna(x)}
+            training_communities = {str(x).lower().strip() for x in communities['community'] if pd.notna(x)}
+            missing_from_training = auth_communities - training_communities
+
+            st.markdown("### Communities missing from training data")
+            st.markdown(f"Found {len(missing_from_training)} communities in the authoritative list that are not in the training data:")
+            missing_df = pd.DataFrame(sorted(missing_from_training), columns=['Missing Communities'])
+            st.dataframe(missing_df, use_container_width=True, hide_index=True)
+
+        with col2:
+            fig_communities = px.bar(communities, x='community', y='count', title='Community Distribution', template='plotly_white')
+            st.plotly_chart(fig_communities, use_container_width=True, key='communities_chart')
+            fig_property_types = px.bar(
+                property_types_by_community,
+                x='community',
+                y='count',
+                color='property_type',
+                title='Number of Property Types by Community',
+                template='plotly_white',
+                barmode='stack'
+            )
+            st.plotly_chart(fig_property_types, use_container_width=True, key='property_types_chart')
+
+    # Rooms, Bathrooms and Square Footage tabs share the same layout
+    numeric_tabs = [
+        (tabs[1], 'rooms', 'Rooms', 'Number of Rooms', 'rooms'),
+        (tabs[2], 'bathroom', 'Bathrooms', 'Number of Bathrooms', 'bath'),
+        (tabs[3], 'sqft', 'Square Footage', 'Square Footage', 'sqft'),
+    ]
+    for tab, column, label, long_label, key in numeric_tabs:
+        with tab:
+            st.markdown(f"### {label} Analysis")
+            hist_col, box_col = st.columns(2)
+            with hist_col:
+                st.plotly_chart(binned_histogram(aggregates[f"{column}_hist"].result(), column, f'Distribution of {label}'),
+                                use_container_width=True, key=f'{key}_hist')
+            with box_col:
+                st.plotly_chart(precomputed_box(aggregates[f"{column}_quantiles"].result(), f'Box Plot of {label}', y_label=column),
+                                use_container_width=True, key=f'{key}_box')
+
+            st.markdown(f"### {label} vs Price")
+            scatter_col, price_box_col = st.columns(2)
+            with scatter_col:
+                fig_scatter = px.scatter(
+                    filtered_df,
+                    x=column,
+                    y='price',
+                    title=f'Price vs {label} (sample)',
+                    template='plotly_white',
+                    trendline="ols"
+                )
+                st.plotly_chart(fig_scatter, use_container_width=True, key=f'{key}_price_scatter')
+            with price_box_col:
+                if column == 'sqft':
+                    price_summary = aggregates["price_by_type"].result()
+                    fig_price_box = precomputed_box(price_summary, 'Price Distribution by Property Type', x='property_type', y_label='price')
+                    fig_price_box.update_xaxes(tickangle=45)
+                else:
+                    price_summary = aggregates[f"price_by_{column}"].result()
+                    fig_price_box = precomputed_box(price_summary, f'Price Distribution by {long_label}', x=column, y_label='price')
+                st.plotly_chart(fig_price_box, use_container_width=True, key=f'{key}_price_box')
+
+    # Property Type Tab
+    with tabs[4]:
+        st.markdown("### Property Type Analysis")
+        type_counts = aggregates["type_counts"].result()
+        prop_col1, prop_col2 = st.columns(2)
+        with prop_col1:
+            fig_prop_count = px.bar(
+                type_counts,
+                x='property_type',
+                y='count',
+                title='Distribution of Property Types',
+                template='plotly_white',
+                labels={'property_type': 'Property Type', 'count': 'Count'}
+            )
+            fig_prop_count.update_xaxes(tickangle=45)
+            st.plotly_chart(fig_prop_count, use_container_width=True, key='prop_count')
+        with prop_col2:
+            fig_prop_pie = px.pie(type_counts, values='count', names='property_type', title='Property Type Distribution (%)', template='plotly_white')
+            st.plotly_chart(fig_prop_pie, use_container_width=True, key="property_type_pie")
+
+        st.markdown("### Property Type vs Price")
+        means_by_type = aggregates["means_by_type"].result()
+        prop_price_col1, prop_price_col2 = st.columns(2)
+        with prop_price_col1:
+            price_summary = aggregates["price_by_type"].result()
+            fig_price_by_type = precomputed_box(price_summary, 'Price Distribution by Property Type', x='property_type', y_label='price')
+            fig_price_by_type.update_xaxes(tickangle=45)
+            st.plotly_chart(fig_price_by_type, use_container_width=True, key='prop_price_box')
+        with prop_price_col2:
+            fig_avg_price = px.bar(means_by_type, x='property_type', y='price', title='Average Price by Property Type',
+                                   template='plotly_white', labels={'property_type': 'Property Type', 'price': 'Average Price'})
+            fig_avg_price.update_xaxes(tickangle=45)
+            st.plotly_chart(fig_avg_price, use_container_width=True, key='prop_avg_price')
+
+        st.markdown("### Property Type Relationships")
+        prop_rel_col1, prop_rel_col2 = st.columns(2)
+        with prop_rel_col1:
+            fig_avg_sqft = px.bar(means_by_type, x='property_type', y='sqft', title='Average Square Footage by Property Type',
+                                  template='plotly_white', labels={'property_type': 'Property Type', 'sqft': 'Average Square Footage'})
+            fig_avg_sqft.update_xaxes(tickangle=45)
+            st.plotly_chart(fig_avg_sqft, use_container_width=True, key='prop_avg_sqft')
+        with prop_rel_col2:
+            fig_avg_rooms = px.bar(means_by_type, x='property_type', y='rooms', title='Average Number of Rooms by Property Type',
+                                   template='plotly_white', labels={'property_type': 'Property Type', 'rooms': 'Average Rooms'})
+            fig_avg_rooms.update_xaxes(tickangle=45)
+            st.plotly_chart(fig_avg_rooms, use_container_width=True, key='prop_avg_rooms')
+
+    # Correlations Tab
+    with tabs[5]:
+        st.markdown("### Feature Correlations")
+        correlation_matrix = aggregates["correlations"].result()
+        fig_corr = px.imshow(
+            correlation_matrix,
+            title='Correlation Heatmap',
+            template='plotly_white',
+            color_continuous_scale='RdBu',
+            aspect='auto'
+        )
+        st.plotly_chart(fig_corr, use_container_width=True, key='correlation_heatmap')
+
+else:
+    # Communities Tab
+    with tabs[0]:
+        st.markdown("### Community Analysis")
+        col1, col2 = st.columns(2)
+        with col1:
+            # table of communities in training data
+            communities = filtered_df['community'].value_counts().reset_index()
+            communities.columns = communities.columns.str.lower()
+            st.dataframe(communities, use_container_width=True, hide_index=True)
         
-        property_types_by_community = filtered_df.groupby(['community', 'property_type']).size().reset_index(name='count')
-        st.dataframe(property_types_by_community.pivot(index='community', columns='property_type', values='count').fillna(0).reset_index(), use_container_width=True)
+            property_types_by_community = filtered_df.groupby(['community', 'property_type']).size().reset_index(name='count')
+            st.dataframe(property_types_by_community.pivot(index='community', columns='property_type', values='count').fillna(0).reset_index(), use_container_width=True)
         
-        # Find communities that are in the authoritative list but missing from training data
-        # Normalize strings by converting to lowercase and stripping whitespace
-        auth_communities = {str(x).lower().strip() for x in communities_df['community'].unique() if pd.notna(x)}
-        training_communities = {str(x).lower().strip() for x in filtered_df['community'].unique() if pd.notna(x)}
-        missing_from_training = auth_communities - training_communities
+            # Find communities that are in the authoritative list but missing from training data
+            # Normalize strings by converting to lowercase and stripping whitespace
+            auth_communities = {str(x).lower().strip() for x in communities_df['community'].unique() if pd.notna(x)}
+            training_communities = {str(x).lower().strip() for x in filtered_df['community'].unique() if pd.notna(x)}
+            missing_from_training = auth_communities - training_communities
         
-        st.markdown("### Communities missing from training data")
-        st.markdown(f"Found {len(missing_from_training)} communities in the authoritative list that are not in the training data:")
-        missing_df = pd.DataFrame(sorted(missing_from_training), columns=['Missing Communities'])
-        st.dataframe(missing_df, use_container_width=True, hide_index=True)
+            st.markdown("### Communities missing from training data")
+            st.markdown(f"Found {len(missing_from_training)} communities in the authoritative list that are not in the training data:")
+            missing_df = pd.DataFrame(sorted(missing_from_training), columns=['Missing Communities'])
+            st.dataframe(missing_df, use_container_width=True, hide_index=True)
         
-    with col2:
-        # column chart of communities   
-        fig_communities = px.bar(
-            communities,
-            x='community',
-            y='count',
-            title='Community Distribution',
-            template='plotly_white'
-        )
-        st.plotly_chart(fig_communities, use_container_width=True, key='communities_chart')
+        with col2:
+            # column chart of communities   
+            fig_communities = px.bar(
+                communities,
+                x='community',
+                y='count',
+                title='Community Distribution',
+                template='plotly_white'
+            )
+            st.plotly_chart(fig_communities, use_container_width=True, key='communities_chart')
         
-        # Bar chart of Number of property types by community
-        property_types_by_community = filtered_df.groupby(['community', 'property_type']).size().reset_index(name='count')
-        fig_property_types = px.bar(
-            property_types_by_community,
-            x='community',
-            y='count',
-            color='property_type',
-            title='Number of Property Types by Community',
-            template='plotly_white',
-            barmode='stack'
-        )
-        st.plotly_chart(fig_property_types, use_container_width=True, key='property_types_chart')
-
-# Rooms Tab
-with tabs[1]:
-    st.markdown("### Room Analysis")
-    room_col1, room_col2 = st.columns(2)
+            # Bar chart of Number of property types by community
+            property_types_by_community = filtered_df.groupby(['community', 'property_type']).size().reset_index(name='count')
+            fig_property_types = px.bar(
+                property_types_by_community,
+                x='community',
+                y='count',
+                color='property_type',
+                title='Number of Property Types by Community',
+                template='plotly_white',
+                barmode='stack'
+            )
+            st.plotly_chart(fig_property_types, use_container_width=True, key='property_types_chart')
+
+    # Rooms Tab
+    with tabs[1]:
+        st.markdown("### Room Analysis")
+        room_col1, room_col2 = st.columns(2)
     
-    with room_col1:
-        # Univariate distribution of rooms
-        fig_rooms_hist = px.histogram(
-            filtered_df,
-            x='rooms',
-            title='Distribution of Rooms',
-            template='plotly_white'
-        )
-        fig_rooms_hist.update_layout(showlegend=False)
-        st.plotly_chart(fig_rooms_hist, use_container_width=True, key='rooms_hist')
+        with room_col1:
+            # Univariate distribution of rooms
+            fig_rooms_hist = px.histogram(
+                filtered_df,
+                x='rooms',
+                title='Distribution of Rooms',
+                template='plotly_white'
+            )
+            fig_rooms_hist.update_layout(showlegend=False)
+            st.plotly_chart(fig_rooms_hist, use_container_width=True, key='rooms_hist')
         
-    with room_col2:
-        # Box plot of rooms
-        fig_rooms_box = px.box(
-            filtered_df,
-            y='rooms',
-            title='Box Plot of Rooms',
-            template='plotly_white'
-        )
-        st.plotly_chart(fig_rooms_box, use_container_width=True, key='rooms_box')
+        with room_col2:
+            # Box plot of rooms
+            fig_rooms_box = px.box(
+                filtered_df,
+                y='rooms',
+                title='Box Plot of Rooms',
+                template='plotly_white'
+            )
+            st.plotly_chart(fig_rooms_box, use_container_width=True, key='rooms_box')
     
-    # Rooms vs Price
-    st.markdown("### Rooms vs Price")
-    room_price_col1, room_price_col2 = st.columns(2)
+        # Rooms vs Price
+        st.markdown("### Rooms vs Price")
+        room_price_col1, room_price_col2 = st.columns(2)
     
-    with room_price_col1:
-        # Scatter plot
-        fig_rooms_price = px.scatter(
-            filtered_df,
-            x='rooms',
-            y='price',
-            title='Price vs Rooms',
-            template='plotly_white',
-            trendline="ols"
-        )
-        st.plotly_chart(fig_rooms_price, use_container_width=True, key='rooms_price_scatter')
+        with room_price_col1:
+            # Scatter plot
+            fig_rooms_price = px.scatter(
+                filtered_df,
+                x='rooms',
+                y='price',
+                title='Price vs Rooms',
+                template='plotly_white',
+                trendline="ols"
+            )
+            st.plotly_chart(fig_rooms_price, use_container_width=True, key='rooms_price_scatter')
     
-    with room_price_col2:
-        # Box plot of price by rooms
-        fig_price_by_rooms = px.box(
-            filtered_df,
-            x='rooms',
-            y='price',
-            title='Price Distribution by Number of Rooms',
-            template='plotly_white'
-        )
-        st.plotly_chart(fig_price_by_rooms, use_container_width=True, key='rooms_price_box')
-
-# Bathrooms Tab
-with tabs[2]:
-    st.markdown("### Bathroom Analysis")
-    bath_col1, bath_col2 = st.columns(2)
+        with room_price_col2:
+            # Box plot of price by rooms
+            fig_price_by_rooms = px.box(
+                filtered_df,
+                x='rooms',
+                y='price',
+                title='Price Distribution by Number of Rooms',
+                template='plotly_white'
+            )
+            st.plotly_chart(fig_price_by_rooms, use_container_width=True, key='rooms_price_box')
+
+    # Bathrooms Tab
+    with tabs[2]:
+        st.markdown("### Bathroom Analysis")
+        bath_col1, bath_col2 = st.columns(2)
     
-    with bath_col1:
-        # Univariate distribution of bathrooms
-        fig_bath_hist = px.histogram(
-            filtered_df,
-            x='bathroom',
-            title='Distribution of Bathrooms',
-            template='plotly_white'
-        )
-        fig_bath_hist.update_layout(showlegend=False)
-        st.plotly_chart(fig_bath_hist, use_container_width=True, key='bath_hist')
+        with bath_col1:
+            # Univariate distribution of bathrooms
+            fig_bath_hist = px.histogram(
+                filtered_df,
+                x='bathroom',
+                title='Distribution of Bathrooms',
+                template='plotly_white'
+            )
+            fig_bath_hist.update_layout(showlegend=False)
+            st.plotly_chart(fig_bath_hist, use_container_width=True, key='bath_hist')
         
-    with bath_col2:
-        # Box plot of bathrooms
-        fig_bath_box = px.box(
-            filtered_df,
-            y='bathroom',
-            title='Box Plot of Bathrooms',
-            template='plotly_white'
-        )
-        st.plotly_chart(fig_bath_box, use_container_width=True, key='bath_box')
+        with bath_col2:
+            # Box plot of bathrooms
+            fig_bath_box = px.box(
+                filtered_df,
+                y='bathroom',
+                title='Box Plot of Bathrooms',
+                template='plotly_white'
+            )
+            st.plotly_chart(fig_bath_box, use_container_width=True, key='bath_box')
     
-    # Bathrooms vs Price
-    st.markdown("### Bathrooms vs Price")
-    bath_price_col1, bath_price_col2 = st.columns(2)
+        # Bathrooms vs Price
+        st.markdown("### Bathrooms vs Price")
+        bath_price_col1, bath_price_col2 = st.columns(2)
     
-    with bath_price_col1:
-        # Scatter plot
-        fig_bath_price = px.scatter(
-            filtered_df,
-            x='bathroom',
-            y='price',
-            title='Price vs Bathrooms',
-            template='plotly_white',
-            trendline="ols"
-        )
-        st.plotly_chart(fig_bath_price, use_container_width=True, key='bath_price_scatter')
+        with bath_price_col1:
+            # Scatter plot
+            fig_bath_price = px.scatter(
+                filtered_df,
+                x='bathroom',
+                y='price',
+                title='Price vs Bathrooms',
+                template='plotly_white',
+                trendline="ols"
+            )
+            st.plotly_chart(fig_bath_price, use_container_width=True, key='bath_price_scatter')
     
-    with bath_price_col2:
-        # Box plot of price by bathrooms
-        fig_price_by_bath = px.box(
-            filtered_df,
-            x='bathroom',
-            y='price',
-            title='Price Distribution by Number of Bathrooms',
-            template='plotly_white'
-        )
-        st.plotly_chart(fig_price_by_bath, use_container_width=True, key='bath_price_box')
-
-# Square Footage Tab
-with tabs[3]:
-    st.markdown("### Square Footage Analysis")
-    sqft_col1, sqft_col2 = st.columns(2)
+        with bath_price_col2:
+            # Box plot of price by bathrooms
+            fig_price_by_bath = px.box(
+                filtered_df,
+                x='bathroom',
+                y='price',
+                title='Price Distribution by Number of Bathrooms',
+                template='plotly_white'
+            )
+            st.plotly_chart(fig_price_by_bath, use_container_width=True, key='bath_price_box')
+
+    # Square Footage Tab
+    with tabs[3]:
+        st.markdown("### Square Footage Analysis")
+        sqft_col1, sqft_col2 = st.columns(2)
     
-    with sqft_col1:
-        # Univariate distribution of sqft
-        fig_sqft_hist = px.histogram(
-            filtered_df,
-            x='sqft',
-            title='Distribution of Square Footage',
-            template='plotly_white'
-        )
-        fig_sqft_hist.update_layout(showlegend=False)
-        st.plotly_chart(fig_sqft_hist, use_container_width=True, key='sqft_hist')
+        with sqft_col1:
+            # Univariate distribution of sqft
+            fig_sqft_hist = px.histogram(
+                filtered_df,
+                x='sqft',
+                title='Distribution of Square Footage',
+                template='plotly_white'
+            )
+            fig_sqft_hist.update_layout(showlegend=False)
+            st.plotly_chart(fig_sqft_hist, use_container_width=True, key='sqft_hist')
         
-    with sqft_col2:
-        # Box plot of sqft
-        fig_sqft_box = px.box(
-            filtered_df,
-            y='sqft',
-            title='Box Plot of Square Footage',
-            template='plotly_white'
-        )
-        st.plotly_chart(fig_sqft_box, use_container_width=True, key='sqft_box')
+        with sqft_col2:
+            # Box plot of sqft
+            fig_sqft_box = px.box(
+                filtered_df,
+                y='sqft',
+                title='Box Plot of Square Footage',
+                template='plotly_white'
+            )
+            st.plotly_chart(fig_sqft_box, use_container_width=True, key='sqft_box')
     
-    # Square Footage vs Price
-    st.markdown("### Square Footage vs Price")
-    sqft_price_col1, sqft_price_col2 = st.columns(2)
+        # Square Footage vs Price
+        st.markdown("### Square Footage vs Price")
+        sqft_price_col1, sqft_price_col2 = st.columns(2)
     
-    with sqft_price_col1:
-        # Scatter plot
-        fig_sqft_price = px.scatter(
-            filtered_df,
-            x='sqft',
-            y='price',
-            title='Price vs Square Footage',
-            template='plotly_white',
-            trendline="ols"
-        )
-        st.plotly_chart(fig_sqft_price, use_container_width=True, key='sqft_price_scatter')
+        with sqft_price_col1:
+            # Scatter plot
+            fig_sqft_price = px.scatter(
+                filtered_df,
+                x='sqft',
+                y='price',
+                title='Price vs Square Footage',
+                template='plotly_white',
+                trendline="ols"
+            )
+            st.plotly_chart(fig_sqft_price, use_container_width=True, key='sqft_price_scatter')
     
-    with sqft_price_col2:
-        # Box plot of price by property type
-        fig_price_by_type = px.box(
-            filtered_df,
-            x='property_type',
-            y='price',
-            title='Price Distribution by Property Type',
-            template='plotly_white'
-        )
-        fig_price_by_type.update_xaxes(tickangle=45)
-        st.plotly_chart(fig_price_by_type, use_container_width=True, key='sqft_price_box')
-
-# Property Type Tab
-with tabs[4]:
-    st.markdown("### Property Type Analysis")
-    prop_col1, prop_col2 = st.columns(2)
+        with sqft_price_col2:
+            # Box plot of price by property type
+            fig_price_by_type = px.box(
+                filtered_df,
+                x='property_type',
+                y='price',
+                title='Price Distribution by Property Type',
+                template='plotly_white'
+            )
+            fig_price_by_type.update_xaxes(tickangle=45)
+            st.plotly_chart(fig_price_by_type, use_container_width=True, key='sqft_price_box')
+
+    # Property Type Tab
+    with tabs[4]:
+        st.markdown("### Property Type Analysis")
+        prop_col1, prop_col2 = st.columns(2)
     
-    with prop_col1:
-        # Count of properties by type
-        fig_prop_count = px.bar(
-            filtered_df['property_type'].value_counts().reset_index(),
-            x='property_type',
-            y='count',
-            title='Distribution of Property Types',
-            template='plotly_white',
-            labels={'property_type': 'Property Type', 'count': 'Count'}
-        )
-        fig_prop_count.update_xaxes(tickangle=45)
-        st.plotly_chart(fig_prop_count, use_container_width=True, key='prop_count')
+        with prop_col1:
+            # Count of properties by type
+            fig_prop_count = px.bar(
+                filtered_df['property_type'].value_counts().reset_index(),
+                x='property_type',
+                y='count',
+                title='Distribution of Property Types',
+                template='plotly_white',
+                labels={'property_type': 'Property Type', 'count': 'Count'}
+            )
+            fig_prop_count.update_xaxes(tickangle=45)
+            st.plotly_chart(fig_prop_count, use_container_width=True, key='prop_count')
         
-    with prop_col2:
-        # Percentage distribution
-        fig_prop_pie = px.pie(
-            filtered_df['property_type'].value_counts().reset_index(),
-            values='count',
-            names='property_type',
-            title='Property Type Distribution (%)',
-            template='plotly_white'
-        )
-        st.plotly_chart(fig_prop_pie, use_container_width=True, key="property_type_pie")
+        with prop_col2:
+            # Percentage distribution
+            fig_prop_pie = px.pie(
+                filtered_df['property_type'].value_counts().reset_index(),
+                values='count',
+                names='property_type',
+                title='Property Type Distribution (%)',
+                template='plotly_white'
+            )
+            st.plotly_chart(fig_prop_pie, use_container_width=True, key="property_type_pie")
     
-    # Property Type vs Price
-    st.markdown("### Property Type vs Price")
-    prop_price_col1, prop_price_col2 = st.columns(2)
+        # Property Type vs Price
+        st.markdown("### Property Type vs Price")
+        prop_price_col1, prop_price_col2 = st.columns(2)
     
-    with prop_price_col1:
-        # Box plot of price by property type
-        fig_price_by_type = px.box(
-            filtered_df,
-            x='property_type',
-            y='price',
-            title='Price Distribution by Property Type',
-            template='plotly_white'
-        )
-        fig_price_by_type.update_xaxes(tickangle=45)
-        st.plotly_chart(fig_price_by_type, use_container_width=True, key='prop_price_box')
+        with prop_price_col1:
+            # Box plot of price by property type
+            fig_price_by_type = px.box(
+                filtered_df,
+                x='property_type',
+                y='price',
+                title='Price Distribution by Property Type',
+                template='plotly_white'
+            )
+            fig_price_by_type.update_xaxes(tickangle=45)
+            st.plotly_chart(fig_price_by_type, use_container_width=True, key='prop_price_box')
     
-    with prop_price_col2:
-        # Average price by property type
-        avg_price_by_type = filtered_df.groupby('property_type')['price'].mean().reset_index()
-        fig_avg_price = px.bar(
-            avg_price_by_type,
-            x='property_type',
-            y='price',
-            title='Average Price by Property Type',
-            template='plotly_white',
-            labels={'property_type': 'Property Type', 'price': 'Average Price'}
-        )
-        fig_avg_price.update_xaxes(tickangle=45)
-        st.plotly_chart(fig_avg_price, use_container_width=True, key='prop_avg_price')
+        with prop_price_col2:
+            # Average price by property type
+            avg_price_by_type = filtered_df.groupby('property_type')['price'].mean().reset_index()
+            fig_avg_price = px.bar(
+                avg_price_by_type,
+                x='property_type',
+                y='price',
+                title='Average Price by Property Type',
+                template='plotly_white',
+                labels={'property_type': 'Property Type', 'price': 'Average Price'}
+            )
+            fig_avg_price.update_xaxes(tickangle=45)
+            st.plotly_chart(fig_avg_price, use_container_width=True, key='prop_avg_price')
     
-    # Additional property type relationships
-    st.markdown("### Property Type Relationships")
-    prop_rel_col1, prop_rel_col2 = st.columns(2)
+        # Additional property type relationships
+        st.markdown("### Property Type Relationships")
+        prop_rel_col1, prop_rel_col2 = st.columns(2)
     
-    with prop_rel_col1:
-        # Average square footage by property type
-        avg_sqft_by_type = filtered_df.groupby('property_type')['sqft'].mean().reset_index()
-        fig_avg_sqft = px.bar(
-            avg_sqft_by_type,
-            x='property_type',
-            y='sqft',
-            title='Average Square Footage by Property Type',
-            template='plotly_white',
-            labels={'property_type': 'Property Type', 'sqft': 'Average Square Footage'}
-        )
-        fig_avg_sqft.update_xaxes(tickangle=45)
-        st.plotly_chart(fig_avg_sqft, use_container_width=True, key='prop_avg_sqft')
+        with prop_rel_col1:
+            # Average square footage by property type
+            avg_sqft_by_type = filtered_df.groupby('property_type')['sqft'].mean().reset_index()
+            fig_avg_sqft = px.bar(
+                avg_sqft_by_type,
+                x='property_type',
+                y='sqft',
+                title='Average Square Footage by Property Type',
+                template='plotly_white',
+                labels={'property_type': 'Property Type', 'sqft': 'Average Square Footage'}
+            )
+            fig_avg_sqft.update_xaxes(tickangle=45)
+            st.plotly_chart(fig_avg_sqft, use_container_width=True, key='prop_avg_sqft')
     
-    with prop_rel_col2:
-        # Average rooms by property type
-        avg_rooms_by_type = filtered_df.groupby('property_type')['rooms'].mean().reset_index()
-        fig_avg_rooms = px.bar(
-            avg_rooms_by_type,
-            x='property_type',
-            y='rooms',
-            title='Average Number of Rooms by Property Type',
+        with prop_rel_col2:
+            # Average rooms by property type
+            avg_rooms_by_type = filtered_df.groupby('property_type')['rooms'].mean().reset_index()
+            fig_avg_rooms = px.bar(
+                avg_rooms_by_type,
+                x='property_type',
+                y='rooms',
+                title='Average Number of Rooms by Property Type',
+                template='plotly_white',
+                labels={'property_type': 'Property Type', 'rooms': 'Average Rooms'}
+            )
+            fig_avg_rooms.update_xaxes(tickangle=45)
+            st.plotly_chart(fig_avg_rooms, use_container_width=True, key='prop_avg_rooms')
+
+    # Correlations Tab
+    with tabs[5]:
+        st.markdown("### Feature Correlations")
+        numeric_columns = ['price', 'rooms', 'bathroom', 'sqft']
+        correlation_matrix = filtered_df[numeric_columns].corr()
+        fig_corr = px.imshow(
+            correlation_matrix,
+            title='Correlation Heatmap',
             template='plotly_white',
-            labels={'property_type': 'Property Type', 'rooms': 'Average Rooms'}
+            color_continuous_scale='RdBu',
+            aspect='auto'
         )
-        fig_avg_rooms.update_xaxes(tickangle=45)
-        st.plotly_chart(fig_avg_rooms, use_container_width=True, key='prop_avg_rooms')
-
-# Correlations Tab
-with tabs[5]:
-    st.markdown("### Feature Correlations")
-    numeric_columns = ['price', 'rooms', 'bathroom', 'sqft']
-    correlation_matrix = filtered_df[numeric_columns].corr()
-    fig_corr = px.imshow(
-        correlation_matrix,
-        title='Correlation Heatmap',
-        template='plotly_white',
-        color_continuous_scale='RdBu',
-        aspect='auto'
-    )
-    st.plotly_chart(fig_corr, use_container_width=True, key='correlation_heatmap')
-
-# Function to insert a new row into the BigQuery table
-def insert_community_row(client, community, parish, city, latitude, longitude):
-    query = f"""
-    INSERT INTO `price-aggregator-f9e4b.aggregated_prices.communities` (Community, Parish, City, Latitude, Longitude)
-    VALUES ('{community}', '{parish}', '{city}', {latitude}, {longitude})
-    """
-    client.query(query).result()
+        st.plotly_chart(fig_corr, use_container_width=True, key='correlation_heatmap')
 
 # Add a form for inserting a new community in the sidebar within an expander
 st.sidebar.markdown("### Add a New Community")
@@ -562,14 +835,15 @@ with st.sidebar.expander("Add Community", expanded=False):
         submitted = st.form_submit_button("Add Community")
         if submitted:
             if community and parish and city:
-                insert_community_row(client, community, parish, city, latitude, longitude)
+                storage.add_community(community, parish, city, latitude, longitude)
                 st.sidebar.success("Community added successfully!")
             else:
                 st.sidebar.error("Please fill in all fields.")
 
 # Add a download button for the DataFrame in the sidebar
 st.sidebar.markdown("### Download Data")
-csv = df.to_csv(index=False)
+# Large tables are never downloaded in full, so export the filtered rows instead
+csv = (df if use_local_dataset else filtered_df).to_csv(index=False)
 st.sidebar.download_button(
     label="Download data as CSV",
     data=csv,
@@ -577,6 +851,18 @@ st.sidebar.download_button(
     mime='text/csv'
 )
 
+# Connection pool stats in the sidebar
+with st.sidebar.expander("Connection Pool", expanded=False):
+    pool_stats = client_pool_stats()
+    st.write(f"Clients alive: {pool_stats['clients_alive']}")
+    st.write(f"Client reuses: {pool_stats['reuse_count']:,}")
+    st.write(f"Handshake time saved: {pool_stats['seconds_saved']:.1f}s")
+
+with st.sidebar.expander("Query Cache", expanded=False):
+    cache_stats = dashboard_cache.stats()
+    st.write(f"Cached results: {cache_stats['entries']} ({cache_stats['bytes'] / 1024 / 1024:.1f} MB)")
+    st.write(f"Hits: {cache_stats['hits']:,} / misses: {cache_stats['misses']:,}")
+
 # Footer
 st.markdown("---")
 st.markdown(f"<div style='text-align: center; color: #666;'>Last updated: {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')}</div>", unsafe_allow_html=True)
\ No newline at end of file
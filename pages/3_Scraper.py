@@ -1,8 +1,5 @@
 import streamlit as st
 import os
-from PIL import Image
-from io import BytesIO
-import json
 from utils.scraper_utils import search_properties, capture_screenshots_async
 import asyncio
 from zipfile import ZipFile
@@ -22,14 +19,6 @@ def main():
     
     st.title("Webpage Screenshot Capture Tool")
 
-    # Set up credentials from Streamlit secrets
-    if not os.path.exists("credentials.json"):
-        with open("credentials.json", "w") as f:
-            json.dump(json.loads(st.secrets["GOOGLE_APPLICATION_CREDENTIALS"]), f)
-
-    # Set the environment variable to point to the credentials file
-    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.path.abspath("credentials.json")
-
     # Input method selection
     location = st.text_input("Enter location:")
     if st.button("Search Properties"):
@@ -98,8 +87,7 @@ def main():
                                         st.error(f"❌ Error: {result['error']}")
                                     else:
                                         # Show Screenshot
-                                        image = Image.open(BytesIO(result["screenshot"]))
-                                        st.image(image, caption=f"Captured Screenshot - {result['url']}", use_container_width=True)
+                                        st.image(result["screenshot"], caption=f"Captured Screenshot - {result['url']}", use_container_width=True)
 
                                         # Show AI-Generated Data
                                         st.subheader("🧠 AI-Generated Data")
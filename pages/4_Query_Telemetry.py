@@ -0,0 +1,117 @@
+import streamlit as st
+import os
+import pandas as pd
+from utils.query_telemetry import telemetry
+from utils.bigquery_utils import create_bigquery_client, reconcile_summary, TABLE_LAYOUTS
+from utils import table_layout
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+st.set_page_config(layout="wide")
+
+if 'authentication_status' not in st.session_state or not st.session_state['authentication_status']:
+    st.error('Please login to continue')
+    st.stop()
+
+# Comma-separated usernames allowed to see query costs
+admin_users = st.secrets.get("ADMIN_USERS") or os.getenv('ADMIN_USERS') or ""
+if isinstance(admin_users, str):
+    admin_users = [user.strip() for user in admin_users.split(",") if user.strip()]
+if st.session_state.get('username') not in admin_users:
+    st.error('This page is only available to administrators')
+    st.stop()
+
+st.title("BigQuery Query Telemetry")
+st.caption("Queries run by this server process since it started (most recent 2,000).")
+
+if st.button("Refresh"):
+    st.rerun()
+
+summary = telemetry.summary()
+records = telemetry.records()
+if summary.empty:
+    st.info("No queries recorded yet.")
+else:
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Queries", f"{len(records):,}")
+    with col2:
+        st.metric("GB Billed", f"{records['bytes_billed'].fillna(0).sum() / 1e9:,.2f}")
+    with col3:
+        st.metric("p95 Latency (s)", f"{records['wall_seconds'].quantile(0.95):.2f}")
+    with col4:
+        st.metric("Errors", f"{int(records['error'].notna().sum()):,}")
+
+    st.markdown("### By Query")
+    st.dataframe(
+        summary,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "bytes_processed": st.column_config.NumberColumn("Bytes Processed", format="%d"),
+            "bytes_billed": st.column_config.NumberColumn("Bytes Billed", format="%d"),
+            "cache_hit_rate": st.column_config.NumberColumn("Cache Hit Rate", format="%.2f"),
+        },
+    )
+
+    st.markdown("### Recent Queries")
+    st.dataframe(records.iloc[::-1], use_container_width=True, hide_index=True)
+
+st.markdown("### Table Layout")
+client = create_bigquery_client()
+layout_rows = []
+for name in TABLE_LAYOUTS:
+    try:
+        target = table_layout.target_layout(client, name)
+        current = table_layout.current_layout(client, target["table_id"])
+    except Exception as e:
+        st.warning(f"Could not read the {name} table: {str(e)}")
+        continue
+    layout_rows.append({
+        "table": name,
+        "partitioned_on": current["partition_field"],
+        "clustered_on": ", ".join(current["clustering_fields"]),
+        "target_partition": target["partition_field"],
+        "target_clustering": ", ".join(target["clustering_fields"]),
+        "GB": (current["num_bytes"] or 0) / 1e9,
+    })
+st.dataframe(pd.DataFrame(layout_rows), use_container_width=True, hide_index=True)
+
+if st.button("Dry-run recurring queries"):
+    with st.spinner("Dry-running..."):
+        st.dataframe(table_layout.dry_run_report(client), use_container_width=True, hide_index=True)
+    st.caption("Dry runs include partition pruning only; queries that benefit from clustering alone show "
+               "no reduction here and their savings appear in billed bytes above. Queries marked "
+               "\"none\" scan the whole table under either layout.")
+
+if st.button("Reconcile summary counters"):
+    try:
+        with st.spinner("Recounting the property table..."):
+            reconcile_summary(client)
+        st.success("Summary counters reconciled")
+    except Exception as e:
+        st.error(f"Error reconciling summary counters: {str(e)}")
+
+with st.expander("Migrate a table"):
+    name = st.selectbox("Table", list(TABLE_LAYOUTS))
+    st.write("Build a re-laid-out copy first and compare it with the dry run, then swap it in "
+             "while nobody is scraping or validating. The original is kept as a backup table.")
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Build candidate"):
+            try:
+                with st.spinner("Copying table..."):
+                    candidate_id = table_layout.build_candidate(client, name)
+                st.success(f"Built {candidate_id}")
+            except Exception as e:
+                st.error(f"Error building candidate: {str(e)}")
+    with col2:
+        confirm = st.checkbox("I understand writes during the swap are lost")
+        if st.button("Swap in candidate", disabled=not confirm):
+            try:
+                backup_id = table_layout.swap_candidate(client, name)
+                st.success(f"Swapped. Previous table kept as {backup_id}")
+            except Exception as e:
+                st.error(f"Error swapping tables: {str(e)}")
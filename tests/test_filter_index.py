@@ -0,0 +1,29 @@
+import math
+import pandas as pd
+from utils.filter_index import FilterIndex
+
+def frame():
+    return pd.DataFrame({
+        "price": [100.0, math.nan, 300.0, 200.0],
+        "rooms": [1, 2, None, 3],
+        "property_type": ["House", "Land", "House", None],
+    })
+
+def test_ranges_are_inclusive_and_skip_missing_values():
+    index = FilterIndex(frame())
+
+    assert index.positions(ranges={"price": (100, 200)}).tolist() == [0, 3]
+    assert index.positions(ranges={"price": (0, 1000)}).tolist() == [0, 2, 3]
+
+def test_none_range_keeps_rows_with_missing_values():
+    index = FilterIndex(frame())
+
+    assert index.positions(ranges={"price": None}).tolist() == [0, 1, 2, 3]
+    assert index.positions(ranges={"price": None, "rooms": (2, 3)}).tolist() == [1, 3]
+
+def test_filters_combine_with_and():
+    index = FilterIndex(frame())
+
+    assert index.positions(ranges={"price": (0, 250)}, categories={"property_type": "House"}).tolist() == [0]
+    assert index.positions(categories={"property_type": "Condo"}).tolist() == []
+    assert index.positions(categories={"property_type": None}).tolist() == [0, 1, 2, 3]
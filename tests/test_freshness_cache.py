@@ -0,0 +1,36 @@
+import sys
+from datetime import timedelta
+from utils.freshness_cache import FreshnessCache
+
+VALUE_BYTES = sys.getsizeof(b"x" * 100)
+
+class Source:
+    def __init__(self):
+        self.version = 1
+
+    def fingerprint(self):
+        return self.version
+
+def test_fingerprint_change_drops_entries():
+    source = Source()
+    cache = FreshnessCache(source.fingerprint, check_interval=timedelta(0))
+
+    assert cache.get("q", lambda: "old") == "old"
+    assert cache.get("q", lambda: "new") == "old"
+
+    source.version = 2
+    assert cache.get("q", lambda: "new") == "new"
+    assert cache.stats()["hits"] == 1
+
+def test_evicts_least_recently_used_by_bytes():
+    cache = FreshnessCache(Source().fingerprint, max_bytes=2 * VALUE_BYTES)
+
+    cache.get("a", lambda: b"a" * 100)
+    cache.get("b", lambda: b"b" * 100)
+    cache.get("a", lambda: None)          # now more recent than b
+    cache.get("c", lambda: b"c" * 100)
+
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["bytes"] == 2 * VALUE_BYTES
+    assert cache.get("a", lambda: None) == b"a" * 100
+    assert cache.get("b", lambda: None) is None
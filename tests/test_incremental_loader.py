@@ -0,0 +1,9 @@
+from utils.incremental_loader import row_checksum
+
+def test_checksum_matches_bigquery():
+    # CHECKSUM_SQL by hand: XOR of the first 15 hex digits of MD5("p1:true"), MD5("p2:false"), MD5("p3:")
+    assert row_checksum(["p1", "p2", "p3"], [True, False, None]) == 881215736184911025
+
+def test_checksum_ignores_row_order():
+    assert row_checksum(["p1", "p2"], [True, False]) == row_checksum(["p2", "p1"], [False, True])
+    assert row_checksum([], []) == 0
@@ -0,0 +1,184 @@
+import os
+import socket
+import threading
+import json
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+import pytest
+from utils.tile_cache import (
+    TileCache, TileProxy, TILE_SIZE, prune_thumbnails, render_location_thumbnail, tile_position,
+)
+
+TILE_BYTES = 1000
+
+class StandInTileServer:
+    """
+    Local upstream serving `/<z>/<x>/<y>`: a solid PNG tile when `image` is
+    set, otherwise TILE_BYTES of filler. Records every requested path.
+    """
+
+    def __init__(self, image=False):
+        self.image = image
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append(self.path)
+                body = server.tile_body(self.path)
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/{{z}}/{{x}}/{{y}}?token={{token}}"
+
+    def tile_body(self, path):
+        if not self.image:
+            return path.encode().ljust(TILE_BYTES, b".")
+        from PIL import Image
+
+        buffer = BytesIO()
+        Image.new("RGB", (TILE_SIZE, TILE_SIZE), (0, 128, 0)).save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def upstream():
+    server = StandInTileServer()
+    yield server
+    server.close()
+
+def fetch(url):
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def test_miss_downloads_then_hit_reads_disk(tmp_path, upstream):
+    cache = TileCache("secret", cache_dir=str(tmp_path), upstream_url=upstream.url)
+
+    first = cache.get(10, 300, 450)
+    second = cache.get(10, 300, 450)
+
+    assert first == second
+    assert upstream.requests == ["/10/300/450?token=secret"]
+    assert os.path.exists(tmp_path / "10" / "300" / "450")
+    assert cache.stats() == {"tiles": 1, "bytes": TILE_BYTES, "hits": 1, "misses": 1}
+
+def test_restart_keeps_downloaded_tiles(tmp_path, upstream):
+    TileCache("secret", cache_dir=str(tmp_path), upstream_url=upstream.url).get(10, 300, 450)
+
+    cache = TileCache("secret", cache_dir=str(tmp_path), upstream_url=upstream.url)
+    cache.get(10, 300, 450)
+
+    assert len(upstream.requests) == 1
+    assert cache.stats()["hits"] == 1
+
+def test_evicts_least_recently_used(tmp_path, upstream):
+    cache = TileCache("secret", cache_dir=str(tmp_path), max_bytes=2 * TILE_BYTES, upstream_url=upstream.url)
+
+    cache.get(1, 0, 0)
+    cache.get(1, 0, 1)
+    cache.get(1, 0, 0)    # now more recent than 0/1
+    cache.get(1, 1, 0)
+
+    assert cache.stats()["tiles"] == 2
+    assert os.path.exists(tmp_path / "1" / "0" / "0")
+    assert not os.path.exists(tmp_path / "1" / "0" / "1")
+    assert os.path.exists(tmp_path / "1" / "1" / "0")
+
+def test_concurrent_misses_on_one_tile_all_succeed(tmp_path, upstream):
+    cache = TileCache("secret", cache_dir=str(tmp_path), upstream_url=upstream.url)
+    results, errors = [], []
+
+    def fetch_tile():
+        try:
+            results.append(cache.get(5, 10, 12))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=fetch_tile) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(set(results)) == 1 and len(results) == 8
+    assert os.listdir(tmp_path / "5" / "10") == ["12"]
+    assert cache.stats()["tiles"] == 1
+
+def test_prune_thumbnails_removes_least_recently_used(tmp_path):
+    for age, name in enumerate(["newest", "middle", "oldest"]):
+        path = tmp_path / f"{name}.jpg"
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (1000 - age, 1000 - age))
+
+    prune_thumbnails(str(tmp_path), max_bytes=200)
+
+    assert sorted(os.listdir(tmp_path)) == ["middle.jpg", "newest.jpg"]
+
+def test_thumbnail_stitches_tiles_around_point(tmp_path):
+    pytest.importorskip("PIL")
+    from PIL import Image
+
+    upstream = StandInTileServer(image=True)
+    try:
+        cache = TileCache("secret", cache_dir=str(tmp_path), upstream_url=upstream.url)
+        jpeg = render_location_thumbnail(cache, 18.0, -76.8, zoom=16, size=(640, 400))
+    finally:
+        upstream.close()
+
+    # Every tile overlapping the viewport was fetched once
+    x, y = tile_position(18.0, -76.8, 16)
+    columns = int((x * TILE_SIZE + 320) // TILE_SIZE) - int((x * TILE_SIZE - 320) // TILE_SIZE) + 1
+    rows = int((y * TILE_SIZE + 200) // TILE_SIZE) - int((y * TILE_SIZE - 200) // TILE_SIZE) + 1
+    assert len(set(upstream.requests)) == len(upstream.requests) == columns * rows
+
+    image = Image.open(BytesIO(jpeg)).convert("RGB")
+    assert image.size == (640, 400)
+    red, green, _ = image.getpixel((5, 5))
+    assert green > 100 and red < 40          # tile imagery at the corner
+    red, green, _ = image.getpixel((320, 200))
+    assert red > 200 and green < 60          # marker at the centre
+
+def test_proxy_serves_cached_tiles_and_rejects_bad_paths(tmp_path, upstream):
+    cache = TileCache("secret", cache_dir=str(tmp_path), upstream_url=upstream.url)
+    port = free_port()
+    proxy = TileProxy(cache, port, max_zoom=12)
+    base = f"http://127.0.0.1:{port}"
+    try:
+        assert proxy.server.server_address[0] == "127.0.0.1"
+
+        status, body = fetch(f"{base}/style.json")
+        assert status == 200
+        assert json.loads(body)["sources"]["satellite"]["tiles"] == [f"http://localhost:{port}/tiles/{{z}}/{{x}}/{{y}}"]
+
+        status, body = fetch(f"{base}/tiles/3/2/1")
+        assert status == 200
+        assert body == cache.get(3, 2, 1)
+        assert upstream.requests == ["/3/2/1?token=secret"]
+
+        for path in ("/tiles/3/8/1", "/tiles/13/0/0", "/tiles/-1/0/0", "/tiles/a/b/c", "/other"):
+            assert fetch(f"{base}{path}")[0] == 404
+        assert len(upstream.requests) == 1
+    finally:
+        proxy.server.shutdown()
+        proxy.server.server_close()
@@ -0,0 +1,62 @@
+import math
+import pytest
+from utils.validation_queue import ValidationQueue, diff_fields
+
+def test_missing_number_submitted_as_zero_is_unchanged():
+    original = {"price": math.nan, "sqft": None, "rooms": 3.0, "property_type": None}
+    edited = {"price": 0, "sqft": 0.0, "rooms": 3, "property_type": ""}
+
+    assert diff_fields(original, edited) == {}
+
+def test_only_changed_editable_fields_are_kept():
+    original = {"price": 100.0, "rooms": math.nan, "property_type": "House"}
+    edited = {"price": 150, "rooms": 2, "property_type": "House", "listing_urls": "x"}
+
+    assert diff_fields(original, edited) == {"price": 150.0, "rooms": 2.0}
+
+class FlakyStorage:
+    """
+    Fails any MERGE containing a "bad" property, or every MERGE while `down`.
+    """
+
+    name = "test"
+
+    def __init__(self):
+        self.down = False
+        self.written = []
+
+    def merge_validations(self, records):
+        if self.down or any(record["property_id"] == "bad" for record in records):
+            raise RuntimeError("merge failed")
+        self.written += [record["property_id"] for record in records]
+        return len(records)
+
+@pytest.fixture
+def queue(tmp_path):
+    storage = FlakyStorage()
+    return ValidationQueue(storage, spill_path=str(tmp_path / "queue.jsonl"), flush_interval=3600, max_attempts=2)
+
+def test_record_that_keeps_failing_is_dead_lettered(queue):
+    queue.enqueue_many("tester", [(property_id, None, None) for property_id in ["a", "bad", "c", "d"]])
+
+    assert queue.flush() == 0
+    assert queue.flush() == 3
+
+    assert sorted(queue.storage.written) == ["a", "c", "d"]
+    assert queue.pending_count() == 0
+    assert queue.dead_lettered == 1
+    with open(queue.dead_letter_path) as f:
+        assert '"property_id": "bad"' in f.read()
+
+def test_outage_backs_off_without_dead_lettering(queue):
+    queue.storage.down = True
+    queue.enqueue_many("tester", [(property_id, None, None) for property_id in ["a", "b"]])
+
+    for _ in range(4):
+        assert queue.flush() == 0
+    assert queue.pending_count() == 2
+    assert queue.dead_lettered == 0
+
+    queue.storage.down = False
+    assert queue.flush() == 2
+    assert queue.failures == 0
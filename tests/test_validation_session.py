@@ -0,0 +1,48 @@
+from utils.invalidation_bus import InvalidationBus, INSERTED, VALIDATED
+from utils.property_store import PropertyStore
+from utils.validation_session import ValidationSession
+
+def session(*property_ids):
+    bus = InvalidationBus()
+    return ValidationSession([{"property_id": p} for p in property_ids], store=PropertyStore(), bus=bus), bus
+
+def test_next_after_wraps_around():
+    s, _ = session("a", "b", "c")
+
+    assert s.next_after("a") == "b"
+    assert s.next_after("c") == "a"
+
+    s.complete("b")
+    s.complete("c")
+    assert s.next_after("a") is None
+
+def test_skip_moves_to_the_back():
+    s, _ = session("a", "b", "c")
+
+    s.skip("a")
+
+    assert s.ids() == ["b", "c", "a"]
+    assert s.next_after("a") == "b"
+
+def test_complete_counts_progress():
+    s, _ = session("a", "b", "c")
+
+    s.complete("b")
+    s.complete("missing")
+
+    assert s.ids() == ["a", "c"]
+    assert (s.claimed, s.completed) == (3, 1)
+
+    s.close()
+    assert (len(s), s.claimed, s.completed) == (0, 0, 0)
+
+def test_sync_drops_properties_validated_elsewhere():
+    s, bus = session("a", "b", "c")
+
+    bus.publish(VALIDATED, ["b", "z"])
+    bus.publish(INSERTED, ["c"])
+
+    assert s.sync() == ["b"]
+    assert s.ids() == ["a", "c"]
+    assert (s.claimed, s.completed) == (2, 0)
+    assert s.sync() == []
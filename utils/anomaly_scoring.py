@@ -0,0 +1,165 @@
+import streamlit as st
+import os
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import pytz
+from utils.bigquery_utils import VALIDATOR_COLUMNS
+from utils.snapshot_cache import load_or_fetch
+
+SCORING_COLUMNS = VALIDATOR_COLUMNS + ["community"]
+
+# Jamaica's bounding box, with a little slack for coastal listings
+JAMAICA_BOUNDS = {"lat": (17.65, 18.55), "lon": (-78.40, -76.15)}
+
+# Fields a validator needs to judge a row; mostly-empty rows get priority
+KEY_FIELDS = ["price", "sqft", "rooms", "bathroom", "property_type", "latitude", "longitude"]
+
+# Points each check adds to a row's score
+WEIGHTS = {
+    "price_per_sqft_outlier": 3.0,
+    "outside_jamaica": 4.0,
+    "impossible_rooms": 2.0,
+    "null_heavy": 2.0,
+}
+
+MIN_GROUP_SIZE = 8
+OUTLIER_Z = 3.5
+
+def _robust_z(values, groups):
+    """
+    Returns each value's modified z-score (median/MAD) within its group.
+    """
+    grouped = values.groupby(groups, dropna=False)
+    median = grouped.transform("median")
+    mad = (values - median).abs().groupby(groups, dropna=False).transform("median")
+    return 0.6745 * (values - median) / mad.replace(0, np.nan)
+
+def score_properties(df):
+    """
+    Scores how likely each row is to need a validator's correction.
+
+    Every check runs column-wise over the whole frame:
+    - price per sqft far from its (property_type, community) peers, by a
+      robust z-score on the log scale (falling back to the property type
+      alone for groups with fewer than MIN_GROUP_SIZE rows);
+    - coordinates outside Jamaica's bounding box;
+    - impossible room counts (negative rooms, no rooms for anything but a
+      studio, more bathrooms than rooms plus one, or under 80 sqft per room);
+    - half or more of the key fields missing.
+
+    Args:
+        df (pd.DataFrame): Properties with SCORING_COLUMNS (`community` optional).
+
+    Returns:
+        pd.DataFrame: A copy with `anomaly_score` and `anomaly_reasons` (comma
+        separated check names) added, highest score first.
+    """
+    df = df.copy()
+    price = pd.to_numeric(df.get("price"), errors="coerce")
+    sqft = pd.to_numeric(df.get("sqft"), errors="coerce")
+    rooms = pd.to_numeric(df.get("rooms"), errors="coerce")
+    bathroom = pd.to_numeric(df.get("bathroom"), errors="coerce")
+    latitude = pd.to_numeric(df.get("latitude"), errors="coerce")
+    longitude = pd.to_numeric(df.get("longitude"), errors="coerce")
+    property_type = df.get("property_type", pd.Series("", index=df.index)).fillna("").astype(str)
+    community = df.get("community", pd.Series("", index=df.index)).fillna("").astype(str)
+
+    log_ppsf = np.log(price.where(price > 0) / sqft.where(sqft > 0))
+    pair = property_type + "|" + community
+    pair_size = pair.map(pair.value_counts())
+    z = _robust_z(log_ppsf, pair).where(pair_size >= MIN_GROUP_SIZE, _robust_z(log_ppsf, property_type))
+
+    checks = pd.DataFrame({
+        "price_per_sqft_outlier": z.abs() > OUTLIER_Z,
+        "outside_jamaica": latitude.notna() & longitude.notna() & ~(
+            latitude.between(*JAMAICA_BOUNDS["lat"]) & longitude.between(*JAMAICA_BOUNDS["lon"])
+        ),
+        "impossible_rooms": (rooms < 0)
+            | ((rooms == 0) & ~property_type.str.contains("studio", case=False))
+            | (bathroom > rooms + 1)
+            | (sqft / rooms.where(rooms > 0) < 80),
+        "null_heavy": df.reindex(columns=KEY_FIELDS).isna().mean(axis=1) >= 0.5,
+    }, index=df.index).fillna(False).astype(bool)
+
+    weights = pd.Series(WEIGHTS)[checks.columns]
+    # Within a check, the further out the price the sooner it's reviewed
+    df["anomaly_score"] = checks.to_numpy() @ weights.to_numpy() + (z.abs().fillna(0).clip(upper=10) / 10)
+    names = np.array(checks.columns, dtype=object)
+    df["anomaly_reasons"] = [", ".join(names[flags]) for flags in checks.to_numpy()]
+    return df.sort_values("anomaly_score", ascending=False, kind="stable").reset_index(drop=True)
+
+def score_refresh_interval():
+    """
+    Minutes between rescoring the unvalidated set (SCORE_REFRESH_MINUTES, default 30).
+    """
+    minutes = st.secrets.get("SCORE_REFRESH_MINUTES") or os.getenv('SCORE_REFRESH_MINUTES') or 30
+    return timedelta(minutes=float(minutes))
+
+class ValidationPriority:
+    """
+    The unvalidated properties, scored and ordered for the validation queue.
+
+    The whole unvalidated set is fetched and scored in one pass, then kept in
+    memory (and as an on-disk snapshot) until it is older than the refresh
+    interval, so refilling the lease pool is a slice instead of a query.
+    Scoring runs without holding the lock readers take; the new frame is
+    swapped in when it is ready.
+    """
+
+    def __init__(self, storage, refresh_interval=None):
+        self.storage = storage
+        self.refresh_interval = refresh_interval or score_refresh_interval()
+        self.scored = None
+        self.scored_at = None
+        self._lock = threading.Lock()
+        self._scoring_lock = threading.Lock()   # one scoring pass at a time
+
+    def _score(self):
+        return score_properties(self.storage.fetch_data_all(columns=SCORING_COLUMNS, filters={"is_validated": False}))
+
+    def _stale(self):
+        with self._lock:
+            return self.scored is None or datetime.now(pytz.utc) - self.scored_at > self.refresh_interval
+
+    def refresh(self, force=False):
+        """
+        Rescores the unvalidated set if it is older than the refresh interval.
+
+        Returns:
+            pd.DataFrame: The current scored frame.
+        """
+        if force or self._stale():
+            with self._scoring_lock:
+                # Another caller may have rescored while this one waited
+                if force or self._stale():
+                    # Stamped with when the data was read, not when scoring finished
+                    started = datetime.now(pytz.utc)
+                    if self.scored is None and not force:
+                        # The first scoring of the process can come from the on-disk snapshot
+                        scored = load_or_fetch(
+                            f"validator_priority_{self.storage.name}", self.storage.fingerprint(), self._score
+                        )
+                    else:
+                        scored = self._score()
+                    with self._lock:
+                        self.scored, self.scored_at = scored, started
+        with self._lock:
+            return self.scored
+
+    def rows(self, limit, exclude_ids=None):
+        """
+        Returns the `limit` highest-scoring properties not in `exclude_ids`
+        from the current scoring, without rescoring (see `refresh`).
+
+        Returns:
+            pd.DataFrame: The rows, or None if nothing has been scored yet.
+        """
+        with self._lock:
+            scored = self.scored
+        if scored is None:
+            return None
+        if exclude_ids:
+            scored = scored[~scored["property_id"].isin(exclude_ids)]
+        return scored.head(limit)
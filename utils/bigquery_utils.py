@@ -1,44 +1,180 @@
 import streamlit as st
 import json
 import os
+import random
+import threading
+import time
+import uuid
 from google.cloud import bigquery
-from datetime import datetime
+from datetime import datetime, timedelta
 import pytz
 from dotenv import load_dotenv
 from google.oauth2 import service_account
+from google.auth.transport.requests import AuthorizedSession, Request
+from requests.adapters import HTTPAdapter
+from utils.bulk_ingest import BulkIngester, new_property_id
+from utils.query_telemetry import timed_query
+from utils.query_executor import submit_background
 
 load_dotenv()
 
-if not os.path.exists("credentials.json"):
-    with open("credentials.json", "w") as f:
-        json.dump(json.loads(st.secrets["GOOGLE_APPLICATION_CREDENTIALS"]), f)
+# Local directory for on-disk caches (snapshots, spill files, etc.)
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+
+# Process-wide client registry. Streamlit re-executes page scripts on every
+# widget interaction, so clients, credentials and their HTTP/gRPC connections
+# are built once per process here and handed back on every rerun.
+_CLIENT_LOCK = threading.RLock()
+_CLIENT_REGISTRY = {}
+_CLIENT_STATS = {
+    "created": 0,
+    "reused": 0,
+    "handshake_seconds": {},
+}
+_TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+_HTTP_POOL_SIZE = 32
+_refresh_thread = None
+
+def _load_credentials():
+    """
+    Parses the service account credentials once per process.
+
+    Credentials are read straight from Streamlit secrets when available,
+    otherwise from the file pointed to by GOOGLE_APPLICATION_CREDENTIALS.
+
+    Returns:
+        service_account.Credentials: The shared credentials instance.
+    """
+    with _CLIENT_LOCK:
+        if "credentials" in _CLIENT_REGISTRY:
+            return _CLIENT_REGISTRY["credentials"]
+
+        scopes = ["https://www.googleapis.com/auth/cloud-platform"]
+        # Try to get credentials from Streamlit secrets first, then fall back to .env
+        try:
+            credentials_info = json.loads(st.secrets["GOOGLE_APPLICATION_CREDENTIALS"])
+            credentials = service_account.Credentials.from_service_account_info(
+                credentials_info, scopes=scopes
+            )
+        except Exception:
+            credentials = service_account.Credentials.from_service_account_file(
+                os.getenv('GOOGLE_APPLICATION_CREDENTIALS'), scopes=scopes
+            )
+
+        _CLIENT_REGISTRY["credentials"] = credentials
+        return credentials
+
+def _refresh_credentials_loop():
+    """
+    Keeps the shared access token fresh so requests never block on a refresh.
+    """
+    while True:
+        credentials = _CLIENT_REGISTRY.get("credentials")
+        wait_seconds = 60
+        if credentials is not None:
+            expiry = credentials.expiry
+            if expiry is None or expiry - _TOKEN_REFRESH_MARGIN <= datetime.utcnow():
+                try:
+                    credentials.refresh(Request())
+                    expiry = credentials.expiry
+                except Exception as e:
+                    print(f"Error refreshing credentials: {str(e)}")
+            if expiry is not None:
+                wait_seconds = max(
+                    (expiry - _TOKEN_REFRESH_MARGIN - datetime.utcnow()).total_seconds(), 30
+                )
+        time.sleep(wait_seconds)
+
+def _start_token_refresher():
+    global _refresh_thread
+    with _CLIENT_LOCK:
+        if _refresh_thread is None or not _refresh_thread.is_alive():
+            _refresh_thread = threading.Thread(
+                target=_refresh_credentials_loop, name="bq-token-refresh", daemon=True
+            )
+            _refresh_thread.start()
+
+def _get_or_create(name, factory):
+    """
+    Returns the registered client called `name`, building it with `factory` on first use.
+    """
+    with _CLIENT_LOCK:
+        if name in _CLIENT_REGISTRY:
+            _CLIENT_STATS["reused"] += 1
+            return _CLIENT_REGISTRY[name]
+
+        start = time.perf_counter()
+        client = factory()
+        _CLIENT_STATS["handshake_seconds"][name] = time.perf_counter() - start
+        _CLIENT_STATS["created"] += 1
+        _CLIENT_REGISTRY[name] = client
+        _start_token_refresher()
+        return client
 
 def create_bigquery_client():
-    # Try to get credentials from Streamlit secrets first, then fall back to .env
-    try:
-        credentials_json = st.secrets["GOOGLE_APPLICATION_CREDENTIALS"]
-        # Write the credentials to a temporary file
-        import json
-        import tempfile
-        
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.json') as f:
-            json.dump(json.loads(credentials_json), f)
-            credentials_path = f.name
-    except:
-        # Fall back to .env file
-        credentials_path = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
-    
-    # Get project ID from either source
-    project_id = st.secrets.get("PROJECT_ID") or os.getenv('PROJECT_ID')
-    
-    # Load credentials from the JSON file
-    credentials = service_account.Credentials.from_service_account_file(
-        credentials_path,
-        scopes=["https://www.googleapis.com/auth/cloud-platform"],
-    )
-    
-    # Create and return the client
-    return bigquery.Client(credentials=credentials, project=project_id)
+    """
+    Returns the process-wide BigQuery client.
+
+    The client is created on first call and shares one pooled, authorized HTTP
+    session across all Streamlit sessions and reruns in this process.
+
+    Returns:
+        bigquery.Client: The shared BigQuery client instance.
+    """
+    def factory():
+        credentials = _load_credentials()
+        # Get project ID from either source
+        project_id = st.secrets.get("PROJECT_ID") or os.getenv('PROJECT_ID')
+
+        session = AuthorizedSession(credentials)
+        adapter = HTTPAdapter(pool_connections=_HTTP_POOL_SIZE, pool_maxsize=_HTTP_POOL_SIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+        credentials.refresh(Request())
+        return bigquery.Client(credentials=credentials, project=project_id, _http=session)
+
+    return _get_or_create("bigquery", factory)
+
+def create_bqstorage_client():
+    """
+    Returns the process-wide BigQuery Storage read client.
+
+    Passing this to `to_dataframe(bqstorage_client=...)` reuses one gRPC channel
+    instead of opening a new one for every download.
+
+    Returns:
+        bigquery_storage.BigQueryReadClient: The shared read client.
+    """
+    def factory():
+        from google.cloud import bigquery_storage
+        return bigquery_storage.BigQueryReadClient(credentials=_load_credentials())
+
+    return _get_or_create("bqstorage", factory)
+
+def client_pool_stats():
+    """
+    Reports on the shared client registry.
+
+    Returns:
+        dict: Number of live clients, how many times they were reused, and the
+        estimated connection/handshake time saved by reusing them.
+    """
+    with _CLIENT_LOCK:
+        handshake_seconds = dict(_CLIENT_STATS["handshake_seconds"])
+        clients_alive = sum(1 for name in _CLIENT_REGISTRY if name != "credentials")
+        reused = _CLIENT_STATS["reused"]
+        created = _CLIENT_STATS["created"]
+
+    avg_handshake = sum(handshake_seconds.values()) / len(handshake_seconds) if handshake_seconds else 0.0
+    return {
+        "clients_alive": clients_alive,
+        "clients_created": created,
+        "reuse_count": reused,
+        "handshake_seconds": handshake_seconds,
+        "seconds_saved": reused * avg_handshake,
+        "token_expiry": getattr(_CLIENT_REGISTRY.get("credentials"), "expiry", None),
+    }
 
 def create_bigquery_table(client):
     """
@@ -63,97 +199,674 @@ def create_bigquery_table(client):
         client.get_table(f"{project_id}.{dataset_id}.{table_id}")  # Check if table exists
         st.info("✅ BigQuery table already exists.")
     except:
-        client.create_table(f"{project_id}.{dataset_id}.{table_id}", schema=schema)
+        layout = TABLE_LAYOUTS["scraper"]
+        table = bigquery.Table(f"{project_id}.{dataset_id}.{table_id}", schema=schema)
+        table.time_partitioning = bigquery.TimePartitioning(
+            type_=PARTITION_GRANULARITY, field=layout["partition_fields"][0]
+        )
+        table.clustering_fields = list(layout["clustering_fields"])
+        client.create_table(table)
         st.success("🚀 BigQuery table created successfully!")
 
-# Fetch rows to validate
-def fetch_data(client):
-    # Get environment variables from either source
+def property_table_id():
+    """
+    Returns the fully qualified ID of the property table.
+    """
     project_id = st.secrets.get("PROJECT_ID") or os.getenv('PROJECT_ID')
     dataset_id = st.secrets.get("DATASET_ID") or os.getenv('DATASET_ID')
     table_id = st.secrets.get("TABLE_ID") or os.getenv('TABLE_ID')
-    
-    query = f"""
-        SELECT * FROM `{project_id}.{dataset_id}.{table_id}`
-        WHERE is_validated = FALSE
-        LIMIT 100
+    return f"{project_id}.{dataset_id}.{table_id}"
+
+def geo_table_id():
+    """
+    Returns the fully qualified ID of the property -> community geo table.
     """
-    return client.query(query).to_dataframe(create_bqstorage_client=True)
+    project_id = st.secrets.get("PROJECT_ID") or os.getenv('PROJECT_ID')
+    dataset_id = st.secrets.get("DATASET_ID") or os.getenv('DATASET_ID')
+    table_id = st.secrets.get("GEO_TABLE_ID") or os.getenv('GEO_TABLE_ID')
+    return f"{project_id}.{dataset_id}.{table_id}"
 
-def fetch_data_all(client):
-    # Get environment variables from either source
+def scraper_table_id():
+    """
+    Returns the fully qualified ID of the scraper results table.
+    """
     project_id = st.secrets.get("PROJECT_ID") or os.getenv('PROJECT_ID')
     dataset_id = st.secrets.get("DATASET_ID") or os.getenv('DATASET_ID')
-    table_id = st.secrets.get("TABLE_ID") or os.getenv('TABLE_ID')
-    geo_table_id = st.secrets.get("GEO_TABLE_ID") or os.getenv('GEO_TABLE_ID')
+    table_id = st.secrets.get("SCRAPER_TABLE_ID") or os.getenv('SCRAPER_TABLE_ID')
+    return f"{project_id}.{dataset_id}.{table_id}"
+
+# Physical layout of each table. The first partition field present in a
+# table's schema is used; clustering follows the predicates the app filters
+# on (`is_validated` for the queue, `property_id` for updates and lookups).
+# `community` lives in the geo table, so that is where it is clustered.
+TABLE_LAYOUTS = {
+    "property": {
+        "table_id": property_table_id,
+        "partition_fields": ("inserted_at", "validation_timestamp"),
+        "clustering_fields": ("is_validated", "property_id"),
+    },
+    "geo": {
+        "table_id": geo_table_id,
+        "partition_fields": (),
+        "clustering_fields": ("community", "property_id"),
+    },
+    "scraper": {
+        "table_id": scraper_table_id,
+        "partition_fields": ("timestamp", "inserted_at"),
+        "clustering_fields": ("url",),
+    },
+}
+# Monthly partitions: the tables are far too small for daily ones
+PARTITION_GRANULARITY = bigquery.TimePartitioningType.MONTH
+
+# Columns each page actually reads
+VALIDATOR_COLUMNS = [
+    "property_id", "listing_urls", "price", "sqft", "rooms", "bathroom",
+    "property_type", "latitude", "longitude", "aes_score", "is_validated",
+]
+DASHBOARD_COLUMNS = [
+    "property_id", "property_type", "community", "price", "rooms",
+    "bathroom", "sqft", "latitude", "longitude",
+]
+
+def build_property_query(columns=None, filters=None, join_geo=False, limit=None):
+    """
+    Builds a parameterized SELECT over the property table.
+
+    Only the requested columns are read and every filter becomes a query
+    parameter, so BigQuery scans just those columns, prunes rows server-side
+    and can serve repeated filter states from its result cache.
+
+    Args:
+        columns (list, optional): Columns to select. Defaults to all columns.
+        filters (dict, optional): Any of
+            `property_type`, `community` (value or None for all),
+            `price`, `rooms`, `sqft` ((min, max) tuples),
+            `is_validated` (bool), `property_ids` and `exclude_property_ids` (lists).
+        join_geo (bool): Left join the geo table for `community`. Implied when
+            a community filter is given.
+        limit (int, optional): Maximum number of rows.
+
+    Returns:
+        tuple: (query string, list of bigquery query parameters)
+    """
+    filters = filters or {}
+    predicates = []
+    params = []
+
+    for field in ("property_type", "community"):
+        if filters.get(field) is not None:
+            predicates.append(f"{field} = @{field}")
+            params.append(bigquery.ScalarQueryParameter(field, "STRING", filters[field]))
+
+    for field in ("price", "rooms", "sqft"):
+        if filters.get(field) is not None:
+            low, high = filters[field]
+            predicates.append(f"{field} BETWEEN @{field}_min AND @{field}_max")
+            params.append(bigquery.ScalarQueryParameter(f"{field}_min", "FLOAT64", float(low)))
+            params.append(bigquery.ScalarQueryParameter(f"{field}_max", "FLOAT64", float(high)))
+
+    if filters.get("is_validated") is not None:
+        predicates.append("is_validated = @is_validated")
+        params.append(bigquery.ScalarQueryParameter("is_validated", "BOOL", filters["is_validated"]))
+
+    if filters.get("property_ids") is not None:
+        predicates.append("property_id IN UNNEST(@property_ids)")
+        params.append(bigquery.ArrayQueryParameter("property_ids", "STRING", [str(i) for i in filters["property_ids"]]))
+
+    if filters.get("exclude_property_ids"):
+        predicates.append("property_id NOT IN UNNEST(@exclude_property_ids)")
+        params.append(bigquery.ArrayQueryParameter("exclude_property_ids", "STRING", [str(i) for i in filters["exclude_property_ids"]]))
+
+    join_geo = join_geo or filters.get("community") is not None or "community" in (columns or [])
+    query = f"SELECT {', '.join(columns) if columns else '*'} FROM `{property_table_id()}`"
+    if join_geo:
+        query += f" LEFT JOIN `{geo_table_id()}` AS geo_coords USING (`property_id`)"
+    if predicates:
+        query += " WHERE " + " AND ".join(predicates)
+    if limit is not None:
+        query += f" LIMIT {int(limit)}"
+    return query, params
+
+def run_query(client, name, query, params=None, to_dataframe=False, bqstorage=False):
+    """
+    Runs a query through the instrumented executor.
+
+    Every query in the app goes through here so its wall time, queue time,
+    bytes processed/billed, slot-ms, cache hit and row count are recorded
+    under `name` (see utils/query_telemetry.py).
+
+    Args:
+        client (bigquery.Client): The BigQuery client instance.
+        name (str): Telemetry label, usually the calling function's name.
+        query (str): SQL to run.
+        params (list, optional): Query parameters.
+        to_dataframe (bool): Return a DataFrame instead of the row iterator.
+        bqstorage (bool): Download through the shared Storage read client.
+    """
+    job_config = bigquery.QueryJobConfig(query_parameters=params or [])
+    fetch = None
+    if to_dataframe:
+        def fetch(job):
+            return job.to_dataframe(bqstorage_client=create_bqstorage_client() if bqstorage else None)
+    return timed_query(client, name, query, job_config=job_config, fetch=fetch)
+
+def run_property_query(client, query, params, name="property_query"):
+    return run_query(client, name, query, params, to_dataframe=True, bqstorage=True)
+
+# Fetch rows to validate
+def fetch_data(client, columns=VALIDATOR_COLUMNS, limit=100, exclude_ids=None):
+    query, params = build_property_query(
+        columns=columns,
+        filters={"is_validated": False, "exclude_property_ids": exclude_ids},
+        limit=limit,
+    )
+    return run_property_query(client, query, params, name="fetch_data")
+
+def fetch_data_all(client, columns=None, filters=None):
+    query, params = build_property_query(columns=columns, filters=filters, join_geo=True)
+    return run_property_query(client, query, params, name="fetch_data_all")
+
+def fetch_filter_options(client):
+    """
+    Returns the values the Dashboard filter widgets need without downloading rows.
+
+    Returns:
+        dict: `property_types` and `communities` lists plus `price`, `rooms`
+        and `sqft` (min, max) tuples.
+    """
     query = f"""
-        SELECT * FROM `{project_id}.{dataset_id}.{table_id}`
-        LEFT JOIN `{project_id}.{dataset_id}.{geo_table_id}` AS geo_coords USING (`property_id`)
+        SELECT
+            ARRAY_AGG(DISTINCT property_type IGNORE NULLS) AS property_types,
+            ARRAY_AGG(DISTINCT community IGNORE NULLS) AS communities,
+            MIN(price) AS price_min, MAX(price) AS price_max,
+            MIN(rooms) AS rooms_min, MAX(rooms) AS rooms_max,
+            MIN(sqft) AS sqft_min, MAX(sqft) AS sqft_max
+        FROM `{property_table_id()}`
+        LEFT JOIN `{geo_table_id()}` AS geo_coords USING (`property_id`)
     """
-    return client.query(query).to_dataframe(create_bqstorage_client=True)
+    row = run_query(client, "fetch_filter_options", query, to_dataframe=True).iloc[0]
+    return {
+        "property_types": sorted(row["property_types"]),
+        "communities": sorted(row["communities"]),
+        "price": (row["price_min"], row["price_max"]),
+        "rooms": (row["rooms_min"], row["rooms_max"]),
+        "sqft": (row["sqft_min"], row["sqft_max"]),
+    }
 
-# Update validation status
-def update_validation(client, row_ids, user):
-    if not row_ids:
-        return
-    
-    # Get environment variables from either source
-    project_id = st.secrets.get("PROJECT_ID") or os.getenv('PROJECT_ID')
-    dataset_id = st.secrets.get("DATASET_ID") or os.getenv('DATASET_ID')
-    table_id = st.secrets.get("TABLE_ID") or os.getenv('TABLE_ID')
-    
+def property_row_count(client):
+    """
+    Returns the property table's row count from table metadata (no query).
+    """
+    return client.get_table(property_table_id()).num_rows
+
+def update_validation_query(row_ids, user):
+    """
+    Builds the parameterized UPDATE that marks properties validated by `user`.
+
+    Returns:
+        tuple: (query string, list of bigquery query parameters)
+    """
     # Get Jamaica timezone
     jamaica_tz = pytz.timezone('America/Jamaica')
     current_time = datetime.now(jamaica_tz)
-    
-    # Format row_ids as quoted strings for SQL
-    formatted_ids = [f"'{str(r)}'" for r in row_ids]
-    
+
     query = f"""
-        UPDATE `{project_id}.{dataset_id}.{table_id}`
+        UPDATE `{property_table_id()}`
         SET is_validated = TRUE,
-            validated_by = '{user}',
-            validation_timestamp = '{current_time}'
-        WHERE property_id IN ({','.join(formatted_ids)})
+            validated_by = @user,
+            validation_timestamp = @validation_timestamp
+        WHERE property_id IN UNNEST(@property_ids)
     """
-    client.query(query).result()
-    
-# Summary query
+    params = [
+        bigquery.ScalarQueryParameter("user", "STRING", user),
+        bigquery.ScalarQueryParameter("validation_timestamp", "TIMESTAMP", current_time),
+        bigquery.ArrayQueryParameter("property_ids", "STRING", [str(r) for r in row_ids]),
+    ]
+    return query, params
+
+# Update validation status
+def update_validation(client, row_ids, user):
+    if not row_ids:
+        return
+    query, params = update_validation_query(row_ids, user)
+    run_counted(client, "update_validation", query,
+                _validation_delta_sql("property_id IN UNNEST(@property_ids)"), params)
+
+# Fields a validator can edit; MERGE only overwrites the ones listed in changed_fields
+VALIDATION_FIELDS = {
+    "price": "FLOAT64",
+    "sqft": "FLOAT64",
+    "rooms": "FLOAT64",
+    "bathroom": "FLOAT64",
+    "property_type": "STRING",
+    "latitude": "FLOAT64",
+    "longitude": "FLOAT64",
+    "aes_score": "FLOAT64",
+}
+
+def merge_validations_query(source):
+    """
+    Builds the MERGE that applies staged validations from `source` (a table
+    reference or subquery with the staging schema) to the property table.
+    """
+    field_updates = ",\n                ".join(
+        f"{field} = IF('{field}' IN UNNEST(S.changed_fields), S.{field}, T.{field})"
+        for field in VALIDATION_FIELDS
+    )
+    return f"""
+        MERGE `{property_table_id()}` T
+        USING {source} S
+        ON T.property_id = S.property_id
+        WHEN MATCHED THEN UPDATE SET
+            is_validated = TRUE,
+            validated_by = S.validated_by,
+            validation_timestamp = S.validation_timestamp,
+            {field_updates}
+    """
+
+def merge_validations(client, records):
+    """
+    Applies a batch of validations (with optional field edits) in a single MERGE.
+
+    The batch is written to a short-lived staging table with a load job, which
+    does not count against the per-table DML limits, and then merged into the
+    property table in one statement.
+
+    Args:
+        client (bigquery.Client): The BigQuery client instance.
+        records (list): Dicts with `property_id`, `validated_by`,
+            `validation_timestamp` (ISO string) and `changes` (field -> new value).
+            Later records for the same property win.
+
+    Returns:
+        int: The number of distinct properties merged.
+    """
+    if not records:
+        return 0
 
-def summary_query(client):
     # Get environment variables from either source
     project_id = st.secrets.get("PROJECT_ID") or os.getenv('PROJECT_ID')
     dataset_id = st.secrets.get("DATASET_ID") or os.getenv('DATASET_ID')
     table_id = st.secrets.get("TABLE_ID") or os.getenv('TABLE_ID')
-    
+
+    # Collapse to one staging row per property, keeping the latest edit of each field
+    rows = {}
+    for record in sorted(records, key=lambda r: r["validation_timestamp"]):
+        row = rows.setdefault(record["property_id"], {
+            "property_id": record["property_id"],
+            "changed_fields": [],
+        })
+        row["validated_by"] = record["validated_by"]
+        row["validation_timestamp"] = record["validation_timestamp"]
+        for field, value in (record.get("changes") or {}).items():
+            if field not in VALIDATION_FIELDS:
+                continue
+            if field not in row["changed_fields"]:
+                row["changed_fields"].append(field)
+            row[field] = value
+
+    schema = [
+        bigquery.SchemaField("property_id", "STRING", mode="REQUIRED"),
+        bigquery.SchemaField("validated_by", "STRING"),
+        bigquery.SchemaField("validation_timestamp", "TIMESTAMP"),
+        bigquery.SchemaField("changed_fields", "STRING", mode="REPEATED"),
+    ] + [bigquery.SchemaField(field, field_type) for field, field_type in VALIDATION_FIELDS.items()]
+
+    staging_id = f"{project_id}.{dataset_id}.{table_id}_validation_staging_{uuid.uuid4().hex[:12]}"
+    staging_table = bigquery.Table(staging_id, schema=schema)
+    staging_table.expires = datetime.now(pytz.utc) + timedelta(days=1)
+    client.create_table(staging_table)
+
+    try:
+        job_config = bigquery.LoadJobConfig(
+            schema=schema,
+            write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+        )
+        client.load_table_from_json(list(rows.values()), staging_id, job_config=job_config).result()
+
+        query = merge_validations_query(f"`{staging_id}`")
+        run_counted(client, "merge_validations", query, _validation_delta_sql(
+            f"property_id IN (SELECT property_id FROM `{staging_id}`)"
+        ))
+    finally:
+        client.delete_table(staging_id, not_found_ok=True)
+
+    return len(rows)
+
+# Summary query
+
+def summary_reconcile_interval():
+    """
+    Returns how stale the maintained counters may get before a background reconcile.
+    """
+    return timedelta(
+        minutes=int(st.secrets.get("SUMMARY_RECONCILE_MINUTES") or os.getenv('SUMMARY_RECONCILE_MINUTES') or 60)
+    )
+
+_summary_lock = threading.Lock()
+_summary_ready = False
+_reconcile_future = None
+
+def summary_table_id():
+    """
+    Returns the ID of the one-row table holding the maintained summary counters.
+    """
+    return (st.secrets.get("SUMMARY_TABLE_ID") or os.getenv('SUMMARY_TABLE_ID')
+            or f"{property_table_id()}_summary")
+
+def _summary_table_ready(client):
+    global _summary_ready
+    with _summary_lock:
+        if not _summary_ready:
+            try:
+                client.get_table(summary_table_id())
+                _summary_ready = True
+            except Exception:
+                pass
+        return _summary_ready
+
+def _validation_delta_sql(predicate):
+    # Marking rows validated moves FALSE rows out of `unvalidated` and
+    # FALSE/NULL rows into `validated`
+    return f"""
+        SELECT AS STRUCT
+            0 AS total,
+            COUNTIF(is_validated IS NOT TRUE) AS validated,
+            -COUNTIF(is_validated = FALSE) AS unvalidated
+        FROM `{property_table_id()}`
+        WHERE {predicate}
+    """
+
+# Counter updates all touch the one summary row, so they can collide with
+# each other; BigQuery rejects the loser instead of queueing it
+SUMMARY_UPDATE_ATTEMPTS = 4
+
+def _is_concurrent_update_error(error):
+    message = str(error).lower()
+    return "concurrent update" in message or "could not serialize access" in message
+
+def _run_summary_update(client, name, query, params=None):
+    """
+    Runs a statement against the summary table, retrying with jittered
+    exponential backoff when it loses a race with another counter update.
+    """
+    for attempt in range(SUMMARY_UPDATE_ATTEMPTS):
+        try:
+            return run_query(client, name, query, params)
+        except Exception as e:
+            if attempt == SUMMARY_UPDATE_ATTEMPTS - 1 or not _is_concurrent_update_error(e):
+                raise
+            time.sleep(0.5 * 2 ** attempt + random.uniform(0, 0.5))
+
+def run_counted(client, name, statement, delta_sql, params=None):
+    """
+    Runs a DML statement against the property table, then applies its effect
+    to the summary counters.
+
+    The delta is read in the same script just before the statement, but the
+    counters are updated by a separate follow-up job (`adjust_summary`), so
+    property writes never contend on the summary row. If the follow-up fails,
+    or a concurrent write lands between the delta and the statement, the
+    counters drift until the next `reconcile_summary`.
+
+    Args:
+        client (bigquery.Client): The BigQuery client instance.
+        name (str): Telemetry label.
+        statement (str): DML against the property table.
+        delta_sql (str): SELECT AS STRUCT returning `total`, `validated` and
+            `unvalidated` deltas.
+        params (list, optional): Query parameters used by either.
+    """
+    if not _summary_table_ready(client):
+        # The next reconcile picks the write up
+        run_query(client, name, statement, params)
+        return
+    query = f"""
+        DECLARE delta STRUCT<total INT64, validated INT64, unvalidated INT64>;
+        SET delta = ({delta_sql});
+        {statement};
+        SELECT delta.total AS total, delta.validated AS validated, delta.unvalidated AS unvalidated;
+    """
+    delta = run_query(client, name, query, params, to_dataframe=True).iloc[0]
+    adjust_summary(client, total=int(delta["total"]), validated=int(delta["validated"]),
+                   unvalidated=int(delta["unvalidated"]))
+
+def _apply_summary_delta(client, total, validated, unvalidated):
     query = f"""
-        SELECT 
+        UPDATE `{summary_table_id()}`
+        SET total_rows = total_rows + @total,
+            validated_rows = validated_rows + @validated,
+            unvalidated_rows = unvalidated_rows + @unvalidated,
+            updated_at = CURRENT_TIMESTAMP()
+        WHERE TRUE
+    """
+    params = [
+        bigquery.ScalarQueryParameter("total", "INT64", total),
+        bigquery.ScalarQueryParameter("validated", "INT64", validated),
+        bigquery.ScalarQueryParameter("unvalidated", "INT64", unvalidated),
+    ]
+    try:
+        _run_summary_update(client, "adjust_summary", query, params)
+    except Exception as e:
+        print(f"Error adjusting summary counters: {str(e)}")
+
+def adjust_summary(client, total=0, validated=0, unvalidated=0):
+    """
+    Applies a delta to the summary counters in the background.
+
+    Failures only leave drift for the next reconcile, so they are logged, not raised.
+    """
+    if not (total or validated or unvalidated) or not _summary_table_ready(client):
+        return
+    submit_background(_apply_summary_delta, client, total, validated, unvalidated)
+
+def summary_recount_sql():
+    """
+    The full-scan count the summary counters are reconciled against.
+    """
+    return f"""
+        SELECT
             COUNT(*) AS total_rows,
-            SUM(CASE WHEN is_validated THEN 1 ELSE 0 END) AS validated_rows,
-            SUM(CASE WHEN NOT is_validated THEN 1 ELSE 0 END) AS unvalidated_rows
-        FROM `{project_id}.{dataset_id}.{table_id}`
+            COUNTIF(is_validated) AS validated_rows,
+            COUNTIF(NOT is_validated) AS unvalidated_rows
+        FROM `{property_table_id()}`
     """
-    return client.query(query).to_dataframe()
 
-def delete_property(client, property_id):
+def reconcile_summary(client):
     """
-    Delete a property from the BigQuery table
+    Recomputes the summary counters from a full scan of the property table.
+
+    Creates the summary table on first run. The recount is written with a
+    single MERGE, so readers never see the row missing. A counter update that
+    lands while the recount runs can be lost or double counted; that drift is
+    what the next reconcile corrects.
     """
-    project_id = st.secrets.get("PROJECT_ID") or os.getenv('PROJECT_ID')
-    dataset_id = st.secrets.get("DATASET_ID") or os.getenv('DATASET_ID')
-    table_id = st.secrets.get("TABLE_ID") or os.getenv('TABLE_ID')
-    
+    global _summary_ready
+    _run_summary_update(client, "reconcile_summary", f"""
+        CREATE TABLE IF NOT EXISTS `{summary_table_id()}` (
+            total_rows INT64,
+            validated_rows INT64,
+            unvalidated_rows INT64,
+            updated_at TIMESTAMP,
+            reconciled_at TIMESTAMP
+        );
+        MERGE `{summary_table_id()}` T
+        USING ({summary_recount_sql()}) S
+        ON TRUE
+        WHEN MATCHED THEN UPDATE SET
+            total_rows = S.total_rows,
+            validated_rows = S.validated_rows,
+            unvalidated_rows = S.unvalidated_rows,
+            updated_at = CURRENT_TIMESTAMP(),
+            reconciled_at = CURRENT_TIMESTAMP()
+        WHEN NOT MATCHED THEN
+            INSERT (total_rows, validated_rows, unvalidated_rows, updated_at, reconciled_at)
+            VALUES (S.total_rows, S.validated_rows, S.unvalidated_rows, CURRENT_TIMESTAMP(), CURRENT_TIMESTAMP());
+    """)
+    with _summary_lock:
+        _summary_ready = True
+
+def _schedule_reconcile(client):
+    global _reconcile_future
+    with _summary_lock:
+        if _reconcile_future is not None and not _reconcile_future.done():
+            return
+        _reconcile_future = submit_background(reconcile_summary, client)
+
+def summary_query(client):
+    """
+    Returns total, validated and unvalidated row counts.
+
+    Reads the maintained counters table (one row) instead of scanning the
+    property table. Counters older than `summary_reconcile_interval()` are
+    reconciled in the background; if the counters table doesn't exist yet it
+    is built first.
+
+    Returns:
+        pd.DataFrame: One row with `total_rows`, `validated_rows`,
+        `unvalidated_rows` and `reconciled_at`.
+    """
+    if not _summary_table_ready(client):
+        reconcile_summary(client)
+
+    query = f"""
+        SELECT total_rows, validated_rows, unvalidated_rows, reconciled_at
+        FROM `{summary_table_id()}`
+        LIMIT 1
+    """
+    summary = run_query(client, "summary_query", query, to_dataframe=True)
+    reconciled_at = summary["reconciled_at"].iloc[0] if not summary.empty else None
+    if reconciled_at is None or datetime.now(pytz.utc) - reconciled_at > summary_reconcile_interval():
+        _schedule_reconcile(client)
+    return summary
+
+# Authoritative list of communities maintained alongside the aggregated prices
+COMMUNITIES_TABLE_ID = "price-aggregator-f9e4b.aggregated_prices.communities"
+
+def fetch_authoritative_communities(client):
+    """
+    Returns the authoritative communities table with lower-cased column names.
+    """
+    query = f"""
+        SELECT * FROM `{COMMUNITIES_TABLE_ID}`
+    """
+    communities_df = run_query(client, "authoritative_communities", query, to_dataframe=True)
+    communities_df.columns = communities_df.columns.str.lower()
+    return communities_df
+
+def add_community_row(client, community, parish, city, latitude, longitude):
+    """
+    Adds a community to the authoritative communities table.
+    """
+    query = f"""
+    INSERT INTO `{COMMUNITIES_TABLE_ID}` (Community, Parish, City, Latitude, Longitude)
+    VALUES (@community, @parish, @city, @latitude, @longitude)
+    """
+    params = [
+        bigquery.ScalarQueryParameter("community", "STRING", community),
+        bigquery.ScalarQueryParameter("parish", "STRING", parish),
+        bigquery.ScalarQueryParameter("city", "STRING", city),
+        bigquery.ScalarQueryParameter("latitude", "FLOAT64", latitude),
+        bigquery.ScalarQueryParameter("longitude", "FLOAT64", longitude),
+    ]
+    run_query(client, "add_community_row", query, params)
+
+def delete_properties(client, property_ids):
+    """
+    Deletes properties from the BigQuery table in one statement.
+
+    Args:
+        client (bigquery.Client): The BigQuery client instance.
+        property_ids (list): The properties to delete.
+
+    Returns:
+        int: The number of property_ids submitted.
+    """
+    if not property_ids:
+        return 0
+    predicate = "property_id IN UNNEST(@property_ids)"
     query = f"""
-    DELETE FROM `{project_id}.{dataset_id}.{table_id}`
-    WHERE property_id = '{property_id}'
+    DELETE FROM `{property_table_id()}`
+    WHERE {predicate}
+    """
+    params = [bigquery.ArrayQueryParameter("property_ids", "STRING", [str(i) for i in property_ids])]
+    run_counted(client, "delete_properties", query, f"""
+        SELECT AS STRUCT
+            -COUNT(*) AS total,
+            -COUNTIF(is_validated) AS validated,
+            -COUNTIF(NOT is_validated) AS unvalidated
+        FROM `{property_table_id()}`
+        WHERE {predicate}
+    """, params)
+    return len(property_ids)
+
+def delete_property(client, property_id):
+    """
+    Delete a property from the BigQuery table
     """
     try:
-        client.query(query)
+        delete_properties(client, [property_id])
         return True
     except Exception as e:
         print(f"Error deleting property: {str(e)}")
         return False
 
+def property_row_from_listing(property_data, url):
+    """
+    Converts scraped/manual listing fields into a property table row.
+
+    Args:
+        property_data (dict): Dictionary containing property information
+        url (str): The URL of the property listing
+
+    Returns:
+        dict: The row, with a fresh collision-free `property_id`.
+
+    Raises:
+        ValueError: If a numeric field can't be converted.
+    """
+    # Convert string values to appropriate types
+    sqft = float(property_data['square_feet']) if property_data['square_feet'] else None
+    rooms = float(property_data['bedrooms']) if property_data['bedrooms'] else None
+    bathroom = float(property_data['bathrooms']) if property_data['bathrooms'] else None
+    price = float(property_data['price']) if property_data['price'] else None
+
+    return {
+        "property_id": new_property_id(),
+        "listing_urls": url,
+        "sqft": sqft,
+        "rooms": rooms,
+        "bathroom": bathroom,
+        "property_type": "apartment",
+        "price": price,
+        "is_validated": False,
+    }
+
+def add_property_rows(client, listings):
+    """
+    Bulk-adds properties to the BigQuery table with batched Parquet load jobs.
+
+    Args:
+        client: BigQuery client instance
+        listings (list): (property_data, url) pairs
+
+    Returns:
+        list: The property_ids that were written.
+    """
+    property_ids = []
+    with BulkIngester(client, property_table_id()) as ingester:
+        for property_data, url in listings:
+            try:
+                row = property_row_from_listing(property_data, url)
+            except ValueError as e:
+                print(f"Error converting values for {url}: {str(e)}")
+                continue
+            ingester.add(row)
+            property_ids.append(row["property_id"])
+    adjust_summary(client, total=len(property_ids), unvalidated=len(property_ids))
+    return property_ids
+
 def add_property_row(client, property_data, url):
     """
     Add a new property row to the BigQuery table.
@@ -163,42 +876,8 @@ def add_property_row(client, property_data, url):
         property_data (dict): Dictionary containing property information
         url (str): The URL of the property listing
     """
-    # Get environment variables from either source
-    project_id = st.secrets.get("PROJECT_ID") or os.getenv('PROJECT_ID')
-    dataset_id = st.secrets.get("DATASET_ID") or os.getenv('DATASET_ID')
-    table_id = st.secrets.get("TABLE_ID") or os.getenv('TABLE_ID')
-    
-    # Generate a unique property_id (you might want to adjust this logic)
-    property_id = f"PROP_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-    
-    # Convert string values to appropriate types
-    try:
-        sqft = float(property_data['square_feet']) if property_data['square_feet'] else None
-        rooms = float(property_data['bedrooms']) if property_data['bedrooms'] else None
-        bathroom = float(property_data['bathrooms']) if property_data['bathrooms'] else None
-        price = float(property_data['price']) if property_data['price'] else None
-    except ValueError as e:
-        print(f"Error converting values: {str(e)}")
-        return False
-    
-    query = f"""
-        INSERT INTO `{project_id}.{dataset_id}.{table_id}`
-        (property_id, listing_urls, sqft, rooms, bathroom, 
-         property_type, price, is_validated)
-        VALUES
-        ('{property_id}',
-         '{url}',
-         {sqft if sqft is not None else 'NULL'},
-         {rooms if rooms is not None else 'NULL'},
-         {bathroom if bathroom is not None else 'NULL'},
-         'apartment',
-         {price if price is not None else 'NULL'},
-         FALSE)
-    """
-    
     try:
-        client.query(query).result()
-        return True
+        return bool(add_property_rows(client, [(property_data, url)]))
     except Exception as e:
         print(f"Error adding property: {str(e)}")
         return False
@@ -207,28 +886,27 @@ def insert_into_bigquery(client, results):
     """
     Inserts AI-processed screenshot data into BigQuery.
 
+    Rows go to the scraper table in batched Parquet load jobs, so large
+    screenshots never hit the streaming-insert request size limits. Columns
+    the table doesn't have (e.g. `screenshot`) are dropped.
+
     Args:
         client (bigquery.Client): The BigQuery client instance.
         results (list): A list of dictionaries containing the URL, screenshot, and AI response.
     """
-    dataset_id, table_id = st.secrets.get("DATASET_ID"), st.secrets.get("TABLE_ID")
-    table_ref = client.dataset(dataset_id).table(table_id)
-    rows_to_insert = []
-
-    for result in results:
-        if "error" in result:
-            continue  # Skip failed captures
-        
-        rows_to_insert.append({
-            "url": result["url"],
-            "screenshot": result["screenshot"],  # Store Base64 image (optional)
-            "ai_response": json.dumps(result["ai_response"]),  # Convert AI response to JSON string
-            "timestamp": datetime.utcnow().isoformat()
-        })
-
-    errors = client.insert_rows_json(table_ref, rows_to_insert)
+    try:
+        with BulkIngester(client, scraper_table_id(), batch_bytes=16 * 1024 * 1024) as ingester:
+            for result in results:
+                if "error" in result:
+                    continue  # Skip failed captures
 
-    if errors:
-        st.error(f"🚨 BigQuery Insert Errors: {errors}")
+                ingester.add({
+                    "url": result["url"],
+                    "screenshot": result["screenshot"],  # Raw PNG bytes, kept if the table has a BYTES column
+                    "ai_response": json.dumps(result["ai_response"]),  # Convert AI response to JSON string
+                    "timestamp": datetime.now(pytz.utc)
+                })
+    except Exception as e:
+        st.error(f"🚨 BigQuery Insert Errors: {e}")
     else:
         st.success("✅ Successfully saved results to BigQuery!")
@@ -0,0 +1,143 @@
+import secrets
+import threading
+from datetime import datetime
+from io import BytesIO
+import pytz
+from google.cloud import bigquery
+
+# pyarrow is imported on first flush; pages that never ingest don't load it
+_ARROW_TYPES = None
+
+def arrow_types():
+    """
+    Maps BigQuery column types to the Arrow types used in Parquet load files.
+    """
+    global _ARROW_TYPES
+    if _ARROW_TYPES is None:
+        import pyarrow as pa
+        _ARROW_TYPES = {
+            "STRING": pa.string(),
+            "JSON": pa.string(),
+            "BYTES": pa.binary(),
+            "INTEGER": pa.int64(),
+            "INT64": pa.int64(),
+            "FLOAT": pa.float64(),
+            "FLOAT64": pa.float64(),
+            "BOOLEAN": pa.bool_(),
+            "BOOL": pa.bool_(),
+            "TIMESTAMP": pa.timestamp("us", tz="UTC"),
+            "DATETIME": pa.timestamp("us"),
+            "DATE": pa.date32(),
+        }
+    return _ARROW_TYPES
+
+def new_property_id():
+    """
+    Returns a collision-free property ID.
+
+    Keeps the sortable `PROP_<timestamp>` prefix of the old scheme but adds
+    microseconds and a random suffix, so IDs generated in the same second
+    (or by concurrent sessions) never clash.
+    """
+    return f"PROP_{datetime.now().strftime('%Y%m%d%H%M%S%f')}_{secrets.token_hex(4)}"
+
+def _row_size(row):
+    return sum(len(v) if isinstance(v, (str, bytes)) else 8 for v in row.values())
+
+class BulkIngester:
+    """
+    Buffers rows and appends them to a table with Parquet load jobs.
+
+    Load jobs are free and don't use DML or streaming quotas, but each table
+    allows a limited number per day, so rows are sent in batches of up to
+    `batch_rows` rows or `batch_bytes` bytes. Rows are aligned to the
+    destination schema: unknown keys are dropped and `inserted_at` is filled
+    in when the table has that column.
+
+    Use as a context manager to flush the remainder on exit.
+    """
+
+    def __init__(self, client, table_id, batch_rows=5000, batch_bytes=64 * 1024 * 1024):
+        self.client = client
+        self.table_id = table_id
+        self.batch_rows = batch_rows
+        self.batch_bytes = batch_bytes
+        self.schema = client.get_table(table_id).schema
+        self.rows_written = 0
+        self.load_jobs = 0
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+
+    def add(self, row):
+        """
+        Buffers one row (a dict keyed by column name), flushing if a batch is full.
+        """
+        with self._lock:
+            self._buffer.append(row)
+            self._buffer_bytes += _row_size(row)
+            full = len(self._buffer) >= self.batch_rows or self._buffer_bytes >= self.batch_bytes
+        if full:
+            self.flush()
+
+    def add_many(self, rows):
+        for row in rows:
+            self.add(row)
+
+    def _to_arrow(self, rows):
+        import pyarrow as pa
+
+        now = datetime.now(pytz.utc)
+        arrays, fields = [], []
+        for field in self.schema:
+            arrow_type = arrow_types().get(field.field_type, pa.string())
+            if field.mode == "REPEATED":
+                arrow_type = pa.list_(arrow_type)
+            if field.name == "inserted_at":
+                values = [row.get("inserted_at") or now for row in rows]
+            else:
+                values = [row.get(field.name) for row in rows]
+            arrays.append(pa.array(values, type=arrow_type))
+            fields.append(pa.field(field.name, arrow_type, nullable=field.mode != "REQUIRED"))
+        return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+    def flush(self):
+        """
+        Sends buffered rows as one Parquet load job.
+
+        Returns:
+            int: The number of rows loaded.
+        """
+        with self._lock:
+            rows, self._buffer, self._buffer_bytes = self._buffer, [], 0
+        if not rows:
+            return 0
+
+        import pyarrow.parquet as pq
+
+        buffer = BytesIO()
+        pq.write_table(self._to_arrow(rows), buffer, compression="snappy")
+        buffer.seek(0)
+
+        job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.PARQUET,
+            write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+        )
+        try:
+            self.client.load_table_from_file(buffer, self.table_id, job_config=job_config).result()
+        except Exception:
+            # Keep the rows so the caller can retry the flush
+            with self._lock:
+                self._buffer = rows + self._buffer
+                self._buffer_bytes += sum(_row_size(row) for row in rows)
+            raise
+        self.rows_written += len(rows)
+        self.load_jobs += 1
+        return len(rows)
@@ -0,0 +1,113 @@
+import streamlit as st
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+COMMUNITIES_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "resources", "jamaican_communities_geocoded.csv")
+EARTH_RADIUS_KM = 6371.0088
+
+def _unit_vectors(latitudes, longitudes):
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    lon = np.radians(np.asarray(longitudes, dtype=float))
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+def community_max_distance_km():
+    """
+    Farthest a property can be from a community's centre and still be assigned
+    to it (COMMUNITY_MAX_DISTANCE_KM, default 3).
+    """
+    return float(st.secrets.get("COMMUNITY_MAX_DISTANCE_KM") or os.getenv('COMMUNITY_MAX_DISTANCE_KM') or 3)
+
+class CommunityIndex:
+    """
+    Nearest-community lookup over the geocoded communities CSV.
+
+    Community centres are stored as points on the unit sphere in a KD-tree,
+    so nearest-neighbour by straight-line (chord) distance is nearest by
+    great-circle distance too, and a whole batch of properties is matched in
+    one vectorized query without a BigQuery join.
+    """
+
+    def __init__(self, path=COMMUNITIES_CSV, max_distance_km=None):
+        from scipy.spatial import cKDTree
+
+        communities = pd.read_csv(path)
+        communities.columns = communities.columns.str.lower()
+        self.communities = communities.dropna(subset=["latitude", "longitude"]).reset_index(drop=True)
+        self.max_distance_km = max_distance_km if max_distance_km is not None else community_max_distance_km()
+        self._tree = cKDTree(_unit_vectors(self.communities["latitude"], self.communities["longitude"]))
+        self._filled = None   # (source frame, filled copy) for fill_missing_shared
+        self._lock = threading.Lock()
+
+    def assign(self, latitudes, longitudes, max_distance_km=None):
+        """
+        Finds the nearest community for each coordinate pair.
+
+        Args:
+            latitudes (array-like): Latitudes in degrees (NaN allowed).
+            longitudes (array-like): Longitudes in degrees (NaN allowed).
+            max_distance_km (float, optional): Overrides the index's threshold.
+
+        Returns:
+            pd.DataFrame: `community`, `parish`, `city` and `distance_km` per
+            input row, with None (NaN distance) where the coordinates are missing
+            or the nearest community is farther than the threshold.
+        """
+        max_distance_km = self.max_distance_km if max_distance_km is None else max_distance_km
+        points = _unit_vectors(latitudes, longitudes)
+        valid = np.isfinite(points).all(axis=1)
+
+        chord = np.full(len(points), np.inf)
+        nearest = np.zeros(len(points), dtype=int)
+        if valid.any():
+            chord[valid], nearest[valid] = self._tree.query(points[valid])
+        distance_km = 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0, 1))
+        matched = valid & (distance_km <= max_distance_km)
+
+        result = self.communities.loc[nearest, ["community", "parish", "city"]].reset_index(drop=True).astype(object)
+        result.loc[~matched, ["community", "parish", "city"]] = None
+        result["distance_km"] = np.where(matched, distance_km, np.nan)
+        return result
+
+    def fill_missing(self, df):
+        """
+        Returns a copy of `df` with missing `community` values inferred from
+        latitude/longitude; `community_inferred` marks the rows that were filled.
+        """
+        df = df.copy()
+        if "community" not in df.columns:
+            df["community"] = None
+        missing = df["community"].isna().to_numpy()
+        df["community_inferred"] = False
+        if missing.any():
+            inferred = self.assign(df.loc[missing, "latitude"], df.loc[missing, "longitude"])["community"].to_numpy()
+            df.loc[missing, "community"] = inferred
+            df.loc[missing, "community_inferred"] = pd.notna(inferred)
+        return df
+
+    def fill_missing_shared(self, df):
+        """
+        `fill_missing` for a frame shared between sessions (e.g. the incremental
+        loader's dataset): the filled copy is reused until the source frame changes.
+        """
+        with self._lock:
+            if self._filled is not None and self._filled[0] is df:
+                return self._filled[1]
+        filled = self.fill_missing(df)
+        with self._lock:
+            self._filled = (df, filled)
+        return filled
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_community_index():
+    """
+    Returns the process-wide community index, built once from the CSV.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = CommunityIndex()
+        return _index
@@ -0,0 +1,148 @@
+import pandas as pd
+from google.cloud import bigquery
+from utils.bigquery_utils import build_property_query, run_query, DASHBOARD_COLUMNS
+
+# Every aggregate runs over the same filtered, projected rows as the row-level
+# Dashboard query, wrapped in a CTE so the filters are applied server-side.
+
+def _run(client, name, select, filters, params=None, columns=DASHBOARD_COLUMNS):
+    base, base_params = build_property_query(columns=columns, filters=filters, join_geo=True)
+    query = f"WITH filtered AS ({base})\n{select}"
+    return run_query(client, f"aggregate_{name}", query, base_params + (params or []), to_dataframe=True)
+
+def count_rows(client, filters):
+    """
+    Returns how many rows match the Dashboard filters.
+    """
+    df = _run(client, "count_rows", "SELECT COUNT(*) AS row_count FROM filtered", filters, columns=["property_id"])
+    return int(df['row_count'].iloc[0])
+
+def value_counts(client, filters, by):
+    """
+    Group counts, equivalent to `df.groupby(by).size()`.
+
+    Args:
+        by (list): Columns to group by.
+
+    Returns:
+        pd.DataFrame: The `by` columns plus `count`, largest first.
+    """
+    group = ", ".join(by)
+    return _run(client, "value_counts", f"""
+        SELECT {group}, COUNT(*) AS count
+        FROM filtered
+        WHERE {" AND ".join(f"{c} IS NOT NULL" for c in by)}
+        GROUP BY {group}
+        ORDER BY count DESC
+    """, filters)
+
+def histogram(client, filters, column, bins=30):
+    """
+    Equal-width histogram computed in BigQuery.
+
+    Returns:
+        pd.DataFrame: `bin_start`, `bin_end` and `count` for each non-empty bin.
+    """
+    return _run(client, "histogram", f"""
+        WITH bounds AS (SELECT MIN({column}) AS lo, MAX({column}) AS hi FROM filtered),
+        bucketed AS (
+            SELECT
+                LEAST(IFNULL(CAST(FLOOR(SAFE_DIVIDE({column} - lo, hi - lo) * @bins) AS INT64), 0), @bins - 1) AS bucket,
+                lo, hi
+            FROM filtered, bounds
+            WHERE {column} IS NOT NULL
+        )
+        SELECT
+            lo + bucket * (hi - lo) / @bins AS bin_start,
+            lo + (bucket + 1) * (hi - lo) / @bins AS bin_end,
+            COUNT(*) AS count
+        FROM bucketed
+        GROUP BY bucket, lo, hi
+        ORDER BY bucket
+    """, filters, [bigquery.ScalarQueryParameter("bins", "INT64", bins)])
+
+def quantiles(client, filters, column, by=None):
+    """
+    Five-number summary (min, q1, median, q3, max) for box plots.
+
+    Args:
+        column (str): The value column.
+        by (str, optional): Column to produce one summary per group.
+
+    Returns:
+        pd.DataFrame: Optional `by` column plus `min`, `q1`, `median`, `q3`, `max`.
+    """
+    group_select = f"{by}, " if by else ""
+    group_filter = f" AND {by} IS NOT NULL" if by else ""
+    group_clause = f"GROUP BY {by}" if by else ""
+    order_clause = f"ORDER BY {by}" if by else ""
+    return _run(client, "quantiles", f"""
+        SELECT {group_select}
+            q[OFFSET(0)] AS min, q[OFFSET(1)] AS q1, q[OFFSET(2)] AS median,
+            q[OFFSET(3)] AS q3, q[OFFSET(4)] AS max
+        FROM (
+            SELECT {group_select}APPROX_QUANTILES({column}, 4) AS q
+            FROM filtered
+            WHERE {column} IS NOT NULL{group_filter}
+            {group_clause}
+        )
+        {order_clause}
+    """, filters)
+
+def group_means(client, filters, by, columns):
+    """
+    Per-group averages, equivalent to `df.groupby(by)[columns].mean()`.
+    """
+    averages = ", ".join(f"AVG({c}) AS {c}" for c in columns)
+    return _run(client, "group_means", f"""
+        SELECT {by}, {averages}
+        FROM filtered
+        WHERE {by} IS NOT NULL
+        GROUP BY {by}
+        ORDER BY {by}
+    """, filters)
+
+def correlations(client, filters, columns):
+    """
+    Pearson correlation matrix computed with BigQuery's CORR.
+
+    Returns:
+        pd.DataFrame: Square matrix indexed and labelled by `columns`.
+    """
+    pairs = [(a, b) for i, a in enumerate(columns) for b in columns[i + 1:]]
+    select = ", ".join(f"CORR({a}, {b}) AS {a}__{b}" for a, b in pairs)
+    row = _run(client, "correlations", f"SELECT {select} FROM filtered", filters).iloc[0]
+
+    matrix = pd.DataFrame(1.0, index=columns, columns=columns)
+    for a, b in pairs:
+        matrix.loc[a, b] = matrix.loc[b, a] = row[f"{a}__{b}"]
+    return matrix
+
+def map_grid(client, filters, precision=3):
+    """
+    Buckets coordinates to a lat/lon grid (about 100m at the default precision).
+
+    Returns:
+        pd.DataFrame: `latitude`, `longitude`, `count` and `avg_price` per cell.
+    """
+    return _run(client, "map_grid", """
+        SELECT
+            ROUND(latitude, @precision) AS latitude,
+            ROUND(longitude, @precision) AS longitude,
+            COUNT(*) AS count,
+            AVG(price) AS avg_price
+        FROM filtered
+        WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+        GROUP BY 1, 2
+    """, filters, [bigquery.ScalarQueryParameter("precision", "INT64", precision)])
+
+def sample_rows(client, filters, columns, size=5000):
+    """
+    A deterministic sample for scatter plots, so repeated filter states hit the result cache.
+    """
+    return _run(client, "sample_rows", f"""
+        SELECT {", ".join(columns)}
+        FROM filtered
+        ORDER BY FARM_FINGERPRINT(property_id)
+        LIMIT @size
+    """, filters, [bigquery.ScalarQueryParameter("size", "INT64", size)])
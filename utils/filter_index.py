@@ -0,0 +1,104 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+RANGE_COLUMNS = ("price", "rooms", "sqft")
+CATEGORY_COLUMNS = ("property_type", "community")
+
+class FilterIndex:
+    """
+    Resolves Dashboard filters to row positions without scanning the frame.
+
+    Built once per dataset version. Range columns are kept as row positions
+    sorted by value, so a slider range is two binary searches; categorical
+    columns have one packed bitmap per value. A filter combination is the
+    AND of the bitmaps involved, and only the matching rows are ever copied.
+    Rows with a missing value never match a filter on that column.
+    """
+
+    def __init__(self, df, range_columns=RANGE_COLUMNS, category_columns=CATEGORY_COLUMNS):
+        self.num_rows = len(df)
+        self._sorted = {}     # column -> (sorted values, their row positions)
+        self._bitmaps = {}    # column -> {value: packed bitmap}
+
+        for column in range_columns:
+            if column not in df.columns:
+                continue
+            values = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=float)
+            positions = np.flatnonzero(~np.isnan(values))
+            order = positions[np.argsort(values[positions], kind="stable")]
+            self._sorted[column] = (values[order], order)
+
+        for column in category_columns:
+            if column not in df.columns:
+                continue
+            codes, uniques = pd.factorize(df[column])
+            self._bitmaps[column] = {
+                value: np.packbits(codes == code) for code, value in enumerate(uniques)
+            }
+
+    def _range_bitmap(self, column, low, high):
+        values, order = self._sorted[column]
+        start = np.searchsorted(values, low, side="left")
+        stop = np.searchsorted(values, high, side="right")
+        mask = np.zeros(self.num_rows, dtype=bool)
+        mask[order[start:stop]] = True
+        return np.packbits(mask)
+
+    def _category_bitmap(self, column, value):
+        bitmap = self._bitmaps[column].get(value)
+        return bitmap if bitmap is not None else np.zeros((self.num_rows + 7) // 8, dtype=np.uint8)
+
+    def positions(self, ranges=None, categories=None):
+        """
+        Returns the positions of rows matching every filter.
+
+        Args:
+            ranges (dict, optional): column -> (low, high), inclusive; None
+                means no filter (rows missing the value are kept).
+            categories (dict, optional): column -> value; None means all.
+
+        Returns:
+            np.ndarray: Matching row positions in ascending order, for `df.iloc`.
+        """
+        bitmaps = [
+            self._range_bitmap(column, *bounds)
+            for column, bounds in (ranges or {}).items() if bounds is not None and column in self._sorted
+        ] + [
+            self._category_bitmap(column, value)
+            for column, value in (categories or {}).items() if value is not None and column in self._bitmaps
+        ]
+        if not bitmaps:
+            return np.arange(self.num_rows)
+        combined = np.bitwise_and.reduce(bitmaps) if len(bitmaps) > 1 else bitmaps[0]
+        return np.flatnonzero(np.unpackbits(combined, count=self.num_rows))
+
+# Enough for every variant of the current dataset version plus the previous one
+MAX_INDEXES = 4
+
+_indexes = OrderedDict()   # (fingerprint, variant) -> (frame, FilterIndex)
+_indexes_lock = threading.Lock()
+
+def get_filter_index(df, fingerprint, variant=None):
+    """
+    Returns the filter index for a shared dataset.
+
+    Indexes are kept per source fingerprint and variant (e.g. with and without
+    inferred communities), so sessions looking at different variants of the
+    same data don't rebuild each other's. An entry is rebuilt if a different
+    frame arrives under the same key.
+    """
+    key = (repr(fingerprint), variant)
+    with _indexes_lock:
+        entry = _indexes.get(key)
+        if entry is not None and entry[0] is df:
+            _indexes.move_to_end(key)
+            return entry[1]
+    index = FilterIndex(df)
+    with _indexes_lock:
+        _indexes[key] = (df, index)
+        _indexes.move_to_end(key)
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+    return index
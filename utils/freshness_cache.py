@@ -0,0 +1,117 @@
+import streamlit as st
+import os
+import sys
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import pandas as pd
+import pytz
+from utils.invalidation_bus import get_invalidation_bus
+
+def _estimate_bytes(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_estimate_bytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_estimate_bytes(v) for v in value)
+    return sys.getsizeof(value)
+
+class FreshnessCache:
+    """
+    Query results shared across reruns and sessions until the source data changes.
+
+    Entries are valid for one fingerprint of the source (table `last_modified`
+    and row count, from a metadata call rather than a query). The fingerprint
+    is read at most once per `check_interval`, or right after a write is
+    published on the invalidation bus; when it changes every entry is dropped.
+    Entries are evicted least-recently-used beyond `max_bytes`.
+    """
+
+    def __init__(self, fingerprint, max_bytes=256 * 1024 * 1024, check_interval=timedelta(seconds=10)):
+        self._read_fingerprint = fingerprint
+        self.max_bytes = max_bytes
+        self.check_interval = check_interval
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()    # key -> (value, size in bytes)
+        self._bytes = 0
+        self._fingerprint = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def fingerprint(self):
+        """
+        Returns the source's current fingerprint, dropping every entry if it moved.
+        """
+        with self._lock:
+            now = datetime.now(pytz.utc)
+            if self._checked_at and now - self._checked_at < self.check_interval:
+                return self._fingerprint
+        fingerprint = self._read_fingerprint()
+        with self._lock:
+            if fingerprint != self._fingerprint:
+                self._entries.clear()
+                self._bytes = 0
+                self._fingerprint = fingerprint
+            self._checked_at = datetime.now(pytz.utc)
+            return fingerprint
+
+    def get(self, key, compute):
+        """
+        Returns the cached value for `key`, calling `compute()` on a miss.
+
+        Args:
+            key (Hashable): Identifies the query and its arguments.
+            compute (callable): Produces the value; it must not be modified by callers.
+        """
+        fingerprint = self.fingerprint()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        value = compute()
+        size = _estimate_bytes(value)
+        with self._lock:
+            # A write landed while computing; don't keep a result that may predate it
+            if fingerprint != self._fingerprint or size > self.max_bytes:
+                return value
+            self._bytes += size - self._entries.pop(key, (None, 0))[1]
+            self._entries[key] = (value, size)
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+        return value
+
+    def invalidate(self, event=None):
+        """
+        Forces the next lookup to re-read the fingerprint.
+        """
+        with self._lock:
+            self._checked_at = None
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+_dashboard_cache = None
+_dashboard_cache_lock = threading.Lock()
+
+def get_dashboard_cache(storage):
+    """
+    Returns the process-wide cache for Dashboard queries against `storage`
+    (DASHBOARD_CACHE_MB caps it, default 256).
+    """
+    global _dashboard_cache
+    with _dashboard_cache_lock:
+        if _dashboard_cache is None:
+            max_mb = int(st.secrets.get("DASHBOARD_CACHE_MB") or os.getenv('DASHBOARD_CACHE_MB') or 256)
+            _dashboard_cache = FreshnessCache(storage.fingerprint, max_bytes=max_mb * 1024 * 1024)
+            get_invalidation_bus().subscribe(_dashboard_cache.invalidate)
+        return _dashboard_cache
@@ -0,0 +1,389 @@
+import streamlit as st
+import os
+import hashlib
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import pytz
+from google.cloud import bigquery
+from utils.bigquery_utils import run_query
+from utils.invalidation_bus import get_invalidation_bus, VALIDATED, DELETED, INSERTED
+from utils.snapshot_cache import table_fingerprint, load_snapshot, save_snapshot
+
+# Columns that move forward whenever a row is inserted or changed. Only the
+# ones present in the property table's schema are used.
+WATERMARK_COLUMNS = ("validation_timestamp", "inserted_at")
+
+def _validation_state(value):
+    return "" if pd.isna(value) else ("true" if value else "false")
+
+def row_fingerprints(property_ids, is_validated):
+    """
+    The 60-bit MD5 prefix of `property_id:is_validated` for each row.
+
+    The MD5 runs once per row in Python (BigQuery has no hash pandas can
+    reproduce without another dependency), so `IncrementalLoader` keeps these
+    per property and only hashes rows that are new or changed.
+
+    Args:
+        property_ids (Iterable): Property IDs.
+        is_validated (Iterable): Matching validation flags (bool or missing).
+
+    Returns:
+        np.ndarray: One uint64 fingerprint per row.
+    """
+    validated = pd.Series(list(is_validated), dtype=object)
+    states = np.where(validated.isna(), "", np.where(validated.fillna(False).astype(bool), "true", "false"))
+    keys = pd.Series(list(property_ids), dtype=object).astype(str) + ":" + states
+    # The first 15 hex digits of the digest are its first 8 bytes less 4 bits
+    return np.fromiter(
+        (int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big") >> 4 for key in keys),
+        dtype=np.uint64,
+        count=len(keys),
+    )
+
+def combine_fingerprints(fingerprints):
+    """
+    XORs row fingerprints into the checksum CHECKSUM_SQL computes in BigQuery.
+    """
+    fingerprints = np.asarray(fingerprints, dtype=np.uint64)
+    return int(np.bitwise_xor.reduce(fingerprints)) if len(fingerprints) else 0
+
+def row_checksum(property_ids, is_validated):
+    """
+    XOR of a 60-bit MD5 prefix over `property_id:is_validated` for each row.
+
+    Matches the CHECKSUM_SQL expression evaluated in BigQuery, so a local copy
+    can be compared against the table without downloading it.
+
+    Returns:
+        int: The combined checksum.
+    """
+    return combine_fingerprints(row_fingerprints(property_ids, is_validated))
+
+CHECKSUM_SQL = """
+    BIT_XOR(CAST(CONCAT('0x', SUBSTR(TO_HEX(MD5(
+        CONCAT(property_id, ':', COALESCE(CAST(is_validated AS STRING), ''))
+    )), 1, 15)) AS INT64))
+"""
+
+class IncrementalLoader:
+    """
+    Keeps a local copy of the property table joined with the geo table and
+    refreshes it with delta queries.
+
+    Each refresh pulls only rows whose watermark columns moved past the last
+    seen value (minus an overlap window for late-landing writes such as the
+    batched validation MERGE), then checks row count and checksum against
+    the table. On a mismatch it repairs deletions and changed rows by ID, and
+    falls back to a full reload if the copy still doesn't match.
+    """
+
+    def __init__(self, client, overlap=timedelta(minutes=10), full_reload_interval=timedelta(hours=6),
+                 min_refresh_interval=timedelta(seconds=15), snapshot_name="dashboard_dataset"):
+        self.client = client
+        self.snapshot_name = snapshot_name
+        self.overlap = overlap
+        self.full_reload_interval = full_reload_interval
+        self.min_refresh_interval = min_refresh_interval
+
+        project_id = st.secrets.get("PROJECT_ID") or os.getenv('PROJECT_ID')
+        dataset_id = st.secrets.get("DATASET_ID") or os.getenv('DATASET_ID')
+        table_id = st.secrets.get("TABLE_ID") or os.getenv('TABLE_ID')
+        geo_table_id = st.secrets.get("GEO_TABLE_ID") or os.getenv('GEO_TABLE_ID')
+        self.table = f"{project_id}.{dataset_id}.{table_id}"
+        self.geo_table = f"{project_id}.{dataset_id}.{geo_table_id}"
+
+        self.data = None
+        self._fingerprints = None   # property_id -> row fingerprint, kept in step with `data`
+        self.watermark = None
+        self.full_loaded_at = None
+        self.checked_at = None
+        self.fingerprint = None
+        self.stats = {"full_reloads": 0, "delta_refreshes": 0, "repairs": 0, "rows_fetched": 0, "last_mode": None}
+        self._watermark_columns = None
+        self._lock = threading.Lock()
+
+    def _query(self, name, query, params=None):
+        df = run_query(self.client, name, query, params, to_dataframe=True, bqstorage=True)
+        self.stats["rows_fetched"] += len(df)
+        return df
+
+    def _select_joined(self, where=""):
+        return f"""
+            SELECT * FROM `{self.table}` AS props
+            LEFT JOIN `{self.geo_table}` AS geo_coords USING (`property_id`)
+            {where}
+        """
+
+    def watermark_columns(self):
+        if self._watermark_columns is None:
+            schema_names = {field.name for field in self.client.get_table(self.table).schema}
+            self._watermark_columns = [c for c in WATERMARK_COLUMNS if c in schema_names]
+        return self._watermark_columns
+
+    def _compute_watermark(self, df, fallback):
+        values = [
+            pd.to_datetime(df[column], utc=True).max()
+            for column in self.watermark_columns()
+            if column in df.columns
+        ]
+        values = [v for v in values if not pd.isna(v)]
+        return max(values).to_pydatetime() if values else fallback
+
+    def _merge(self, df, property_ids=None):
+        """
+        Replaces rows by property_id with the fetched ones and drops `property_ids`
+        that were fetched but no longer exist.
+        """
+        replaced = set(df['property_id'])
+        if property_ids is not None:
+            replaced |= set(property_ids)
+        kept = self.data[~self.data['property_id'].isin(replaced)]
+        self.data = pd.concat([kept, df], ignore_index=True) if len(df) else kept.reset_index(drop=True)
+        self._update_fingerprints(df, removed=replaced)
+
+    @staticmethod
+    def _fingerprint_rows(df):
+        unique = df.drop_duplicates('property_id')
+        return pd.Series(
+            row_fingerprints(unique['property_id'], unique['is_validated']),
+            index=unique['property_id'].to_numpy(),
+            dtype=np.uint64,
+        )
+
+    def _update_fingerprints(self, df=None, removed=()):
+        """
+        Drops the fingerprints of `removed` ids and hashes the rows of `df`;
+        the rest of the copy is never rehashed.
+        """
+        fresh = self._fingerprint_rows(df) if df is not None and len(df) else None
+        gone = set(removed) | (set(fresh.index) if fresh is not None else set())
+        kept = self._fingerprints[~self._fingerprints.index.isin(gone)]
+        self._fingerprints = pd.concat([kept, fresh]) if fresh is not None else kept
+
+    def invalidate(self, event):
+        """
+        Applies a written change to the local copy without waiting for the next refresh.
+
+        Deleted rows are dropped and validated rows patched in a new frame (the
+        current one is shared with sessions); inserts need the geo join, so they
+        only make the next refresh skip its throttle. Subscribed to the
+        invalidation bus by `get_incremental_loader`.
+        """
+        with self._lock:
+            if self.data is None:
+                return
+            if event["kind"] == INSERTED:
+                self.checked_at = None
+                return
+            affected = self.data['property_id'].isin(event["property_ids"])
+            if not affected.any():
+                return
+            if event["kind"] == DELETED:
+                self.data = self.data[~affected].reset_index(drop=True)
+                self._update_fingerprints(removed=event["property_ids"])
+                return
+
+            changes = pd.DataFrame.from_dict(event["changes"], orient="index")
+            data = self.data.copy()
+            for field in changes.columns.intersection(data.columns):
+                patched = data['property_id'].map(changes[field])
+                data[field] = patched.where(patched.notna() & affected, data[field])
+            self.data = data
+            self._update_fingerprints(data[affected])
+
+    def local_summary(self):
+        return len(self._fingerprints), combine_fingerprints(self._fingerprints.to_numpy())
+
+    def remote_summary(self):
+        query = f"""
+            SELECT COUNT(*) AS row_count, {CHECKSUM_SQL} AS checksum
+            FROM `{self.table}`
+        """
+        row = run_query(self.client, "incremental_checksum", query, to_dataframe=True).iloc[0]
+        # The 60-bit fingerprints keep the INT64 XOR positive, so it compares directly
+        checksum = 0 if pd.isna(row['checksum']) else int(row['checksum'])
+        return int(row['row_count']), checksum
+
+    def _table_fingerprint(self):
+        return table_fingerprint(self.client, [self.table, self.geo_table])
+
+    def _persist(self):
+        try:
+            save_snapshot(self.snapshot_name, self.data, self.fingerprint, extra={
+                "watermark": self.watermark.isoformat(),
+                "full_loaded_at": self.full_loaded_at.isoformat(),
+            })
+            # Saved alongside so a restart doesn't rehash every row
+            save_snapshot(f"{self.snapshot_name}_fingerprints", pd.DataFrame({
+                "property_id": self._fingerprints.index,
+                "fingerprint": self._fingerprints.to_numpy(),
+            }), self.fingerprint, extra={"watermark": self.watermark.isoformat()})
+        except Exception as e:
+            print(f"Error saving snapshot {self.snapshot_name}: {str(e)}")
+
+    def _seed_from_snapshot(self):
+        """
+        Starts from the on-disk snapshot so a restarted process only fetches the delta.
+        """
+        df, meta = load_snapshot(self.snapshot_name)
+        if df is None or "watermark" not in meta:
+            return
+        self.data = df
+        fingerprints, fingerprints_meta = load_snapshot(f"{self.snapshot_name}_fingerprints")
+        if fingerprints is not None and fingerprints_meta.get("watermark") == meta["watermark"]:
+            self._fingerprints = pd.Series(
+                fingerprints["fingerprint"].to_numpy(dtype=np.uint64),
+                index=fingerprints["property_id"].to_numpy(),
+            )
+        else:
+            self._fingerprints = self._fingerprint_rows(df)
+        self.watermark = datetime.fromisoformat(meta["watermark"])
+        self.full_loaded_at = datetime.fromisoformat(meta["full_loaded_at"])
+        self.fingerprint = meta["fingerprint"]
+        self.stats["last_mode"] = "snapshot"
+
+    def full_reload(self):
+        started = datetime.now(pytz.utc)
+        self.fingerprint = self._table_fingerprint()
+        self.data = self._query("incremental_full_reload", self._select_joined())
+        self._fingerprints = self._fingerprint_rows(self.data)
+        self.watermark = self._compute_watermark(self.data, started)
+        self.full_loaded_at = started
+        self.checked_at = started
+        self.stats["full_reloads"] += 1
+        self.stats["last_mode"] = "full"
+        self._persist()
+        return self.data
+
+    def delta_query(self, since):
+        """
+        Builds the delta query for rows written since `since`.
+
+        Returns:
+            tuple: (query string, list of query parameters), or None when the
+            table has no watermark columns.
+        """
+        columns = self.watermark_columns()
+        if not columns:
+            return None
+        where = "WHERE " + " OR ".join(f"props.{c} >= @since" for c in columns)
+        return self._select_joined(where), [bigquery.ScalarQueryParameter("since", "TIMESTAMP", since)]
+
+    def _fetch_delta(self):
+        delta = self.delta_query(self.watermark - self.overlap)
+        if delta is None:
+            return None
+        return self._query("incremental_delta", *delta)
+
+    def _repair(self):
+        """
+        Reconciles deletions and rows the watermark missed using a two-column scan.
+        """
+        remote = run_query(
+            self.client,
+            "incremental_repair_scan",
+            f"SELECT property_id, is_validated FROM `{self.table}`",
+            to_dataframe=True,
+        )
+        local = self.data.drop_duplicates('property_id').set_index('property_id')['is_validated'].map(_validation_state)
+        remote_state = remote.set_index('property_id')['is_validated'].map(_validation_state)
+
+        deleted = local.index.difference(remote_state.index)
+        missing = remote_state.index.difference(local.index)
+        common = local.index.intersection(remote_state.index)
+        changed = common[(local.loc[common] != remote_state.loc[common]).to_numpy()]
+
+        refetch = list(missing) + list(changed)
+        fetched = self.data.iloc[0:0]
+        if refetch:
+            fetched = self._query(
+                "incremental_repair_rows",
+                self._select_joined("WHERE props.property_id IN UNNEST(@ids)"),
+                [bigquery.ArrayQueryParameter("ids", "STRING", [str(i) for i in refetch])],
+            )
+        self._merge(fetched, property_ids=list(deleted) + refetch)
+        self.stats["repairs"] += 1
+
+    def refresh(self, force_full=False):
+        """
+        Brings the local copy up to date and returns it.
+
+        Args:
+            force_full (bool): Skip the delta path and reload everything.
+
+        Returns:
+            pd.DataFrame: The joined property dataset.
+        """
+        with self._lock:
+            now = datetime.now(pytz.utc)
+            if self.data is None and not force_full:
+                self._seed_from_snapshot()
+
+            if (
+                force_full
+                or self.data is None
+                or self.watermark is None
+                or now - self.full_loaded_at > self.full_reload_interval
+            ):
+                return self.full_reload()
+
+            if self.checked_at and now - self.checked_at < self.min_refresh_interval:
+                return self.data
+
+            try:
+                # Metadata calls are free; skip the queries entirely if nothing changed
+                fingerprint = self._table_fingerprint()
+                if fingerprint == self.fingerprint:
+                    self.checked_at = now
+                    return self.data
+                if self.fingerprint is None or fingerprint[1] != self.fingerprint[1]:
+                    # Geo table edits don't move the property watermark
+                    return self.full_reload()
+
+                delta = self._fetch_delta()
+                if delta is None:
+                    return self.full_reload()
+                self._merge(delta)
+                self.stats["delta_refreshes"] += 1
+                self.stats["last_mode"] = "delta"
+
+                remote = self.remote_summary()
+                if self.local_summary() != remote:
+                    self._repair()
+                    self.stats["last_mode"] = "repair"
+                    if self.local_summary() != remote:
+                        return self.full_reload()
+
+                self.watermark = self._compute_watermark(self.data, self.watermark)
+                self.fingerprint = fingerprint
+                self.checked_at = now
+                self._persist()
+                return self.data
+            except Exception as e:
+                print(f"Incremental refresh failed, reloading: {str(e)}")
+                return self.full_reload()
+
+_loader = None
+_loader_lock = threading.Lock()
+
+def get_incremental_loader(client):
+    """
+    Returns the process-wide incremental loader for the joined property dataset.
+    """
+    global _loader
+    with _loader_lock:
+        if _loader is None:
+            _loader = IncrementalLoader(client)
+            get_invalidation_bus().subscribe(_loader.invalidate, kinds=(VALIDATED, DELETED, INSERTED))
+        return _loader
+
+def fetch_data_all_incremental(client, force_full=False):
+    """
+    Drop-in replacement for `fetch_data_all` that only downloads changed rows.
+
+    The returned DataFrame is shared between sessions and must not be modified in place.
+    """
+    return get_incremental_loader(client).refresh(force_full=force_full)
@@ -0,0 +1,112 @@
+import threading
+from collections import deque
+
+# Event kinds
+QUEUED = "queued"          # validation accepted by the queue, not yet written
+VALIDATED = "validated"    # validation written to the storage backend
+DELETED = "deleted"
+INSERTED = "inserted"
+
+class InvalidationBus:
+    """
+    In-process publish/subscribe channel for property changes.
+
+    Writers publish the property_ids they touched; process-wide caches
+    subscribe with a callback and drop or patch just those entries. Validator
+    sessions can't be called into from other threads, so each keeps a cursor
+    and pulls the events it missed with `events_since` on its next rerun.
+    """
+
+    def __init__(self, history=2000):
+        self._subscribers = {}              # token -> (callback, kinds)
+        self._events = deque(maxlen=history)
+        self._seq = 0
+        self._next_token = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback, kinds=None):
+        """
+        Registers `callback(event)` for every published event (or only `kinds`).
+
+        Callbacks run on the publishing thread and should only touch their own
+        state under their own lock.
+
+        Returns:
+            int: A token for `unsubscribe`.
+        """
+        with self._lock:
+            self._next_token += 1
+            self._subscribers[self._next_token] = (callback, set(kinds) if kinds else None)
+            return self._next_token
+
+    def unsubscribe(self, token):
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+    def publish(self, kind, property_ids, changes=None):
+        """
+        Records an event and notifies subscribers.
+
+        Args:
+            kind (str): One of QUEUED, VALIDATED, DELETED or INSERTED.
+            property_ids (Iterable): The affected properties.
+            changes (dict, optional): property_id -> {field: new value}, for
+                subscribers that patch entries instead of dropping them.
+
+        Returns:
+            dict: The published event.
+        """
+        property_ids = [str(property_id) for property_id in property_ids]
+        if not property_ids:
+            return None
+        with self._lock:
+            self._seq += 1
+            event = {
+                "seq": self._seq,
+                "kind": kind,
+                "property_ids": property_ids,
+                "changes": {str(k): v for k, v in (changes or {}).items()},
+            }
+            self._events.append(event)
+            subscribers = [
+                callback for callback, kinds in self._subscribers.values()
+                if kinds is None or kind in kinds
+            ]
+
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Error handling {kind} invalidation: {str(e)}")
+        return event
+
+    def cursor(self):
+        """
+        Returns the sequence number of the latest event.
+        """
+        with self._lock:
+            return self._seq
+
+    def events_since(self, cursor):
+        """
+        Returns events published after `cursor` (oldest first) and the new cursor.
+
+        Only the last `history` events are kept; a reader that fell further
+        behind gets what is left.
+        """
+        with self._lock:
+            events = [event for event in self._events if event["seq"] > cursor]
+            return events, self._seq
+
+_bus = None
+_bus_lock = threading.Lock()
+
+def get_invalidation_bus():
+    """
+    Returns the process-wide invalidation bus.
+    """
+    global _bus
+    with _bus_lock:
+        if _bus is None:
+            _bus = InvalidationBus()
+        return _bus
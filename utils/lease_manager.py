@@ -0,0 +1,186 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import pytz
+from utils.anomaly_scoring import ValidationPriority
+from utils.invalidation_bus import get_invalidation_bus, QUEUED, VALIDATED, DELETED
+from utils.property_store import get_property_store
+
+class LeaseManager:
+    """
+    Hands out disjoint batches of unvalidated properties to validator sessions.
+
+    All validator sessions run inside the same Streamlit server process, so
+    the lease table lives here rather than in BigQuery (where every claim
+    would be a DML job). A lease expires unless its session renews it;
+    expired and released properties go back to the front of the pool. The
+    pool is filled in anomaly-score order, so the rows most likely to need a
+    correction are handed out first.
+    Rows are held as shared records in the PropertyStore, the same objects
+    the sessions that lease them reference.
+    """
+
+    def __init__(self, storage, lease_ttl=timedelta(minutes=10), batch_size=25, pool_size=500, skip_ids=None, store=None,
+                 priority=None):
+        self.storage = storage
+        self.priority = priority or ValidationPriority(storage)
+        self.store = store or get_property_store()
+        # Callable returning IDs finished elsewhere (e.g. queued validations not yet synced)
+        self.skip_ids = skip_ids or set
+        self.lease_ttl = lease_ttl
+        self.batch_size = batch_size
+        self.pool_size = pool_size
+        self._rows = {}                # property_id -> PropertyRecord (pooled or leased)
+        self._pool = OrderedDict()     # unleased property_ids in hand-out order
+        self._leases = {}              # property_id -> (session_id, expires_at)
+        self._completed = {}           # property_id -> when it was finished here; kept out of later refills
+        self._pruned_for = None        # scoring `_completed` was last pruned against
+        self._lock = threading.Lock()
+
+    def _add_rows(self, df, skip):
+        rows = [
+            row for row in df.to_dict("records")
+            if row["property_id"] not in self._rows
+            and row["property_id"] not in self._completed
+            and row["property_id"] not in skip
+        ]
+        for record in self.store.acquire(rows):
+            self._rows[record.property_id] = record
+            self._pool[record.property_id] = None
+
+    def _refresh_priority(self):
+        try:
+            self.priority.refresh()
+        except Exception as e:
+            print(f"Error scoring validation queue, falling back to unordered rows: {str(e)}")
+        scored_at = self.priority.scored_at
+        with self._lock:
+            if scored_at is not None and scored_at != self._pruned_for:
+                # Rows finished before this scoring began aren't in it, so
+                # there's nothing left to keep them out of
+                self._completed = {pid: at for pid, at in self._completed.items() if at >= scored_at}
+                self._pruned_for = scored_at
+
+    def _fetch_refill(self):
+        """
+        Picks the rows for a refill. Scoring and the fallback query take
+        seconds, so this runs before the lease lock is taken and `claim` only
+        merges the result in; renewals and invalidations aren't held up.
+        """
+        self._refresh_priority()
+        skip = set(self.skip_ids())
+        with self._lock:
+            exclude = set(self._rows) | self._completed.keys() | skip
+        rows = self.priority.rows(self.pool_size, exclude_ids=exclude)
+        if rows is None or rows.empty:
+            # Nothing left in the scored set; pick up rows inserted since it was scored
+            rows = self.storage.fetch_data(limit=self.pool_size, exclude_ids=list(exclude))
+        return rows, skip
+
+    def _expire(self, now):
+        expired = [pid for pid, (_, expires_at) in self._leases.items() if expires_at <= now]
+        for property_id in expired:
+            del self._leases[property_id]
+            self._pool[property_id] = None
+            self._pool.move_to_end(property_id, last=False)
+
+    def _session_ids(self, session_id):
+        return [pid for pid, (owner, _) in self._leases.items() if owner == session_id]
+
+    def claim(self, session_id, size=None):
+        """
+        Leases up to `size` properties to a session, keeping any it already holds.
+
+        Args:
+            session_id (str): The claiming session.
+            size (int, optional): Batch size. Defaults to the manager's batch size.
+
+        Returns:
+            list: Shared PropertyRecords for every property the session now holds.
+        """
+        size = size or self.batch_size
+        with self._lock:
+            needs_refill = len(self._pool) < size
+        refill = self._fetch_refill() if needs_refill else None
+        with self._lock:
+            now = datetime.now(pytz.utc)
+            self._expire(now)
+            held = self._session_ids(session_id)
+            if len(held) < size:
+                if refill is not None:
+                    self._add_rows(*refill)
+                while self._pool and len(held) < size:
+                    property_id, _ = self._pool.popitem(last=False)
+                    held.append(property_id)
+            expires_at = now + self.lease_ttl
+            for property_id in held:
+                self._leases[property_id] = (session_id, expires_at)
+            return [self._rows[pid] for pid in held]
+
+    def renew(self, session_id):
+        """
+        Extends every lease the session still holds.
+
+        Returns:
+            set: The property_ids still leased to the session. Anything missing
+            expired and may have been handed to someone else.
+        """
+        with self._lock:
+            now = datetime.now(pytz.utc)
+            self._expire(now)
+            held = self._session_ids(session_id)
+            for property_id in held:
+                self._leases[property_id] = (session_id, now + self.lease_ttl)
+            return set(held)
+
+    def invalidate(self, event):
+        """
+        Takes validated or deleted properties out of circulation, whoever holds them.
+
+        Subscribed to the invalidation bus by `get_lease_manager`.
+        """
+        with self._lock:
+            now = datetime.now(pytz.utc)
+            released = []
+            for property_id in event["property_ids"]:
+                self._leases.pop(property_id, None)
+                self._pool.pop(property_id, None)
+                if self._rows.pop(property_id, None) is not None:
+                    released.append(property_id)
+                self._completed[property_id] = now
+            self.store.release(released)
+
+    def release(self, session_id, property_ids=None):
+        """
+        Returns a session's leases (or just `property_ids`) to the front of the pool.
+        """
+        with self._lock:
+            for property_id in property_ids or self._session_ids(session_id):
+                lease = self._leases.get(property_id)
+                if lease and lease[0] == session_id:
+                    del self._leases[property_id]
+                    self._pool[property_id] = None
+                    self._pool.move_to_end(property_id, last=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pooled": len(self._pool),
+                "leased": len(self._leases),
+                "sessions": len({owner for owner, _ in self._leases.values()}),
+                "completed": len(self._completed),
+            }
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_lease_manager(storage, skip_ids=None):
+    """
+    Returns the process-wide lease manager for a storage backend.
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = LeaseManager(storage, skip_ids=skip_ids)
+            get_invalidation_bus().subscribe(_manager.invalidate, kinds=(QUEUED, VALIDATED, DELETED))
+        return _manager
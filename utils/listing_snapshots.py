@@ -0,0 +1,179 @@
+import os
+import hashlib
+import queue
+import threading
+from io import BytesIO
+from utils.bigquery_utils import CACHE_DIR
+from utils.scraper_utils import setup_webdriver, capture_webpage_screenshot
+
+LISTING_SNAPSHOT_DIR = os.path.join(CACHE_DIR, "listing_snapshots")
+
+# Full-page captures of listing sites run to tens of megabytes as PNG
+MAX_WIDTH = 1280
+MAX_HEIGHT = 4000
+MAX_BYTES = 400 * 1024
+MAX_CACHE_BYTES = 500 * 1024 * 1024
+
+# A listing site that times out once usually loads on a later try
+MAX_ATTEMPTS = 3
+RETRY_DELAY_SECONDS = 30
+
+def snapshot_path(url, snapshot_dir=LISTING_SNAPSHOT_DIR):
+    return os.path.join(snapshot_dir, f"{hashlib.sha1(url.encode()).hexdigest()}.jpg")
+
+def compress_screenshot(png_bytes, max_width=MAX_WIDTH, max_height=MAX_HEIGHT, max_bytes=MAX_BYTES):
+    """
+    Shrinks a PNG screenshot to a JPEG no wider than `max_width`, cropped to
+    `max_height`, lowering quality until it fits in `max_bytes`.
+
+    Returns:
+        bytes: The JPEG image.
+    """
+    from PIL import Image
+
+    image = Image.open(BytesIO(png_bytes)).convert("RGB")
+    if image.width > max_width:
+        image = image.resize((max_width, round(image.height * max_width / image.width)), Image.LANCZOS)
+    if image.height > max_height:
+        image = image.crop((0, 0, image.width, max_height))
+
+    for quality in (75, 60, 45, 30):
+        buffer = BytesIO()
+        image.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+        if buffer.tell() <= max_bytes:
+            break
+    return buffer.getvalue()
+
+class ListingSnapshotter:
+    """
+    Captures listing pages ahead of time into a local image cache.
+
+    A single background worker owns one headless Chrome (WebDriver sessions
+    aren't safe to share between threads) and works through URLs queued by
+    `capture_ahead`, so the Validator can show a listing as a static image
+    instead of framing the live third-party page. The browser gets its own
+    debugging port, so it doesn't clash with the Scraper page's Chrome.
+
+    A failed capture is retried up to `max_attempts` times with exponential
+    backoff before the URL is recorded in `failures`. The cache directory is
+    pruned oldest-first once it grows past `max_cache_bytes`.
+    """
+
+    def __init__(self, snapshot_dir=LISTING_SNAPSHOT_DIR, max_cache_bytes=MAX_CACHE_BYTES,
+                 max_attempts=MAX_ATTEMPTS, retry_delay=RETRY_DELAY_SECONDS):
+        self.snapshot_dir = snapshot_dir
+        self.max_cache_bytes = max_cache_bytes
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.failures = {}           # url -> last error
+        self._attempts = {}          # url -> failed attempts so far
+        self._queued = set()
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._driver = None
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="listing-snapshots", daemon=True)
+        self._thread.start()
+
+    def get(self, url):
+        """
+        Returns the cached snapshot path for `url`, or None if it isn't captured yet.
+        """
+        path = snapshot_path(url, self.snapshot_dir)
+        return path if url and os.path.exists(path) else None
+
+    def capture_ahead(self, urls):
+        """
+        Queues URLs that have no snapshot yet and haven't failed before.
+        """
+        with self._lock:
+            for url in urls:
+                if not url or url in self._queued or url in self.failures or self.get(url):
+                    continue
+                self._queued.add(url)
+                self._queue.put(url)
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._queued)
+
+    def _capture(self, url):
+        if self._driver is None:
+            self._driver = setup_webdriver(debugging_port=None)
+        result = capture_webpage_screenshot(self._driver, url)
+        if "error" in result:
+            # Most errors are the page's; only a dead session needs a new browser
+            if not self._driver_alive():
+                self._quit_driver()
+            raise RuntimeError(result["error"])
+
+        path = snapshot_path(url, self.snapshot_dir)
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(compress_screenshot(result["screenshot"]))
+        os.replace(f"{path}.tmp", path)
+
+    def _driver_alive(self):
+        try:
+            self._driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def _quit_driver(self):
+        if self._driver is not None:
+            try:
+                self._driver.quit()
+            except Exception:
+                pass
+            self._driver = None
+
+    def _prune(self):
+        entries = []
+        for name in os.listdir(self.snapshot_dir):
+            if name.endswith(".jpg"):
+                stat = os.stat(os.path.join(self.snapshot_dir, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_cache_bytes:
+                break
+            os.remove(os.path.join(self.snapshot_dir, name))
+            total -= size
+
+    def _run(self):
+        while True:
+            url = self._queue.get()
+            try:
+                self._capture(url)
+                self._prune()
+            except Exception as e:
+                print(f"Error capturing listing snapshot for {url}: {str(e)}")
+                with self._lock:
+                    attempts = self._attempts.get(url, 0) + 1
+                    if attempts < self.max_attempts:
+                        # Stays in `_queued` while it waits, so it isn't queued twice
+                        self._attempts[url] = attempts
+                        retry = threading.Timer(self.retry_delay * 2 ** (attempts - 1), self._queue.put, args=(url,))
+                        retry.daemon = True
+                        retry.start()
+                        continue
+                    self._attempts.pop(url, None)
+                    self.failures[url] = str(e)
+                    self._queued.discard(url)
+                continue
+            with self._lock:
+                self._attempts.pop(url, None)
+                self._queued.discard(url)
+
+_snapshotter = None
+_snapshotter_lock = threading.Lock()
+
+def get_listing_snapshotter():
+    """
+    Returns the process-wide listing snapshotter.
+    """
+    global _snapshotter
+    with _snapshotter_lock:
+        if _snapshotter is None:
+            _snapshotter = ListingSnapshotter()
+        return _snapshotter
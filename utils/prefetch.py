@@ -0,0 +1,193 @@
+import ipaddress
+import socket
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import pandas as pd
+import pydeck as pdk
+import requests
+from utils.invalidation_bus import get_invalidation_bus
+from utils.tile_cache import get_tile_cache, get_tile_proxy, location_thumbnail
+
+def build_location_deck(row, mapbox_token):
+    """
+    Builds the satellite location map for a property, or None without coordinates.
+
+    With the tile proxy running the map reads satellite tiles through the
+    local cache instead of straight from Mapbox.
+    """
+    if pd.isna(row.get('latitude')) or pd.isna(row.get('longitude')):
+        return None
+
+    map_data = pd.DataFrame({
+        'lat': [row['latitude']],
+        'lon': [row['longitude']],
+        'property': [f"{row['property_id']} {row['property_type']} {row['rooms']} {row['bathroom']} {row['sqft']} {row['aes_score']} - ${row['price']:,.2f}"]
+    })
+
+    view_state = pdk.ViewState(
+        latitude=row['latitude'],
+        longitude=row['longitude'],
+        zoom=15,
+        pitch=0
+    )
+
+    proxy = get_tile_proxy(mapbox_token)
+    return pdk.Deck(
+        map_style=proxy.style_url if proxy else 'mapbox://styles/mapbox/satellite-streets-v12',
+        initial_view_state=view_state,
+        api_keys={'mapbox': mapbox_token},
+        layers=[
+            pdk.Layer(
+                'ScatterplotLayer',
+                data=map_data,
+                get_position='[lon, lat]',
+                get_color='[255, 0, 0, 160]',
+                get_radius=50,
+                pickable=True,
+                auto_highlight=True,
+                get_tooltip='property'
+            )
+        ],
+        tooltip={"text": "{property}"}
+    )
+
+def is_public_http_url(url):
+    """
+    Returns whether `url` is http(s) and every address its host resolves to
+    is publicly routable, so checking it can't reach the server's own network.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return False
+    try:
+        addresses = socket.getaddrinfo(parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+    except (OSError, ValueError):
+        return False
+    return all(ipaddress.ip_address(address[4][0].split("%")[0]).is_global for address in addresses)
+
+def check_listing(url, timeout=5):
+    """
+    Checks whether a listing page can be shown in an iframe.
+
+    Listing URLs come from scraped data, so only public http(s) hosts are
+    checked, with a HEAD request that doesn't follow redirects.
+
+    Returns:
+        dict: `url`, `status` (HTTP status or None) and `embeddable` (False when
+        the site sends X-Frame-Options or a CSP frame-ancestors restriction).
+    """
+    if not url:
+        return {"url": url, "status": None, "embeddable": False}
+    if not is_public_http_url(url):
+        # Not ours to probe; the browser decides as it does when a check fails
+        return {"url": url, "status": None, "embeddable": True}
+    try:
+        response = requests.head(url, timeout=timeout, allow_redirects=False)
+    except Exception:
+        # Let the browser try; a failed server-side check isn't proof it can't load
+        return {"url": url, "status": None, "embeddable": True}
+
+    frame_options = response.headers.get("X-Frame-Options", "").lower()
+    csp = response.headers.get("Content-Security-Policy", "").lower()
+    blocked = frame_options in ("deny", "sameorigin") or "frame-ancestors 'none'" in csp or "frame-ancestors 'self'" in csp
+    return {"url": url, "status": response.status_code, "embeddable": not blocked}
+
+class PropertyPrefetcher:
+    """
+    Prepares upcoming properties in the Validator queue on background threads.
+
+    For each property it keeps the row, the location deck, a static location
+    thumbnail rendered from cached tiles and a listing check,
+    so selecting the next property only reads from this cache. Only the row
+    and deck are waited on; the thumbnail and listing check are None until
+    they finish. Entries are shared across sessions and evicted
+    least-recently-used.
+    """
+
+    def __init__(self, max_workers=4, max_entries=500):
+        self.max_entries = max_entries
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._entries = OrderedDict()  # property_id -> (deck future, thumbnail future, listing future)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _prepare(self, row, mapbox_token):
+        return {"row": row, "deck": build_location_deck(row, mapbox_token)}
+
+    def _thumbnail(self, row, mapbox_token):
+        # A miss downloads several tiles, so this is never waited on
+        if pd.isna(row.get('latitude')) or pd.isna(row.get('longitude')):
+            return None
+        try:
+            return location_thumbnail(get_tile_cache(mapbox_token), float(row['latitude']), float(row['longitude']))
+        except Exception as e:
+            print(f"Error rendering location thumbnail: {str(e)}")
+            return None
+
+    def prefetch(self, rows, mapbox_token):
+        """
+        Schedules preparation for rows (dicts) that aren't cached yet.
+        """
+        with self._lock:
+            for row in rows:
+                property_id = row['property_id']
+                if property_id in self._entries:
+                    self._entries.move_to_end(property_id)
+                    continue
+                self._entries[property_id] = (
+                    self._executor.submit(self._prepare, row, mapbox_token),
+                    self._executor.submit(self._thumbnail, row, mapbox_token),
+                    self._executor.submit(check_listing, row.get('listing_urls')),
+                )
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, row, mapbox_token):
+        """
+        Returns the prepared property, scheduling it first on a cache miss.
+
+        The thumbnail and listing check are never waited on; `thumbnail` and
+        `listing` are None until they finish.
+        """
+        property_id = row['property_id']
+        with self._lock:
+            entry = self._entries.get(property_id)
+        if entry is None or not entry[0].done():
+            self.misses += 1
+        else:
+            self.hits += 1
+        if entry is None:
+            self.prefetch([row], mapbox_token)
+            with self._lock:
+                entry = self._entries[property_id]
+
+        deck_future, thumbnail_future, listing_future = entry
+        prepared = dict(deck_future.result())
+        prepared["thumbnail"] = thumbnail_future.result() if thumbnail_future.done() else None
+        prepared["listing"] = listing_future.result() if listing_future.done() else None
+        return prepared
+
+    def evict(self, property_ids):
+        with self._lock:
+            for property_id in property_ids:
+                self._entries.pop(property_id, None)
+
+    def invalidate(self, event):
+        self.evict(event["property_ids"])
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+def get_prefetcher():
+    """
+    Returns the process-wide property prefetcher.
+    """
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = PropertyPrefetcher()
+            get_invalidation_bus().subscribe(_prefetcher.invalidate)
+        return _prefetcher
@@ -0,0 +1,118 @@
+import threading
+from utils.bigquery_utils import VALIDATOR_COLUMNS
+
+# Validator columns plus the queue's anomaly scoring
+RECORD_FIELDS = VALIDATOR_COLUMNS + ["anomaly_score", "anomaly_reasons"]
+
+class PropertyRecord:
+    """
+    One property with a fixed set of fields, read-only once built.
+
+    Uses `__slots__` instead of a dict per row, and supports the mapping
+    access (`row['price']`, `row.get(...)`, `'price' in row`) that the
+    Validator and prefetcher use. Records are shared between sessions, so
+    edits produce a new record with `with_changes` instead of mutating.
+    """
+
+    __slots__ = tuple(RECORD_FIELDS)
+
+    def __init__(self, row):
+        for field in self.__slots__:
+            object.__setattr__(self, field, row.get(field))
+
+    def __setattr__(self, field, value):
+        raise AttributeError("PropertyRecord is read-only; use with_changes()")
+
+    def __getitem__(self, field):
+        try:
+            return getattr(self, field)
+        except (AttributeError, TypeError):
+            raise KeyError(field)
+
+    def get(self, field, default=None):
+        return getattr(self, field, default) if isinstance(field, str) else default
+
+    def __contains__(self, field):
+        return field in self.__slots__
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def with_changes(self, changes):
+        """
+        Returns a copy with `changes` (field -> value) applied.
+        """
+        if not changes:
+            return self
+        return PropertyRecord({**self.to_dict(), **changes})
+
+class PropertyStore:
+    """
+    Process-wide, reference-counted store of property records.
+
+    The lease manager and every validator session hold references to the
+    same record objects instead of their own copies, so memory is one copy
+    of each leased property however many sessions are open. A record is
+    dropped when its last holder releases it.
+    """
+
+    def __init__(self):
+        self._records = {}   # property_id -> PropertyRecord
+        self._refs = {}      # property_id -> holder count
+        self._lock = threading.Lock()
+
+    def acquire(self, rows):
+        """
+        Takes a reference to each row, adding rows the store doesn't have yet.
+
+        Args:
+            rows (Iterable): Mappings with `property_id` (dicts or PropertyRecords).
+
+        Returns:
+            list: The shared PropertyRecords, in input order.
+        """
+        records = []
+        with self._lock:
+            for row in rows:
+                property_id = row['property_id']
+                record = self._records.get(property_id)
+                if record is None:
+                    record = row if isinstance(row, PropertyRecord) else PropertyRecord(row)
+                    self._records[property_id] = record
+                self._refs[property_id] = self._refs.get(property_id, 0) + 1
+                records.append(record)
+        return records
+
+    def release(self, property_ids):
+        """
+        Drops one reference to each property, evicting those nobody holds.
+        """
+        with self._lock:
+            for property_id in property_ids:
+                refs = self._refs.get(property_id, 0) - 1
+                if refs > 0:
+                    self._refs[property_id] = refs
+                else:
+                    self._refs.pop(property_id, None)
+                    self._records.pop(property_id, None)
+
+    def get(self, property_id):
+        with self._lock:
+            return self._records.get(property_id)
+
+    def stats(self):
+        with self._lock:
+            return {"records": len(self._records), "references": sum(self._refs.values())}
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_property_store():
+    """
+    Returns the process-wide property store.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PropertyStore()
+        return _store
@@ -0,0 +1,70 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# BigQuery calls spend nearly all their time waiting on the network, so a
+# small shared thread pool is enough to overlap independent queries. Pages
+# submit everything they need up front and block on each result only where
+# it is rendered, so page latency is the slowest query instead of the sum.
+_MAX_WORKERS = 8
+_executor = None
+_executor_lock = threading.Lock()
+
+# Write-path follow-ups (summary counter deltas, reconciles) get their own
+# pool so a page fanning out its reads can't queue them behind its queries.
+_BACKGROUND_WORKERS = 2
+_background_executor = None
+
+def get_executor():
+    """
+    Returns the process-wide query thread pool.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_MAX_WORKERS, thread_name_prefix="bq-query")
+        return _executor
+
+def get_background_executor():
+    """
+    Returns the process-wide thread pool for background DML.
+    """
+    global _background_executor
+    with _executor_lock:
+        if _background_executor is None:
+            _background_executor = ThreadPoolExecutor(
+                max_workers=_BACKGROUND_WORKERS, thread_name_prefix="bq-background"
+            )
+        return _background_executor
+
+def submit(fn, *args, **kwargs):
+    """
+    Runs `fn(*args, **kwargs)` on the query pool.
+
+    Only call functions that don't render Streamlit elements; worker threads
+    have no script context.
+
+    Returns:
+        concurrent.futures.Future: The pending result.
+    """
+    return get_executor().submit(fn, *args, **kwargs)
+
+def submit_background(fn, *args, **kwargs):
+    """
+    Runs `fn(*args, **kwargs)` on the background DML pool, apart from page reads.
+
+    Returns:
+        concurrent.futures.Future: The pending result.
+    """
+    return get_background_executor().submit(fn, *args, **kwargs)
+
+def submit_all(calls):
+    """
+    Submits several independent calls at once.
+
+    Args:
+        calls (dict): name -> (fn, *args) tuples.
+
+    Returns:
+        dict: name -> Future.
+    """
+    return {name: submit(call[0], *call[1:]) for name, call in calls.items()}
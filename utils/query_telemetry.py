@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime
+import pandas as pd
+import pytz
+
+class QueryTelemetry:
+    """
+    Ring buffer of per-query cost and latency measurements.
+
+    Keeps the last `capacity` queries in memory for the whole process and
+    summarises them by query name with latency percentiles and byte totals.
+    """
+
+    def __init__(self, capacity=2000):
+        self._records = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def record(self, name, job, wall_seconds, row_count=None, error=None):
+        queue_seconds = None
+        if job is not None and job.created and job.started:
+            queue_seconds = (job.started - job.created).total_seconds()
+
+        record = {
+            "name": name,
+            "finished_at": datetime.now(pytz.utc),
+            "wall_seconds": wall_seconds,
+            "queue_seconds": queue_seconds,
+            "bytes_processed": getattr(job, "total_bytes_processed", None),
+            "bytes_billed": getattr(job, "total_bytes_billed", None),
+            "slot_millis": getattr(job, "slot_millis", None),
+            "cache_hit": getattr(job, "cache_hit", None),
+            "row_count": row_count,
+            "job_id": getattr(job, "job_id", None),
+            "error": error,
+        }
+        with self._lock:
+            self._records.append(record)
+
+    def records(self):
+        """
+        Returns:
+            pd.DataFrame: One row per recorded query, oldest first.
+        """
+        with self._lock:
+            return pd.DataFrame(list(self._records))
+
+    def summary(self):
+        """
+        Returns:
+            pd.DataFrame: Per query name: call count, p50/p95/p99 wall time,
+            mean queue time, total bytes processed and billed, total slot-ms,
+            cache hit rate, mean rows and error count. Most expensive first.
+        """
+        df = self.records()
+        if df.empty:
+            return df
+
+        grouped = df.groupby("name")
+        summary = pd.DataFrame({
+            "calls": grouped.size(),
+            "p50_seconds": grouped["wall_seconds"].quantile(0.5),
+            "p95_seconds": grouped["wall_seconds"].quantile(0.95),
+            "p99_seconds": grouped["wall_seconds"].quantile(0.99),
+            "mean_queue_seconds": grouped["queue_seconds"].mean(),
+            "bytes_processed": grouped["bytes_processed"].sum(),
+            "bytes_billed": grouped["bytes_billed"].sum(),
+            "slot_millis": grouped["slot_millis"].sum(),
+            "cache_hit_rate": grouped["cache_hit"].apply(lambda s: s.dropna().astype(bool).mean()),
+            "mean_rows": grouped["row_count"].mean(),
+            "errors": grouped["error"].apply(lambda s: s.notna().sum()),
+        })
+        return summary.sort_values("bytes_billed", ascending=False).reset_index()
+
+telemetry = QueryTelemetry()
+
+def timed_query(client, name, query, job_config=None, fetch=None):
+    """
+    Runs a query and records its telemetry.
+
+    Args:
+        client (bigquery.Client): The BigQuery client instance.
+        name (str): Label used to group the query in summaries.
+        query (str): SQL to run.
+        job_config (bigquery.QueryJobConfig, optional): Parameters and options.
+        fetch (callable, optional): Turns the finished job into a result, e.g.
+            `lambda job: job.to_dataframe()`. Defaults to waiting for the job.
+
+    Returns:
+        The value returned by `fetch`, or the job's row iterator.
+    """
+    start = time.perf_counter()
+    job = None
+    try:
+        job = client.query(query, job_config=job_config)
+        result = fetch(job) if fetch else job.result()
+    except Exception as e:
+        telemetry.record(name, job, time.perf_counter() - start, error=str(e))
+        raise
+
+    if isinstance(result, pd.DataFrame):
+        row_count = len(result)
+    elif job.num_dml_affected_rows is not None:
+        row_count = job.num_dml_affected_rows
+    else:
+        row_count = getattr(result, "total_rows", None)
+    telemetry.record(name, job, time.perf_counter() - start, row_count=row_count)
+    return result
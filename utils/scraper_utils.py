@@ -1,50 +1,47 @@
 import streamlit as st
 import os
-from PIL import Image
 from io import BytesIO
 import json
 import base64
-import vertexai
-from vertexai.generative_models import GenerativeModel, Part, SafetySetting
 from dotenv import load_dotenv
-from google.oauth2 import service_account
 from typing import List, Dict
-import requests
 import asyncio
 import concurrent.futures
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
+import threading
 import uuid
 load_dotenv()
 
-# Set up credentials from Streamlit secrets
-if not os.path.exists("credentials.json"):
-    with open("credentials.json", "w") as f:
-        json.dump(json.loads(st.secrets["GOOGLE_APPLICATION_CREDENTIALS"]), f)
-
-# Set the environment variable to point to the credentials file
-os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.path.abspath("credentials.json")
+# Vertex AI, Selenium, webdriver_manager, PIL and requests are imported
+# inside the functions that use them, so pages that import this module
+# without scraping don't pay for loading them.
 
 # Detect whether running locally or on Streamlit Cloud
 def is_running_on_streamlit_cloud():
     return "STREAMLIT_SERVER_PORT" in os.environ
 
-def setup_webdriver():
+def setup_webdriver(debugging_port=9222):
     """
     Initializes and returns a Selenium WebDriver instance with the correct configuration.
 
+    Args:
+        debugging_port (int, optional): Chrome's remote debugging port. None
+            leaves it to chromedriver, so several browsers can run side by side.
+
     Returns:
         webdriver.Chrome: Configured Chrome WebDriver instance.
     """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+
     chrome_options = Options()
     chrome_options.add_argument('--headless')
     chrome_options.add_argument('--no-sandbox')
     chrome_options.add_argument('--disable-dev-shm-usage')
     chrome_options.add_argument('--disable-gpu')
     chrome_options.add_argument("--disable-extensions")
-    chrome_options.add_argument('--remote-debugging-port=9222')
+    if debugging_port is not None:
+        chrome_options.add_argument(f'--remote-debugging-port={debugging_port}')
 
     if is_running_on_streamlit_cloud():
         # Streamlit Cloud uses Chromium at this location
@@ -53,6 +50,7 @@ def setup_webdriver():
     else:
         # Use locally installed Chrome
         chrome_options.binary_location = st.secrets.get("CHROME_BINARY_LOCATION")
+        from webdriver_manager.chrome import ChromeDriverManager
         service = Service(ChromeDriverManager().install())
 
     driver = webdriver.Chrome(service=service, options=chrome_options)
@@ -176,6 +174,8 @@ def image_to_base64(image_bytes):
     Returns:
         str: Base64 encoded string of the image
     """
+    from PIL import Image
+
     buffered = BytesIO(image_bytes)  # Wrap image bytes in a BytesIO object
     image = Image.open(buffered)
 
@@ -196,21 +196,10 @@ def generate(encoded_image):
     Returns:
         dict: JSON response from the model
     """
+    from vertexai.generative_models import Part
+
     try:
-        # Create credentials from the service account info
-        credentials_dict = json.loads(st.secrets["GOOGLE_APPLICATION_CREDENTIALS"])
-        credentials = service_account.Credentials.from_service_account_info(
-            credentials_dict
-        )
-        
-        # Initialize Vertex AI with explicit credentials
-        vertexai.init(
-            project=st.secrets.get("PROJECT_ID"),
-            location="us-central1",
-            credentials=credentials
-        )
-        
-        model = GenerativeModel("gemini-1.5-pro-002")
+        model = _generative_model()
         
         # Create the image part with proper MIME type
         image_part = Part.from_data(
@@ -221,7 +210,7 @@ def generate(encoded_image):
         responses = model.generate_content(
             [image_part, text1],
             generation_config=generation_config,
-            safety_settings=safety_settings,
+            safety_settings=_safety_settings(),
             stream=True,
         )
         
@@ -257,24 +246,56 @@ generation_config = {
     "response_schema": {"type":"OBJECT","properties":{"response":{"type":"STRING"}}},
 }
 
-safety_settings = [
-    SafetySetting(
-        category=SafetySetting.HarmCategory.HARM_CATEGORY_HATE_SPEECH,
-        threshold=SafetySetting.HarmBlockThreshold.OFF
-    ),
-    SafetySetting(
-        category=SafetySetting.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
-        threshold=SafetySetting.HarmBlockThreshold.OFF
-    ),
-    SafetySetting(
-        category=SafetySetting.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
-        threshold=SafetySetting.HarmBlockThreshold.OFF
-    ),
-    SafetySetting(
-        category=SafetySetting.HarmCategory.HARM_CATEGORY_HARASSMENT,
-        threshold=SafetySetting.HarmBlockThreshold.OFF
-    ),
-]
+_vertex_lock = threading.Lock()
+_vertex_model = None
+
+def _generative_model():
+    """
+    Initializes Vertex AI once per process and returns the shared model.
+    """
+    global _vertex_model
+    with _vertex_lock:
+        if _vertex_model is None:
+            import vertexai
+            from vertexai.generative_models import GenerativeModel
+            from google.oauth2 import service_account
+
+            # Create credentials from the service account info
+            credentials_dict = json.loads(st.secrets["GOOGLE_APPLICATION_CREDENTIALS"])
+            credentials = service_account.Credentials.from_service_account_info(
+                credentials_dict
+            )
+
+            # Initialize Vertex AI with explicit credentials
+            vertexai.init(
+                project=st.secrets.get("PROJECT_ID"),
+                location="us-central1",
+                credentials=credentials
+            )
+            _vertex_model = GenerativeModel("gemini-1.5-pro-002")
+        return _vertex_model
+
+def _safety_settings():
+    from vertexai.generative_models import SafetySetting
+
+    return [
+        SafetySetting(
+            category=SafetySetting.HarmCategory.HARM_CATEGORY_HATE_SPEECH,
+            threshold=SafetySetting.HarmBlockThreshold.OFF
+        ),
+        SafetySetting(
+            category=SafetySetting.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
+            threshold=SafetySetting.HarmBlockThreshold.OFF
+        ),
+        SafetySetting(
+            category=SafetySetting.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
+            threshold=SafetySetting.HarmBlockThreshold.OFF
+        ),
+        SafetySetting(
+            category=SafetySetting.HarmCategory.HARM_CATEGORY_HARASSMENT,
+            threshold=SafetySetting.HarmBlockThreshold.OFF
+        ),
+    ]
 
 def search_properties(location: str, api_key: str, search_engine_id: str, num_results: int = 100) -> List[Dict]:
     """
@@ -287,6 +308,8 @@ def search_properties(location: str, api_key: str, search_engine_id: str, num_re
     :return: List of dictionaries containing the top num_results search results.
     """
     
+    import requests
+
     query = f"real estate for sale in {location} Jamaica -airbnb -rent -lot -land -commercial"
     url = "https://www.googleapis.com/customsearch/v1"
     results = []
@@ -0,0 +1,120 @@
+import os
+import json
+from datetime import datetime
+import pytz
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from utils.bigquery_utils import CACHE_DIR
+
+SNAPSHOT_DIR = os.path.join(CACHE_DIR, "snapshots")
+
+def table_fingerprint(client, table_ids):
+    """
+    Reads cheap table metadata used to decide whether a snapshot is still current.
+
+    This is a metadata API call per table, not a query, so it is not billed.
+
+    Args:
+        client (bigquery.Client): The BigQuery client instance.
+        table_ids (list): Fully qualified table IDs the dataset is built from.
+
+    Returns:
+        list: One dict per table with `table`, `last_modified` and `num_rows`.
+    """
+    fingerprint = []
+    for table_id in table_ids:
+        table = client.get_table(table_id)
+        fingerprint.append({
+            "table": table_id,
+            "last_modified": table.modified.isoformat() if table.modified else None,
+            "num_rows": table.num_rows,
+        })
+    return fingerprint
+
+def _paths(name):
+    return os.path.join(SNAPSHOT_DIR, f"{name}.arrow"), os.path.join(SNAPSHOT_DIR, f"{name}.json")
+
+def save_snapshot(name, df, fingerprint, extra=None):
+    """
+    Writes a DataFrame to an uncompressed Arrow IPC file with a metadata sidecar.
+
+    Uncompressed IPC files can be memory-mapped on load instead of parsed.
+    Both files are written to temporary paths and swapped in atomically.
+
+    Args:
+        name (str): Snapshot name.
+        df (pd.DataFrame): The data to persist.
+        fingerprint (list): Output of `table_fingerprint` at fetch time.
+        extra (dict, optional): Additional metadata, e.g. an incremental watermark.
+    """
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    data_path, meta_path = _paths(name)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.OSFile(f"{data_path}.tmp", "wb") as sink:
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    meta = {
+        "fingerprint": fingerprint,
+        "saved_at": datetime.now(pytz.utc).isoformat(),
+        "num_rows": len(df),
+        **(extra or {}),
+    }
+    with open(f"{meta_path}.tmp", "w") as f:
+        json.dump(meta, f)
+
+    os.replace(f"{data_path}.tmp", data_path)
+    os.replace(f"{meta_path}.tmp", meta_path)
+
+def load_snapshot(name):
+    """
+    Memory-maps a saved snapshot.
+
+    Args:
+        name (str): Snapshot name.
+
+    Returns:
+        tuple: (pd.DataFrame, dict) with the data and its metadata, or (None, None)
+        if there is no readable snapshot.
+    """
+    data_path, meta_path = _paths(name)
+    if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+        return None, None
+
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        # One block per column lets null-free numeric columns stay views on the
+        # mapping; self_destruct frees each Arrow column once it is converted,
+        # so the rest are never held twice
+        source = pa.memory_map(data_path, "r")
+        table = ipc.open_file(source).read_all()
+        return table.to_pandas(self_destruct=True, split_blocks=True), meta
+    except Exception as e:
+        print(f"Error loading snapshot {name}: {str(e)}")
+        return None, None
+
+def load_or_fetch(name, fingerprint, fetch):
+    """
+    Returns the snapshot if its source is unchanged, otherwise fetches and saves a new one.
+
+    Args:
+        name (str): Snapshot name.
+        fingerprint (list): Current source metadata, e.g. from `table_fingerprint`
+            or a storage backend's `fingerprint()`.
+        fetch (callable): Called with no arguments to produce a fresh DataFrame.
+
+    Returns:
+        pd.DataFrame: The dataset.
+    """
+    df, meta = load_snapshot(name)
+    if df is not None and meta.get("fingerprint") == fingerprint:
+        return df
+
+    df = fetch()
+    try:
+        save_snapshot(name, df, fingerprint)
+    except Exception as e:
+        print(f"Error saving snapshot {name}: {str(e)}")
+    return df
@@ -0,0 +1,465 @@
+import streamlit as st
+import os
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+import pandas as pd
+import pytz
+from utils import bigquery_utils
+from utils.bigquery_utils import (
+    property_row_from_listing, property_table_id,
+    CACHE_DIR, VALIDATOR_COLUMNS, VALIDATION_FIELDS,
+)
+from utils.invalidation_bus import get_invalidation_bus, VALIDATED, DELETED, INSERTED
+from utils.snapshot_cache import table_fingerprint
+
+class StorageBackend(ABC):
+    """
+    The property-table operations the Validator and Dashboard depend on.
+
+    `get_storage_backend()` picks the implementation from STORAGE_BACKEND:
+    `bigquery` (default) for the live project, or `sqlite` for an embedded
+    database that runs offline and can be filled with synthetic rows.
+    Writes publish the property_ids they touched on the invalidation bus.
+    """
+
+    name = None
+
+    def _publish_validations(self, records):
+        changes = {
+            record["property_id"]: {
+                **(record.get("changes") or {}),
+                "is_validated": True,
+                "validated_by": record["validated_by"],
+            }
+            for record in sorted(records, key=lambda r: r["validation_timestamp"])
+        }
+        get_invalidation_bus().publish(VALIDATED, changes, changes)
+
+    @abstractmethod
+    def fetch_data(self, columns=VALIDATOR_COLUMNS, limit=100, exclude_ids=None):
+        """
+        Returns up to `limit` unvalidated properties not in `exclude_ids`.
+        """
+
+    @abstractmethod
+    def fetch_data_all(self, columns=None, filters=None):
+        """
+        Returns properties joined with their community, optionally filtered
+        (same `filters` keys as `build_property_query`).
+        """
+
+    @abstractmethod
+    def update_validation(self, row_ids, user):
+        """
+        Marks properties validated by `user` in one write.
+        """
+
+    @abstractmethod
+    def merge_validations(self, records):
+        """
+        Applies queued validations; see `bigquery_utils.merge_validations`.
+
+        Returns:
+            int: The number of distinct properties written.
+        """
+
+    @abstractmethod
+    def summary_query(self):
+        """
+        Returns:
+            pd.DataFrame: One row with `total_rows`, `validated_rows` and `unvalidated_rows`.
+        """
+
+    @abstractmethod
+    def delete_properties(self, property_ids):
+        """
+        Deletes several properties in one write.
+
+        Returns:
+            int: The number of property_ids submitted.
+        """
+
+    def delete_property(self, property_id):
+        """
+        Returns:
+            bool: Whether the delete succeeded.
+        """
+        try:
+            self.delete_properties([property_id])
+            return True
+        except Exception as e:
+            print(f"Error deleting property: {str(e)}")
+            return False
+
+    @abstractmethod
+    def add_property_rows(self, listings):
+        """
+        Returns:
+            list: The property_ids written for (property_data, url) pairs.
+        """
+
+    def add_property_row(self, property_data, url):
+        try:
+            return bool(self.add_property_rows([(property_data, url)]))
+        except Exception as e:
+            print(f"Error adding property: {str(e)}")
+            return False
+
+    @abstractmethod
+    def row_count(self):
+        """
+        Returns:
+            int: The number of rows in the property table.
+        """
+
+    @abstractmethod
+    def fetch_communities(self):
+        """
+        Returns:
+            pd.DataFrame: Known communities with lower-cased column names.
+        """
+
+    @abstractmethod
+    def add_community(self, community, parish, city, latitude, longitude):
+        """
+        Adds a community to the geocoded communities table.
+        """
+
+    @abstractmethod
+    def fingerprint(self):
+        """
+        Returns:
+            list: Cheap metadata that changes whenever the property data does.
+        """
+
+class BigQueryBackend(StorageBackend):
+    """
+    The live BigQuery tables, via the functions in `bigquery_utils`.
+    """
+
+    name = "bigquery"
+
+    def __init__(self, client):
+        self.client = client
+
+    def fetch_data(self, columns=VALIDATOR_COLUMNS, limit=100, exclude_ids=None):
+        return bigquery_utils.fetch_data(self.client, columns=columns, limit=limit, exclude_ids=exclude_ids)
+
+    def fetch_data_all(self, columns=None, filters=None):
+        return bigquery_utils.fetch_data_all(self.client, columns=columns, filters=filters)
+
+    def update_validation(self, row_ids, user):
+        result = bigquery_utils.update_validation(self.client, row_ids, user)
+        get_invalidation_bus().publish(VALIDATED, row_ids or [], {
+            row_id: {"is_validated": True, "validated_by": user} for row_id in row_ids or []
+        })
+        return result
+
+    def merge_validations(self, records):
+        written = bigquery_utils.merge_validations(self.client, records)
+        self._publish_validations(records)
+        return written
+
+    def summary_query(self):
+        return bigquery_utils.summary_query(self.client)
+
+    def delete_properties(self, property_ids):
+        deleted = bigquery_utils.delete_properties(self.client, property_ids)
+        get_invalidation_bus().publish(DELETED, property_ids)
+        return deleted
+
+    def add_property_rows(self, listings):
+        property_ids = bigquery_utils.add_property_rows(self.client, listings)
+        get_invalidation_bus().publish(INSERTED, property_ids or [])
+        return property_ids
+
+    def row_count(self):
+        return bigquery_utils.property_row_count(self.client)
+
+    def fetch_communities(self):
+        return bigquery_utils.fetch_authoritative_communities(self.client)
+
+    def add_community(self, community, parish, city, latitude, longitude):
+        return bigquery_utils.add_community_row(self.client, community, parish, city, latitude, longitude)
+
+    def fingerprint(self):
+        # The geo table too, since joined reads take `community` from it
+        return table_fingerprint(self.client, [property_table_id(), bigquery_utils.geo_table_id()])
+
+SQLITE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS properties (
+        property_id TEXT PRIMARY KEY,
+        listing_urls TEXT,
+        price REAL,
+        sqft REAL,
+        rooms REAL,
+        bathroom REAL,
+        property_type TEXT,
+        latitude REAL,
+        longitude REAL,
+        aes_score REAL,
+        is_validated INTEGER,
+        validated_by TEXT,
+        validation_timestamp TEXT,
+        inserted_at TEXT
+    );
+    CREATE INDEX IF NOT EXISTS properties_is_validated ON properties (is_validated);
+    CREATE TABLE IF NOT EXISTS geo (
+        property_id TEXT PRIMARY KEY,
+        community TEXT
+    );
+    CREATE INDEX IF NOT EXISTS geo_community ON geo (community);
+    CREATE TABLE IF NOT EXISTS communities (
+        community TEXT,
+        parish TEXT,
+        city TEXT,
+        latitude REAL,
+        longitude REAL
+    );
+"""
+
+class SQLiteBackend(StorageBackend):
+    """
+    An embedded SQLite copy of the property, geo and communities tables.
+
+    Each thread gets its own connection; the database runs in WAL mode so the
+    query pool, validation flushes and page reruns can read while one writes.
+    List parameters are passed as a single JSON array and expanded with
+    `json_each`, so exclusion lists aren't bounded by SQLite's variable limit.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection().executescript(SQLITE_SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _read(self, query, params=()):
+        df = pd.read_sql_query(query, self._connection(), params=params)
+        if "is_validated" in df.columns:
+            df["is_validated"] = df["is_validated"].astype("boolean")
+        return df
+
+    def _write(self, statements):
+        """
+        Runs (sql, params) pairs in one transaction.
+        """
+        with self._write_lock:
+            conn = self._connection()
+            with conn:
+                return sum(conn.execute(sql, params).rowcount for sql, params in statements)
+
+    def _select(self, columns=None, filters=None, join_geo=False, limit=None):
+        filters = filters or {}
+        predicates = []
+        params = []
+
+        for field in ("property_type", "community"):
+            if filters.get(field) is not None:
+                predicates.append(f"{field} = ?")
+                params.append(filters[field])
+
+        for field in ("price", "rooms", "sqft"):
+            if filters.get(field) is not None:
+                low, high = filters[field]
+                predicates.append(f"{field} BETWEEN ? AND ?")
+                params += [float(low), float(high)]
+
+        if filters.get("is_validated") is not None:
+            predicates.append("is_validated = ?")
+            params.append(int(filters["is_validated"]))
+
+        if filters.get("property_ids") is not None:
+            predicates.append("properties.property_id IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps([str(i) for i in filters["property_ids"]]))
+
+        if filters.get("exclude_property_ids"):
+            predicates.append("properties.property_id NOT IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps([str(i) for i in filters["exclude_property_ids"]]))
+
+        select = ", ".join(
+            f"properties.{column}" if column == "property_id" else column for column in columns
+        ) if columns else "*"
+        query = f"SELECT {select} FROM properties"
+        if join_geo or filters.get("community") is not None or "community" in (columns or []):
+            query += " LEFT JOIN geo USING (property_id)"
+        if predicates:
+            query += " WHERE " + " AND ".join(predicates)
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        return query, params
+
+    def fetch_data(self, columns=VALIDATOR_COLUMNS, limit=100, exclude_ids=None):
+        query, params = self._select(
+            columns=columns,
+            filters={"is_validated": False, "exclude_property_ids": exclude_ids},
+            limit=limit,
+        )
+        return self._read(query, params)
+
+    def fetch_data_all(self, columns=None, filters=None):
+        query, params = self._select(columns=columns, filters=filters, join_geo=True)
+        return self._read(query, params)
+
+    def update_validation(self, row_ids, user):
+        if not row_ids:
+            return
+        current_time = datetime.now(pytz.timezone('America/Jamaica')).isoformat()
+        self._write([(
+            """
+            UPDATE properties
+            SET is_validated = 1, validated_by = ?, validation_timestamp = ?
+            WHERE property_id IN (SELECT value FROM json_each(?))
+            """,
+            (user, current_time, json.dumps([str(r) for r in row_ids])),
+        )])
+        get_invalidation_bus().publish(VALIDATED, row_ids, {
+            row_id: {"is_validated": True, "validated_by": user} for row_id in row_ids
+        })
+
+    def merge_validations(self, records):
+        statements = []
+        property_ids = set()
+        for record in sorted(records, key=lambda r: r["validation_timestamp"]):
+            changes = {
+                field: value for field, value in (record.get("changes") or {}).items()
+                if field in VALIDATION_FIELDS
+            }
+            assignments = ", ".join(f"{field} = ?" for field in changes)
+            statements.append((
+                f"""
+                UPDATE properties
+                SET is_validated = 1, validated_by = ?, validation_timestamp = ?
+                    {', ' + assignments if assignments else ''}
+                WHERE property_id = ?
+                """,
+                (record["validated_by"], record["validation_timestamp"], *changes.values(), record["property_id"]),
+            ))
+            property_ids.add(record["property_id"])
+        if statements:
+            self._write(statements)
+            self._publish_validations(records)
+        return len(property_ids)
+
+    def summary_query(self):
+        return self._read("""
+            SELECT
+                COUNT(*) AS total_rows,
+                COALESCE(SUM(is_validated = 1), 0) AS validated_rows,
+                COALESCE(SUM(is_validated = 0), 0) AS unvalidated_rows
+            FROM properties
+        """)
+
+    def delete_properties(self, property_ids):
+        if not property_ids:
+            return 0
+        ids = json.dumps([str(i) for i in property_ids])
+        self._write([
+            ("DELETE FROM properties WHERE property_id IN (SELECT value FROM json_each(?))", (ids,)),
+            ("DELETE FROM geo WHERE property_id IN (SELECT value FROM json_each(?))", (ids,)),
+        ])
+        get_invalidation_bus().publish(DELETED, property_ids)
+        return len(property_ids)
+
+    def add_property_rows(self, listings):
+        rows = []
+        for property_data, url in listings:
+            try:
+                rows.append(property_row_from_listing(property_data, url))
+            except ValueError as e:
+                print(f"Error converting values for {url}: {str(e)}")
+        self.insert_rows(rows)
+        property_ids = [row["property_id"] for row in rows]
+        get_invalidation_bus().publish(INSERTED, property_ids)
+        return property_ids
+
+    def insert_rows(self, rows, communities=None):
+        """
+        Bulk-inserts property rows (dicts keyed by column name).
+
+        Args:
+            rows (list): Property rows; missing columns are stored as NULL.
+            communities (list, optional): Community for each row, written to the geo table.
+        """
+        if not rows:
+            return
+        columns = [
+            "property_id", "listing_urls", "price", "sqft", "rooms", "bathroom", "property_type",
+            "latitude", "longitude", "aes_score", "is_validated", "inserted_at",
+        ]
+        now = datetime.now(pytz.utc).isoformat()
+        values = [
+            tuple(row.get("inserted_at") or now if column == "inserted_at" else row.get(column) for column in columns)
+            for row in rows
+        ]
+        with self._write_lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    f"INSERT INTO properties ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                    values,
+                )
+                if communities is not None:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO geo (property_id, community) VALUES (?, ?)",
+                        zip((row["property_id"] for row in rows), communities),
+                    )
+
+    def row_count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM properties").fetchone()[0]
+
+    def fetch_communities(self):
+        communities_df = self._read("SELECT * FROM communities")
+        if communities_df.empty:
+            communities_df = self._read("SELECT DISTINCT community FROM geo WHERE community IS NOT NULL")
+        return communities_df
+
+    def add_community(self, community, parish, city, latitude, longitude):
+        self._write([(
+            "INSERT INTO communities (community, parish, city, latitude, longitude) VALUES (?, ?, ?, ?, ?)",
+            (community, parish, city, latitude, longitude),
+        )])
+
+    def fingerprint(self):
+        # In WAL mode recent writes only touch the -wal file until a checkpoint
+        mtimes = [os.path.getmtime(p) for p in (self.path, f"{self.path}-wal") if os.path.exists(p)]
+        return [{"table": self.path, "last_modified": max(mtimes, default=None), "num_rows": self.row_count()}]
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_storage_backend():
+    """
+    Returns the process-wide storage backend selected by STORAGE_BACKEND.
+
+    SQLITE_PATH sets the database file for the `sqlite` backend
+    (default `<CACHE_DIR>/properties.sqlite`).
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            backend = (st.secrets.get("STORAGE_BACKEND") or os.getenv('STORAGE_BACKEND') or "bigquery").lower()
+            if backend == "sqlite":
+                path = (st.secrets.get("SQLITE_PATH") or os.getenv('SQLITE_PATH')
+                        or os.path.join(CACHE_DIR, "properties.sqlite"))
+                _backend = SQLiteBackend(path)
+            elif backend == "bigquery":
+                _backend = BigQueryBackend(bigquery_utils.create_bigquery_client())
+            else:
+                raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+        return _backend
@@ -0,0 +1,234 @@
+from datetime import datetime, timedelta
+import pandas as pd
+import pytz
+from google.cloud import bigquery
+from utils.bigquery_utils import (
+    build_property_query, merge_validations_query, property_table_id, run_query,
+    summary_recount_sql, update_validation_query,
+    TABLE_LAYOUTS, PARTITION_GRANULARITY, VALIDATOR_COLUMNS, DASHBOARD_COLUMNS, VALIDATION_FIELDS,
+)
+from utils.anomaly_scoring import SCORING_COLUMNS
+from utils.incremental_loader import IncrementalLoader
+
+# Suffix of the re-laid-out copy built before a migration is swapped in
+CANDIDATE_SUFFIX = "_relayout"
+
+def current_layout(client, table_id):
+    """
+    Reads a table's partitioning and clustering.
+
+    Returns:
+        dict: `partition_field` (None when unpartitioned or ingestion-time),
+        `partition_type`, `clustering_fields` (list) and `num_bytes`.
+    """
+    table = client.get_table(table_id)
+    partitioning = table.time_partitioning
+    return {
+        "partition_field": partitioning.field if partitioning else None,
+        "partition_type": partitioning.type_ if partitioning else None,
+        "clustering_fields": list(table.clustering_fields or []),
+        "num_bytes": table.num_bytes,
+    }
+
+def target_layout(client, name):
+    """
+    Resolves TABLE_LAYOUTS[name] against the table's actual schema.
+
+    Returns:
+        dict: `table_id`, `partition_field` (first configured TIMESTAMP column
+        present, or None) and `clustering_fields` (configured columns present).
+    """
+    layout = TABLE_LAYOUTS[name]
+    table_id = layout["table_id"]()
+    schema = {field.name: field.field_type for field in client.get_table(table_id).schema}
+
+    partition_field = next(
+        (field for field in layout["partition_fields"] if schema.get(field) == "TIMESTAMP"),
+        None,
+    )
+    return {
+        "table_id": table_id,
+        "partition_field": partition_field,
+        "clustering_fields": [field for field in layout["clustering_fields"] if field in schema],
+    }
+
+def needs_migration(client, name):
+    target = target_layout(client, name)
+    current = current_layout(client, target["table_id"])
+    return (
+        current["partition_field"] != target["partition_field"]
+        or (target["partition_field"] and current["partition_type"] != PARTITION_GRANULARITY)
+        or current["clustering_fields"] != target["clustering_fields"]
+    )
+
+def layout_ddl(source_id, destination_id, partition_field, clustering_fields):
+    """
+    Builds a CREATE TABLE ... AS SELECT that copies `source_id` with a new layout.
+    """
+    ddl = f"CREATE OR REPLACE TABLE `{destination_id}`"
+    if partition_field:
+        ddl += f"\nPARTITION BY TIMESTAMP_TRUNC({partition_field}, {PARTITION_GRANULARITY})"
+    if clustering_fields:
+        ddl += f"\nCLUSTER BY {', '.join(clustering_fields)}"
+    return ddl + f"\nAS SELECT * FROM `{source_id}`"
+
+def build_candidate(client, name):
+    """
+    Writes a partitioned and clustered copy of a table next to the original.
+
+    The copy (`<table>_relayout`) can be compared with `dry_run_report` before
+    `swap_candidate` puts it in place. Building it scans the table once.
+
+    Returns:
+        str: The candidate table ID.
+    """
+    target = target_layout(client, name)
+    candidate_id = target["table_id"] + CANDIDATE_SUFFIX
+    run_query(client, f"build_candidate_{name}", layout_ddl(
+        target["table_id"], candidate_id, target["partition_field"], target["clustering_fields"]
+    ))
+    return candidate_id
+
+def swap_candidate(client, name):
+    """
+    Replaces a table with its re-laid-out candidate.
+
+    The original is renamed to `<table>_backup_<timestamp>` rather than dropped.
+    Rows written between `build_candidate` and the swap are only in the backup,
+    so run the migration while the scraper and validators are idle.
+
+    Returns:
+        str: The backup table ID.
+    """
+    table_id = TABLE_LAYOUTS[name]["table_id"]()
+    project_dataset, table_name = table_id.rsplit(".", 1)
+    backup_name = f"{table_name}_backup_{datetime.now(pytz.utc).strftime('%Y%m%d%H%M%S')}"
+
+    client.get_table(table_id + CANDIDATE_SUFFIX)  # Fail before touching the original
+    run_query(client, f"swap_candidate_{name}", f"ALTER TABLE `{table_id}` RENAME TO `{backup_name}`")
+    run_query(client, f"swap_candidate_{name}", f"ALTER TABLE `{table_id}{CANDIDATE_SUFFIX}` RENAME TO `{table_name}`")
+    return f"{project_dataset}.{backup_name}"
+
+def migrate_table(client, name):
+    """
+    Migrates a table to its configured layout if it doesn't have it yet.
+
+    Returns:
+        str: The backup table ID, or None when the table was already laid out.
+    """
+    if not needs_migration(client, name):
+        return None
+    build_candidate(client, name)
+    return swap_candidate(client, name)
+
+def _staging_source_sql():
+    # An empty source with the validation staging table's schema, so the
+    # MERGE can be dry-run without creating a staging table
+    fields = ", ".join(f"{field} {field_type}" for field, field_type in VALIDATION_FIELDS.items())
+    return (
+        "(SELECT * FROM UNNEST(ARRAY<STRUCT<property_id STRING, validated_by STRING, "
+        f"validation_timestamp TIMESTAMP, changed_fields ARRAY<STRING>, {fields}>>[]))"
+    )
+
+def report_queries(client):
+    """
+    The app's recurring property-table queries, built by the same functions
+    that issue them.
+
+    Each entry also lists the columns the query filters on in a top-level
+    AND, the only predicates partition pruning and clustering can use (the
+    incremental delta ORs its two watermark columns, so it has none).
+
+    Returns:
+        dict: name -> (query, params, filtered columns)
+    """
+    since = datetime.now(pytz.utc) - timedelta(hours=1)
+    queue_query, queue_params = build_property_query(
+        columns=VALIDATOR_COLUMNS, filters={"is_validated": False}, limit=100
+    )
+    priority_query, priority_params = build_property_query(
+        columns=SCORING_COLUMNS, filters={"is_validated": False}, join_geo=True
+    )
+    dashboard_query, dashboard_params = build_property_query(columns=DASHBOARD_COLUMNS, join_geo=True)
+    update_query, update_params = update_validation_query(["PROP_0"], "report")
+    queries = {
+        "fetch_data": (queue_query, queue_params, ("is_validated",)),
+        "validation_priority": (priority_query, priority_params, ("is_validated",)),
+        "fetch_data_all": (dashboard_query, dashboard_params, ()),
+        "reconcile_summary": (summary_recount_sql(), [], ()),
+        "update_validation": (update_query, update_params, ("property_id",)),
+        "merge_validations": (merge_validations_query(_staging_source_sql()), [], ()),
+    }
+    delta = IncrementalLoader(client).delta_query(since)
+    if delta is not None:
+        queries["incremental_delta"] = (*delta, ())
+    return queries
+
+def dry_run_bytes(client, query, params=None):
+    job_config = bigquery.QueryJobConfig(
+        dry_run=True, use_query_cache=False, query_parameters=params or []
+    )
+    return client.query(query, job_config=job_config).total_bytes_processed
+
+def layout_benefit(filter_columns, partition_field, clustering_fields):
+    """
+    Says which part of a layout a query filtering on `filter_columns` can use.
+
+    Returns:
+        str: "partition pruning", "clustering" (optionally "(not leading
+        column)"), both, or "none (full scan)".
+    """
+    benefits = []
+    if partition_field and partition_field in filter_columns:
+        benefits.append("partition pruning")
+    clustered = [field for field in clustering_fields if field in filter_columns]
+    if clustered:
+        # Blocks are sorted by the first clustering column, so filters that
+        # skip it prune far less
+        leading = clustering_fields[0] in clustered
+        benefits.append("clustering" if leading else "clustering (not leading column)")
+    return " + ".join(benefits) or "none (full scan)"
+
+def dry_run_report(client):
+    """
+    Compares bytes scanned by each recurring query on the property table and
+    on its re-laid-out candidate, and says which part of the target layout
+    each query can benefit from.
+
+    Dry runs reflect partition pruning but not clustering, which is only
+    applied at execution time: a query that only benefits from clustering
+    (such as the validation queue's `is_validated = FALSE`) shows no dry-run
+    reduction, and its billed bytes after the swap show up in the query
+    telemetry. Queries with no benefit scan the same bytes either way.
+
+    Returns:
+        pd.DataFrame: query, benefit, bytes_current, bytes_candidate (None
+        without a candidate) and reduction (fraction of bytes saved in the
+        dry run).
+    """
+    table_id = property_table_id()
+    candidate_id = table_id + CANDIDATE_SUFFIX
+    try:
+        client.get_table(candidate_id)
+    except Exception:
+        candidate_id = None
+    target = target_layout(client, "property")
+
+    rows = []
+    for name, (query, params, filter_columns) in report_queries(client).items():
+        try:
+            current = dry_run_bytes(client, query, params)
+            candidate = None
+            if candidate_id:
+                candidate = dry_run_bytes(client, query.replace(f"`{table_id}`", f"`{candidate_id}`"), params)
+        except Exception as e:
+            print(f"Error dry-running {name}: {str(e)}")
+            continue
+        rows.append({
+            "query": name,
+            "benefit": layout_benefit(filter_columns, target["partition_field"], target["clustering_fields"]),
+            "bytes_current": current,
+            "bytes_candidate": candidate,
+            "reduction": 1 - candidate / current if candidate is not None and current else None,
+        })
+    return pd.DataFrame(rows)
@@ -0,0 +1,313 @@
+import streamlit as st
+import os
+import math
+import json
+import threading
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from utils.bigquery_utils import CACHE_DIR
+
+TILE_CACHE_DIR = os.path.join(CACHE_DIR, "tiles")
+THUMBNAIL_DIR = os.path.join(CACHE_DIR, "location_thumbnails")
+MAX_THUMBNAIL_BYTES = 200 * 1024 * 1024
+TILE_SIZE = 256
+MAX_ZOOM = 20
+MAPBOX_TILE_URL = "https://api.mapbox.com/styles/v1/mapbox/satellite-streets-v12/tiles/256/{z}/{x}/{y}?access_token={token}"
+
+def tile_upstream_url():
+    """
+    Returns the tile URL template ({z}, {x}, {y}, {token}); TILE_UPSTREAM_URL
+    points the cache at another server, e.g. a local stand-in.
+    """
+    return st.secrets.get("TILE_UPSTREAM_URL") or os.getenv('TILE_UPSTREAM_URL') or MAPBOX_TILE_URL
+
+def _write_atomic(path, data):
+    # Prefetch workers and proxy threads can miss the same file at once; each
+    # writes its own temp file so neither truncates the other's
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def tile_position(latitude, longitude, zoom):
+    """
+    Returns the fractional Web Mercator tile coordinates of a point.
+    """
+    n = 2 ** zoom
+    x = (longitude + 180.0) / 360.0 * n
+    lat = math.radians(max(min(latitude, 85.0511), -85.0511))
+    y = (1.0 - math.asinh(math.tan(lat)) / math.pi) / 2.0 * n
+    return x, y
+
+class TileCache:
+    """
+    Disk-backed map tile cache keyed by z/x/y and evicted least-recently-used.
+
+    Tiles are stored as `<cache_dir>/<z>/<x>/<y>` so a restarted process keeps
+    what it downloaded; the LRU order is rebuilt from file mtimes on start.
+    """
+
+    def __init__(self, token, cache_dir=TILE_CACHE_DIR, max_bytes=1024 * 1024 * 1024, upstream_url=None, timeout=10):
+        self.token = token
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.upstream_url = upstream_url or tile_upstream_url()
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()   # (z, x, y) -> size in bytes
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._load_index()
+
+    def _path(self, z, x, y):
+        return os.path.join(self.cache_dir, str(z), str(x), str(y))
+
+    def _load_index(self):
+        found = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    z, x = (int(part) for part in os.path.relpath(root, self.cache_dir).split(os.sep))
+                    stat = os.stat(path)
+                    found.append((stat.st_mtime, (z, x, int(name)), stat.st_size))
+                except (ValueError, OSError):
+                    continue
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._bytes += size
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._bytes -= size
+            try:
+                os.remove(self._path(*key))
+            except OSError:
+                pass
+
+    def get(self, z, x, y):
+        """
+        Returns the tile's image bytes, downloading it on a miss.
+        """
+        key = (z, x, y)
+        path = self._path(*key)
+        with self._lock:
+            cached = key in self._entries
+            if cached:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if cached:
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                # Keep the recency order across restarts
+                os.utime(path)
+                return data
+            except OSError:
+                with self._lock:
+                    self._bytes -= self._entries.pop(key, 0)
+
+        import requests
+
+        response = requests.get(self.upstream_url.format(z=z, x=x, y=y, token=self.token), timeout=self.timeout)
+        response.raise_for_status()
+        data = response.content
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _write_atomic(path, data)
+        with self._lock:
+            self.misses += 1
+            self._bytes += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._evict()
+        return data
+
+    def stats(self):
+        with self._lock:
+            return {"tiles": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+def render_location_thumbnail(cache, latitude, longitude, zoom=16, size=(640, 400)):
+    """
+    Stitches cached tiles around a point into a JPEG with a marker at the centre.
+    """
+    from PIL import Image, ImageDraw
+
+    width, height = size
+    center_x, center_y = tile_position(latitude, longitude, zoom)
+    left = center_x * TILE_SIZE - width / 2
+    top = center_y * TILE_SIZE - height / 2
+    n = 2 ** zoom
+
+    canvas = Image.new("RGB", size)
+    for tile_y in range(math.floor(top / TILE_SIZE), math.floor((top + height) / TILE_SIZE) + 1):
+        if not 0 <= tile_y < n:
+            continue
+        for tile_x in range(math.floor(left / TILE_SIZE), math.floor((left + width) / TILE_SIZE) + 1):
+            tile = Image.open(BytesIO(cache.get(zoom, tile_x % n, tile_y))).convert("RGB")
+            if tile.size != (TILE_SIZE, TILE_SIZE):
+                tile = tile.resize((TILE_SIZE, TILE_SIZE))
+            canvas.paste(tile, (round(tile_x * TILE_SIZE - left), round(tile_y * TILE_SIZE - top)))
+
+    draw = ImageDraw.Draw(canvas)
+    cx, cy, r = width / 2, height / 2, 8
+    draw.ellipse((cx - r, cy - r, cx + r, cy + r), fill=(255, 0, 0), outline=(255, 255, 255), width=2)
+
+    buffer = BytesIO()
+    canvas.save(buffer, format="JPEG", quality=80)
+    return buffer.getvalue()
+
+def prune_thumbnails(thumbnail_dir=THUMBNAIL_DIR, max_bytes=MAX_THUMBNAIL_BYTES):
+    """
+    Deletes the least recently used thumbnails once the directory exceeds `max_bytes`.
+    """
+    entries = []
+    for name in os.listdir(thumbnail_dir):
+        if name.endswith(".jpg"):
+            try:
+                stat = os.stat(os.path.join(thumbnail_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(os.path.join(thumbnail_dir, name))
+        except OSError:
+            pass
+        total -= size
+
+def location_thumbnail(cache, latitude, longitude, zoom=16, thumbnail_dir=THUMBNAIL_DIR,
+                       max_bytes=MAX_THUMBNAIL_BYTES):
+    """
+    Returns the path of the static location thumbnail, rendering it on first use.
+
+    Thumbnails are evicted least-recently-used beyond `max_bytes`, like the tiles.
+    """
+    path = os.path.join(thumbnail_dir, f"{latitude:.5f}_{longitude:.5f}_{zoom}.jpg")
+    try:
+        # Keep the recency order for pruning
+        os.utime(path)
+        return path
+    except OSError:
+        pass
+    os.makedirs(thumbnail_dir, exist_ok=True)
+    _write_atomic(path, render_location_thumbnail(cache, latitude, longitude, zoom))
+    prune_thumbnails(thumbnail_dir, max_bytes)
+    return path
+
+def valid_tile(z, x, y, max_zoom=MAX_ZOOM):
+    """
+    Returns whether z/x/y names a real tile at or below `max_zoom`.
+    """
+    return 0 <= z <= max_zoom and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+class TileProxy:
+    """
+    Serves cached tiles over HTTP so the browser's interactive map reads them
+    locally. `/style.json` is a raster map style pointing at `/tiles/{z}/{x}/{y}`.
+
+    Misses are fetched upstream with the server's token, so the proxy listens
+    on localhost unless `host` says otherwise, and only real tiles up to
+    `max_zoom` are forwarded.
+    """
+
+    def __init__(self, cache, port, public_url=None, host="127.0.0.1", max_zoom=MAX_ZOOM):
+        self.cache = cache
+        self.max_zoom = max_zoom
+        self.public_url = (public_url or f"http://localhost:{port}").rstrip("/")
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = threading.Thread(target=self.server.serve_forever, name="tile-proxy", daemon=True)
+        self._thread.start()
+
+    @property
+    def style_url(self):
+        return f"{self.public_url}/style.json"
+
+    def style(self):
+        return {
+            "version": 8,
+            "sources": {"satellite": {
+                "type": "raster",
+                "tiles": [f"{self.public_url}/tiles/{{z}}/{{x}}/{{y}}"],
+                "tileSize": TILE_SIZE,
+            }},
+            "layers": [{"id": "satellite", "type": "raster", "source": "satellite"}],
+        }
+
+    def _handler(self):
+        proxy = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, status, body, content_type):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.send_header("Cache-Control", "public, max-age=604800")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                parts = self.path.split("?")[0].strip("/").split("/")
+                if parts == ["style.json"]:
+                    return self._send(200, json.dumps(proxy.style()).encode(), "application/json")
+                if len(parts) != 4 or parts[0] != "tiles":
+                    return self._send(404, b"", "text/plain")
+                try:
+                    z, x, y = (int(part) for part in parts[1:])
+                except ValueError:
+                    return self._send(404, b"", "text/plain")
+                if not valid_tile(z, x, y, proxy.max_zoom):
+                    return self._send(404, b"", "text/plain")
+                try:
+                    self._send(200, proxy.cache.get(z, x, y), "image/jpeg")
+                except Exception as e:
+                    print(f"Error serving tile {self.path}: {str(e)}")
+                    self._send(502, b"", "text/plain")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+_tile_cache = None
+_tile_proxy = None
+_tile_lock = threading.Lock()
+
+def get_tile_cache(token):
+    """
+    Returns the process-wide tile cache (TILE_CACHE_MB caps it, default 1024).
+    """
+    global _tile_cache
+    with _tile_lock:
+        if _tile_cache is None:
+            max_mb = int(st.secrets.get("TILE_CACHE_MB") or os.getenv('TILE_CACHE_MB') or 1024)
+            _tile_cache = TileCache(token, max_bytes=max_mb * 1024 * 1024)
+        return _tile_cache
+
+def get_tile_proxy(token):
+    """
+    Returns the process-wide tile proxy, or None unless TILE_PROXY_PORT is set.
+
+    TILE_PROXY_URL is the address browsers reach it on (default http://localhost:<port>);
+    TILE_PROXY_HOST is the interface it listens on (default 127.0.0.1).
+    """
+    global _tile_proxy
+    port = st.secrets.get("TILE_PROXY_PORT") or os.getenv('TILE_PROXY_PORT')
+    if not port:
+        return None
+    cache = get_tile_cache(token)
+    with _tile_lock:
+        if _tile_proxy is None:
+            public_url = st.secrets.get("TILE_PROXY_URL") or os.getenv('TILE_PROXY_URL')
+            host = st.secrets.get("TILE_PROXY_HOST") or os.getenv('TILE_PROXY_HOST') or "127.0.0.1"
+            _tile_proxy = TileProxy(cache, int(port), public_url, host=host)
+        return _tile_proxy
@@ -0,0 +1,284 @@
+import os
+import json
+import math
+import threading
+import time
+import uuid
+import atexit
+from datetime import datetime
+import pytz
+import pandas as pd
+from utils.bigquery_utils import VALIDATION_FIELDS, CACHE_DIR
+from utils.invalidation_bus import get_invalidation_bus, QUEUED
+
+SPILL_PATH = os.path.join(CACHE_DIR, "validation_queue.jsonl")
+MAX_RETRY_DELAY = 15 * 60   # seconds
+
+def diff_fields(original, edited):
+    """
+    Returns only the editable fields whose value actually changed.
+
+    A missing original value that comes back as 0 is treated as unchanged,
+    since the Validator form shows 0 for empty numeric fields.
+
+    Args:
+        original (Mapping): The row as it was fetched (Series or dict).
+        edited (dict): Field -> value as submitted by the validator.
+
+    Returns:
+        dict: Field -> new value for the changed fields.
+    """
+    changes = {}
+    for field, new_value in (edited or {}).items():
+        if field not in VALIDATION_FIELDS:
+            continue
+        old_value = original.get(field) if original is not None else None
+        old_missing = old_value is None or bool(pd.isna(old_value))
+
+        if VALIDATION_FIELDS[field] == "FLOAT64":
+            if new_value is None or pd.isna(new_value):
+                continue
+            new_value = float(new_value)
+            if old_missing:
+                if new_value == 0:
+                    continue
+            elif math.isclose(float(old_value), new_value, rel_tol=0, abs_tol=1e-9):
+                continue
+        else:
+            if (old_missing and not new_value) or old_value == new_value:
+                continue
+        changes[field] = new_value
+    return changes
+
+class ValidationQueue:
+    """
+    Write-behind queue for validations.
+
+    `enqueue` appends the validation to a local spill file and returns
+    immediately. A background thread flushes pending records to the storage
+    backend (a single MERGE on BigQuery) every `flush_interval` seconds (or sooner once `max_batch`
+    records are waiting). Records only leave the spill file after their MERGE
+    succeeds, so a restart replays anything that was not yet written.
+
+    Failed flushes back off exponentially. Once a batch has failed
+    `max_attempts` times in a row it is split to find the records that fail
+    on their own; those move to a dead-letter file so the rest can sync.
+    """
+
+    def __init__(self, storage, spill_path=SPILL_PATH, flush_interval=30, max_batch=500,
+                 max_attempts=5, dead_letter_path=None):
+        self.storage = storage
+        self.spill_path = spill_path
+        self.dead_letter_path = dead_letter_path or f"{os.path.splitext(spill_path)[0]}_dead_letter.jsonl"
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        self.failures = 0
+        self.dead_lettered = 0
+        self.last_error = None
+        self.last_flush = None
+        self._retry_at = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending = self._load_spill()
+        if os.path.exists(self.spill_path):
+            # Normalise the file so a torn tail line can't swallow the next append
+            self._rewrite_spill()
+
+        self._thread = threading.Thread(target=self._run, name="validation-queue", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def _load_spill(self):
+        pending = {}
+        if not os.path.exists(self.spill_path):
+            return pending
+        with open(self.spill_path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from a crash mid-write; the rest is intact
+                    continue
+                pending[record["record_id"]] = record
+        return pending
+
+    def _rewrite_spill(self):
+        tmp_path = f"{self.spill_path}.tmp"
+        with open(tmp_path, "w") as f:
+            for record in self._pending.values():
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.spill_path)
+
+    def enqueue(self, property_id, user, original=None, edited=None):
+        """
+        Records a validation and returns without waiting for BigQuery.
+
+        Args:
+            property_id (str): The validated property.
+            user (str): The validator's name.
+            original (Mapping, optional): The row as displayed to the validator.
+            edited (dict, optional): Field values as submitted.
+
+        Returns:
+            dict: The queued record, including the field-level `changes`.
+        """
+        return self.enqueue_many(user, [(property_id, original, edited)])[0]
+
+    def enqueue_many(self, user, validations, flush_now=False):
+        """
+        Records several validations with a single spill-file write.
+
+        Args:
+            user (str): The validator's name.
+            validations (list): (property_id, original, edited) tuples.
+            flush_now (bool): Wake the flusher so the batch is written in one
+                MERGE right away instead of at the next interval.
+
+        Returns:
+            list: The queued records.
+        """
+        timestamp = datetime.now(pytz.timezone('America/Jamaica')).isoformat()
+        records = [{
+            "record_id": uuid.uuid4().hex,
+            "property_id": str(property_id),
+            "validated_by": user,
+            "validation_timestamp": timestamp,
+            "changes": diff_fields(original, edited),
+        } for property_id, original, edited in validations]
+        if not records:
+            return records
+
+        with self._lock:
+            os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+            with open(self.spill_path, "a") as f:
+                f.write("".join(json.dumps(record) + "\n" for record in records))
+                f.flush()
+                os.fsync(f.fileno())
+            for record in records:
+                self._pending[record["record_id"]] = record
+            if flush_now or len(self._pending) >= self.max_batch:
+                self._wake.set()
+
+        # Other sessions and caches can drop these now rather than after the MERGE
+        get_invalidation_bus().publish(QUEUED, [record["property_id"] for record in records], {
+            record["property_id"]: {**record["changes"], "is_validated": True, "validated_by": user}
+            for record in records
+        })
+        return records
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def pending_property_ids(self):
+        with self._lock:
+            return {record["property_id"] for record in self._pending.values()}
+
+    def flush(self):
+        """
+        Writes all pending records to the storage backend in one batch.
+
+        Returns:
+            int: The number of records flushed (0 if nothing was pending or the write failed).
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._pending.values())
+            if not batch:
+                return 0
+
+            rejected = []
+            try:
+                self.storage.merge_validations(batch)
+                written = batch
+            except Exception as e:
+                self.last_error = str(e)
+                self.failures += 1
+                self._retry_at = time.monotonic() + min(
+                    self.flush_interval * 2 ** (self.failures - 1), MAX_RETRY_DELAY
+                )
+                print(f"Error flushing validation queue: {str(e)}")
+                if self.failures < self.max_attempts:
+                    return 0
+                written, rejected = self._isolate(batch[:self.max_batch])
+                if not written:
+                    # Nothing went through at all: the backend is down, not the data bad
+                    return 0
+
+            with self._lock:
+                for record in written + rejected:
+                    self._pending.pop(record["record_id"], None)
+                if rejected:
+                    self._dead_letter(rejected)
+                self._rewrite_spill()
+            self.failures = 0
+            self._retry_at = None
+            self.last_error = None
+            self.last_flush = datetime.now(pytz.utc)
+            return len(written)
+
+    def _isolate(self, records):
+        """
+        Bisects a batch that keeps failing so one bad record can't hold back the rest.
+
+        Returns:
+            tuple: (records written, records that failed on their own).
+        """
+        if len(records) == 1:
+            return [], records
+        written, rejected = [], []
+        middle = len(records) // 2
+        for half in (records[:middle], records[middle:]):
+            try:
+                self.storage.merge_validations(half)
+                written += half
+            except Exception:
+                half_written, half_rejected = self._isolate(half)
+                written += half_written
+                rejected += half_rejected
+        return written, rejected
+
+    def _dead_letter(self, records):
+        os.makedirs(os.path.dirname(self.dead_letter_path) or ".", exist_ok=True)
+        with open(self.dead_letter_path, "a") as f:
+            f.write("".join(json.dumps(record) + "\n" for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+        self.dead_lettered += len(records)
+        print(f"Moved {len(records)} validation(s) that keep failing to {self.dead_letter_path}")
+
+    def _run(self):
+        while True:
+            timeout = self.flush_interval
+            if self._retry_at is not None:
+                timeout = max(self._retry_at - time.monotonic(), 0)
+            self._wake.wait(timeout)
+            self._wake.clear()
+            if self._retry_at is not None and time.monotonic() < self._retry_at:
+                # Woken early by a full batch while backing off
+                continue
+            self.flush()
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_validation_queue(storage):
+    """
+    Returns the process-wide validation queue, starting it on first use.
+    """
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            # Keep the BigQuery spill file where it always was; other backends get their own
+            spill_path = SPILL_PATH if storage.name == "bigquery" else os.path.join(
+                CACHE_DIR, f"validation_queue_{storage.name}.jsonl"
+            )
+            _queue = ValidationQueue(storage, spill_path=spill_path)
+        return _queue
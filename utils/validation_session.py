@@ -0,0 +1,191 @@
+import weakref
+from utils.invalidation_bus import get_invalidation_bus, QUEUED, VALIDATED, DELETED
+from utils.property_store import get_property_store
+
+def _release_records(store, records):
+    store.release(list(records))
+    records.clear()
+
+class ValidationSession:
+    """
+    A validator's cursor over leased properties.
+
+    Rows live once in the process-wide PropertyStore; a session holds a
+    reference to each, its queue order and an overlay of its own unsaved
+    edits. Records are indexed by property_id and kept in a circular doubly
+    linked order (two dicts of neighbours), so looking up, validating,
+    deleting, skipping to the back and finding the next property are all
+    O(1) regardless of queue length. `sync` drops properties that were
+    validated or deleted elsewhere since the session last looked.
+    A session that is garbage collected without `close` (e.g. its browser
+    tab went away) releases its records then.
+    """
+
+    __slots__ = ("_records", "_overlay", "_next", "_prev", "_head", "_store", "_bus", "_cursor", "claimed", "completed",
+                 "__weakref__")
+
+    def __init__(self, rows=(), store=None, bus=None):
+        self._store = store or get_property_store()
+        self._bus = bus or get_invalidation_bus()
+        self._cursor = self._bus.cursor()
+        self._records = {}   # property_id -> shared PropertyRecord
+        self._overlay = {}   # property_id -> {field: value} edited in this session
+        self._next = {}
+        self._prev = {}
+        self._head = None
+        self.claimed = 0     # properties ever added to this session
+        self.completed = 0   # validated or deleted
+        weakref.finalize(self, _release_records, self._store, self._records)
+        self.add(rows)
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, property_id):
+        return property_id in self._records
+
+    def __iter__(self):
+        property_id = self._head
+        for _ in range(len(self._records)):
+            yield property_id
+            property_id = self._next[property_id]
+
+    def ids(self):
+        """
+        Returns the property_ids in queue order.
+        """
+        return list(self)
+
+    def get(self, property_id):
+        """
+        Returns the record with this session's unsaved edits applied.
+        """
+        return self._records[property_id].with_changes(self._overlay.get(property_id))
+
+    def original(self, property_id):
+        """
+        Returns the shared record as fetched, without this session's edits.
+        """
+        return self._records[property_id]
+
+    def edit(self, property_id, changes):
+        """
+        Keeps edits for a property this session hasn't submitted yet (e.g. when skipping it).
+        """
+        if property_id in self._records:
+            if changes:
+                self._overlay[property_id] = dict(changes)
+            else:
+                self._overlay.pop(property_id, None)
+
+    def _link_tail(self, property_id):
+        if self._head is None:
+            self._head = property_id
+            self._next[property_id] = self._prev[property_id] = property_id
+            return
+        tail = self._prev[self._head]
+        self._next[tail] = property_id
+        self._prev[property_id] = tail
+        self._next[property_id] = self._head
+        self._prev[self._head] = property_id
+
+    def _unlink(self, property_id):
+        prev, following = self._prev.pop(property_id), self._next.pop(property_id)
+        if following == property_id:
+            self._head = None
+            return
+        self._next[prev] = following
+        self._prev[following] = prev
+        if self._head == property_id:
+            self._head = following
+
+    def add(self, rows):
+        """
+        Appends rows (mappings with `property_id`) not already queued.
+        """
+        new_rows = [row for row in rows if row['property_id'] not in self._records]
+        for record in self._store.acquire(new_rows):
+            self._records[record.property_id] = record
+            self._link_tail(record.property_id)
+            self.claimed += 1
+
+    def next_after(self, property_id):
+        """
+        Returns the property after `property_id`, wrapping around, or None if it's the only one.
+        """
+        following = self._next.get(property_id)
+        return None if following in (None, property_id) else following
+
+    def following(self, property_id, count):
+        """
+        Returns up to `count` records after `property_id` (from the head if it isn't queued).
+        """
+        if property_id in self._records:
+            current, stop = self._next[property_id], property_id
+        else:
+            current, stop = self._head, None
+        records = []
+        while current is not None and current != stop and len(records) < min(count, len(self._records)):
+            records.append(self.get(current))
+            current = self._next[current]
+        return records
+
+    def _remove(self, property_id):
+        self._unlink(property_id)
+        del self._records[property_id]
+        self._overlay.pop(property_id, None)
+        self._store.release([property_id])
+
+    def complete(self, property_id):
+        """
+        Removes a validated or deleted property.
+        """
+        if property_id in self._records:
+            self._remove(property_id)
+            self.completed += 1
+
+    def drop(self, property_id):
+        """
+        Removes a property without counting it as done (e.g. its lease was lost).
+        """
+        if property_id in self._records:
+            self._remove(property_id)
+            self.claimed -= 1
+
+    def sync(self):
+        """
+        Drops properties validated or deleted by other sessions since the last sync.
+
+        Returns:
+            list: The property_ids dropped.
+        """
+        events, self._cursor = self._bus.events_since(self._cursor)
+        dropped = []
+        for event in events:
+            if event["kind"] not in (QUEUED, VALIDATED, DELETED):
+                continue
+            for property_id in event["property_ids"]:
+                if property_id in self._records:
+                    self.drop(property_id)
+                    dropped.append(property_id)
+        return dropped
+
+    def close(self):
+        """
+        Releases every record this session still references and resets its progress.
+        """
+        _release_records(self._store, self._records)
+        self.claimed = self.completed = 0
+        self._overlay.clear()
+        self._next.clear()
+        self._prev.clear()
+        self._head = None
+
+    def skip(self, property_id):
+        """
+        Moves a property to the back of the queue.
+        """
+        if property_id not in self._records or len(self._records) == 1:
+            return
+        self._unlink(property_id)
+        self._link_tail(property_id)